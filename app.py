@@ -9,7 +9,22 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_adaptive import adaptive_sweep
+from murayama_incremental import IncrementalStudy
+from murayama_singleflight import SingleFlight, flight_key
+from murayama_plotting import decimated_scattergl
+from murayama_jobs import JobManager, fine_sweep_job, anytime_job, batch_job, DONE, CANCELLED, ERROR
+from murayama_casefile import read_case_file, case_arrays, summarize_results, case_file_template
+from murayama_schedule import deduplicate_cases
+from murayama_store import ResultStore
+from murayama_session import SessionMemory, compact_results
+from murayama_scenarios import SCENARIO_COLUMNS, scenario_table, validate_scenarios, evaluate_scenarios
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import atexit
 import io
+import os
+import shutil
+import tempfile
 
 
 # ページ設定
@@ -20,6 +35,718 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource
+def _study_flight() -> SingleFlight:
+    """全セッションで共有する single-flight（同一条件の同時計算を1回にまとめる）"""
+    return SingleFlight()
+
+
+@st.cache_resource
+def _job_manager() -> JobManager:
+    """全セッションで共有するバックグラウンド計算のワーカープール"""
+    return JobManager(max_workers=2)
+
+
+@st.cache_resource
+def _result_store() -> ResultStore:
+    """
+    全セッションで共有する永続キャッシュ（シナリオの計算結果・セッションから退避した値）
+
+    退避した値は pickle で読み戻すため、他のユーザーが読み書きできない、このプロセス専用の
+    ディレクトリ（モード 0700）に置き、終了時に削除する（前回の起動の値も残さない）。
+    """
+    directory = tempfile.mkdtemp(prefix='murayama_cache_')
+    store = ResultStore(os.path.join(directory, 'session_cache.sqlite'))
+
+    def cleanup():
+        store.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    atexit.register(cleanup)
+    return store
+
+
+@st.cache_resource
+def _session_memory() -> SessionMemory:
+    """全セッションの計算結果・図の保持（セッションごと・全体の上限を超えると古いものから永続キャッシュへ退避）"""
+    return SessionMemory(store=_result_store())
+
+
+@st.cache_resource
+def _concept_image() -> bytes:
+    """概念図の画像（全セッションで1回だけ読み込む）"""
+    with open("data/image.jpg", "rb") as f:
+        return f.read()
+
+
+def _session_id() -> str:
+    """現在のセッションの識別子"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+
+def _render_cached(name, build, *args):
+    """計算結果ごとに1回だけ図・CSVを作成（新しい計算でクリア、上限を超えた場合は破棄して作り直す）"""
+    memory, session = _session_memory(), _session_id()
+    value = memory.get(session, f'render:{name}')
+    if value is None:
+        value = build(*args)
+        memory.put(session, f'render:{name}', value)
+    return value
+
+
+def _calculator(inputs) -> MurayamaCalculatorRevised:
+    """入力条件の計算機インスタンス"""
+    return MurayamaCalculatorRevised(**{k: inputs[k] for k in ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K',
+                                                                'force_finite_cover')})
+
+
+def _compute_results(inputs, use_adaptive):
+    """パラメトリックスタディの実行と結果の保持（前回から変更された入力に依存する段階のみ再計算）"""
+    memory, session = _session_memory(), _session_id()
+    study = memory.get(session, 'study')
+    if study is None:
+        study = IncrementalStudy(**inputs)
+    else:
+        study.update(**inputs)
+    # 他のセッションで同一条件の計算が実行中であればその結果を共有する
+    results = dict(_study_flight().do(flight_key('parametric_study', **inputs), study.parametric_study))
+    if use_adaptive:
+        # グラフの曲線の描画専用（臨界値・安全率・表は上の1度刻みの結果を用いる）。
+        # 1度刻みの計算に追加で評価するため評価点数は増える（0.01度刻みの等間隔掃引より少ない点数で滑らかな曲線を描く）
+        results['adaptive_sweep'] = adaptive_sweep(study.calculator, inputs['theta_range'])
+    # 途中の段階は作り直せるため破棄し、結果（列ごとの配列にまとめたもの）は退避する
+    memory.put(session, 'study', study)
+    results = compact_results(results)
+    memory.put(session, 'results', results, spill=True)
+    memory.discard(session, 'render:')
+    return results
+
+
+def _session_results():
+    """保持している計算結果（退避先からも削除された場合は入力から再計算する）"""
+    results = _session_memory().get(_session_id(), 'results')
+    if results is None:
+        results = _compute_results(st.session_state.inputs, st.session_state.use_adaptive)
+    return results
+
+
+def _pressure_figure(results):
+    """探索角度θdと必要切羽押え力Pの関係のグラフ"""
+    fig = go.Figure()
+
+    # theta_valuesを取得
+    theta_values = results.get('theta_degrees', [])
+
+    # P値の抽出（detailed_results は列ごとの配列）
+    detailed = results.get('detailed_results')
+    P_values = detailed['P_kN_m2'] if detailed else []
+
+    adaptive = results.get('adaptive_sweep')
+    if adaptive is not None:
+        # 適応的サンプリングの曲線（有効な角度のみ、WebGL・ピーク保存で間引き）と1度刻みの計算点
+        fig.add_trace(decimated_scattergl(
+            adaptive['theta_d_deg'][adaptive['valid']],
+            adaptive['P'][adaptive['valid']],
+            mode='lines',
+            name='必要切羽押え力',
+            line=dict(width=2)
+        ))
+        fig.add_trace(go.Scattergl(
+            x=theta_values,
+            y=P_values,
+            mode='markers',
+            name='計算点（1度刻み）',
+            marker=dict(size=5)
+        ))
+    else:
+        fig.add_trace(go.Scattergl(
+            x=theta_values,
+            y=P_values,
+            mode='lines+markers',
+            name='必要切羽押え力',
+            line=dict(width=2)
+        ))
+
+    # 最大値の位置にマーカーを追加（旗揚げ付き）
+    fig.add_trace(go.Scatter(
+        x=[results['critical_theta_deg']],
+        y=[results['max_P']],
+        mode='markers+text',
+        marker=dict(size=15, color='red', symbol='x'),
+        name='必要押え力(最大)点',
+        text=[f"必要押え力(最大)点<br>θd = {results['critical_theta_deg']:.1f}°<br>P = {results['max_P']:.2f} kN/m²"],
+        textposition="top center",
+        textfont=dict(size=12, color='red'),
+        showlegend=True
+    ))
+
+    fig.update_layout(
+        title="探索角度θdと必要切羽押え力Pの関係",
+        xaxis_title="探索角度 θd (度)",
+        yaxis_title="必要切羽押え力 P (kN/m²)",
+        height=500
+    )
+    return fig
+
+
+def _results_csv(results, inputs, calculator):
+    """全角度範囲の詳細な計算結果のCSV（CSVのバイト列、プレビュー用のDataFrame、その日本語列名版）"""
+    H_f, gamma, phi, coh, H, alpha, K = (inputs[k] for k in ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K'))
+    theta_min, theta_max = inputs['theta_range']
+    
+    theta_range = (theta_min, theta_max)
+
+    # 全角度での計算結果を取得
+    all_results = []
+    for theta_deg in range(theta_min, theta_max + 1):
+        theta_rad = np.radians(theta_deg)
+        # 無効な角度（幾何不適切・B ≤ 0.1）は valid=False で返るためスキップ
+        result = calculator.calculate_support_pressure(theta_rad)
+        if result['valid']:
+            geom = result['geometry']
+            all_results.append({
+                'theta_deg': theta_deg,
+                'theta_rad': theta_rad,
+                'r0_m': geom['r0'],
+                'rd_m': geom['rd'],
+                'B_m': geom['B'],
+                'la_m': geom['la'],
+                'lp_m': geom['lp'],
+                'q_kN_m2': result['q'],
+                'Wf_kN': result['Wf'],
+                'lw_m': result['lw'],
+                'Mc_kNm': result['Mc'],
+                'P_kN_m2': result['P']
+            })
+
+    # DataFrameを作成
+    df_all_results = pd.DataFrame(all_results)
+
+    # プレビュー用のDataFrame（既存のresultsから）
+    df_detailed = pd.DataFrame(results['detailed_results'])
+
+    # カラム名を日本語に変更
+    column_names = {
+        'theta_deg': '探索角度θd (度)',
+        'theta_rad': '探索角度θd (rad)',
+        'r0_m': '初期半径r0 (m)',
+        'rd_m': '終端半径rd (m)',
+        'B_m': '水平投影幅B (m)',
+        'la_m': '距離la (m)',
+        'lp_m': '支保圧作用腕lp (m)',
+        'q_kN_m2': '等価合力q (kN/m²)',
+        'Wf_kN': '自重Wf (kN)',
+        'lw_m': '自重作用点lw (m)',
+        'Mc_kNm': '粘着抵抗モーメントMc (kN·m)',
+        'P_kN_m2': '必要切羽押え力P (kN/m²)'
+    }
+    df_detailed_jp = df_detailed.rename(columns=column_names)
+    df_all_results_jp = df_all_results.rename(columns=column_names)
+
+    # CSV変換（全結果）
+    csv_buffer = io.StringIO()
+
+    # 入力パラメータセクション
+    csv_buffer.write("## 入力パラメータ\n")
+    csv_buffer.write("パラメータ,値\n")
+    csv_buffer.write(f"切羽高さ Hf,{H_f} m\n")
+    csv_buffer.write(f"地山の単位体積重量 γ,{gamma} kN/m³\n")
+    csv_buffer.write(f"地山の内部摩擦角 φ,{phi}°\n")
+    csv_buffer.write(f"地山の粘着力 c,{coh} kPa\n")
+    csv_buffer.write(f"土被り H,{H} m\n" if H is not None else "土被り H,深部前提\n")
+    csv_buffer.write(f"影響幅係数 α,{alpha}\n")
+    csv_buffer.write(f"経験係数 K,{K}\n")
+    csv_buffer.write("\n")
+
+    # 計算結果サマリーセクション
+    csv_buffer.write("## 計算結果サマリー\n")
+    csv_buffer.write("項目,値\n")
+    csv_buffer.write(f"必要押え力(最大),{results['max_P']:.2f} kN/m²\n")
+    csv_buffer.write(f"臨界探索角度 θd,{results['critical_theta_deg']:.1f}°\n")
+    csv_buffer.write(f"対応する初期半径 r₀,{results['critical_r0']:.2f} m\n")
+    csv_buffer.write(f"水平投影幅 B,{results['critical_geometry']['B']:.2f} m\n")
+    safety_factor_str = "∞" if results['safety_factor'] == float('inf') else f"{results['safety_factor']:.2f}"
+    csv_buffer.write(f"安全率,{safety_factor_str}\n")
+    csv_buffer.write(f"安定性評価,{results['stability']}\n")
+    csv_buffer.write("\n")
+
+    # 詳細計算結果セクション
+    csv_buffer.write("## 詳細計算結果\n")
+    df_all_results_jp.to_csv(csv_buffer, index=False)
+    csv = csv_buffer.getvalue().encode('utf-8-sig')
+    return csv, df_detailed, df_detailed_jp
+
+
+def _safety_factor_figures(sf_result):
+    """安全率と必要切羽押え力・強度パラメータの関係のグラフと詳細データ"""
+    # データの準備
+    eval_points = sf_result['evaluation_points']
+
+    # evaluation_pointsは既に安全率でソートされている
+    data_points = eval_points
+
+    # ソート済みデータの各列（evaluation_points は列ごとの配列）
+    safety_factors = data_points['safety_factor']
+    pressures = data_points['P']
+    coh_values = data_points['coh']
+    phi_values = data_points['phi_deg']
+
+    # グラフの作成
+    fig_sf = go.Figure()
+
+    # 必要切羽押え力の曲線
+    fig_sf.add_trace(go.Scattergl(
+        x=safety_factors,
+        y=pressures,
+        mode='lines+markers',
+        name='必要切羽押え力',
+        line=dict(width=3, color='blue'),
+        marker=dict(size=6)
+    ))
+
+    # ゼロラインの追加
+    fig_sf.add_hline(y=0, line_dash="dash", line_color="red", 
+                   annotation_text="P = 0 (自立限界)")
+
+    # 元の強度での点（現在の状態）
+    fig_sf.add_trace(go.Scatter(
+        x=[sf_result['safety_factor']],
+        y=[sf_result['original_P']],
+        mode='markers+text',
+        marker=dict(size=12, color='green', symbol='circle'),
+        name='現在の状態',
+        text=[f"P = {sf_result['original_P']:.2f} kN/m²"],
+        textposition="top center"
+    ))
+
+    # 安全率 = 1.0 の縦線を追加
+    fig_sf.add_vline(x=1.0, line_dash="dot", line_color="gray",
+                   annotation_text="安全率 = 1.0")
+
+    fig_sf.update_layout(
+        title="安全率と必要切羽押え力の関係",
+        xaxis_title="安全率",
+        yaxis_title="必要切羽押え力 P (kN/m²)",
+        height=500,
+        xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10]),
+        yaxis=dict(autorange='reversed'),
+        showlegend=True
+    )
+
+    # 粘着力の変化
+    fig_coh = go.Figure()
+    fig_coh.add_trace(go.Scattergl(
+        x=safety_factors,
+        y=coh_values,
+        mode='lines+markers',
+        name='粘着力',
+        line=dict(width=2, color='orange')
+    ))
+    fig_coh.add_vline(x=sf_result['safety_factor'], 
+                    line_dash="dash", line_color="red")
+    fig_coh.add_vline(x=1.0, line_dash="dot", line_color="gray")
+    fig_coh.update_layout(
+        title="粘着力の変化",
+        xaxis_title="安全率",
+        yaxis_title="粘着力 coh (kPa)",
+        height=300,
+        xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10])
+    )
+
+    # 内部摩擦角の変化
+    fig_phi = go.Figure()
+    fig_phi.add_trace(go.Scattergl(
+        x=safety_factors,
+        y=phi_values,
+        mode='lines+markers',
+        name='内部摩擦角',
+        line=dict(width=2, color='green')
+    ))
+    fig_phi.add_vline(x=sf_result['safety_factor'], 
+                    line_dash="dash", line_color="red")
+    fig_phi.add_vline(x=1.0, line_dash="dot", line_color="gray")
+    fig_phi.update_layout(
+        title="内部摩擦角の変化",
+        xaxis_title="安全率",
+        yaxis_title="内部摩擦角 φ (度)",
+        height=300,
+        xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10])
+    )
+
+    # DataFrameの作成
+    df_sf = pd.DataFrame({
+        '安全率': safety_factors,
+        '粘着力 (kPa)': coh_values,
+        '内部摩擦角 (度)': phi_values,
+        '必要切羽押え力 (kN/m²)': pressures
+    })
+    return fig_sf, fig_coh, fig_phi, df_sf
+
+
+def _evaluation_panel(results, polling):
+    """安定性の評価結果の表示（フラグメント、臨界条件の段階的な精緻化の結果で置き換える）"""
+    job = _job_manager().get(st.session_state.get('anytime_job', ''))
+    running = job is not None and not job.finished
+    if polling and not running:
+        st.rerun()
+    refined = None if job is None else job.snapshot()['partial']
+    # 1度刻みの結果より粗い段階は表示しない
+    if refined is not None and (refined['theta_step_deg'] >= 1.0 or refined['max_P'] < results['max_P']):
+        refined = None
+    if refined is not None:
+        results = dict(results, max_P=refined['max_P'], safety_factor=refined['safety_factor'],
+                       stability=refined['stability'], detailed_stability=refined['stability'])
+
+    # 1行レイアウトで全ての評価結果を表示
+    col_eval1, col_eval2, col_eval3 = st.columns([1, 1, 1])
+
+    # 安定性判定の色分け
+    stability_value = results['stability']
+    detailed_stability = results.get('detailed_stability', stability_value)
+    if stability_value == "安定":
+        stability_color_class = "metric-value-safe"
+        emoji_symbol = "😊"
+    else:
+        stability_color_class = "metric-value-danger"
+        emoji_symbol = "😰"
+
+    # 必要切羽押え力の色分け
+    max_p = results['max_P']
+    if max_p <= 50:
+        p_color_class = "metric-value-safe"
+    elif max_p <= 100:
+        p_color_class = "metric-value-warning"
+    else:
+        p_color_class = "metric-value-danger"
+
+    # 安全率の色分け
+    sf = results['safety_factor']
+    if sf == float('inf') or sf >= 1.5:
+        sf_color_class = "metric-value-safe"
+    elif sf >= 1.0:
+        sf_color_class = "metric-value-warning"
+    else:
+        sf_color_class = "metric-value-danger"
+
+    with col_eval1:
+        # 安定性評価の表示
+        st.markdown(
+            f"""
+            <div class="custom-metric-card">
+                <div class="metric-label">🏗️ 安定性判定</div>
+                <div class="metric-value {stability_color_class}">
+                    {stability_value} {emoji_symbol}
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col_eval2:
+        st.markdown(
+            f"""
+            <div class="custom-metric-card">
+                <div class="metric-label">💪 必要切羽押え力P (kN/m²)</div>
+                <div class="metric-value {p_color_class}">
+                    {results['max_P']:.2f}
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    with col_eval3:
+        # 安全率の表示（無限大の場合は特別な表示）
+        if results['safety_factor'] == float('inf'):
+            sf_display = "∞"
+        else:
+            sf_display = f"{results['safety_factor']:.2f}"
+
+        st.markdown(
+            f"""
+            <div class="custom-metric-card">
+                <div class="metric-label">🛡️ 安全率</div>
+                <div class="metric-value {sf_color_class}">
+                    {sf_display}
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+
+    if refined is not None:
+        status = "精緻化中" if running else "精緻化済み"
+        st.caption(f"{status}: θd = {refined['critical_theta_d_deg']:.3f}°"
+                   f"（刻み {refined['theta_step_deg']:g}°、評価 {refined['n_evaluations']} 点）")
+
+
+def _fine_sweep_panel(calculator, theta_range, polling):
+    """詳細掃引のジョブの開始・キャンセルと進捗・途中結果の表示（フラグメント）"""
+    manager = _job_manager()
+    job = manager.get(st.session_state.get('fine_sweep_job', ''))
+    running = job is not None and not job.finished
+    if polling and not running:
+        # 完了したらアプリ全体を再実行してポーリングを止める
+        st.rerun()
+
+    col_step, col_start, col_cancel = st.columns([2, 1, 1])
+    with col_step:
+        step = st.selectbox("角度刻み (°)", [0.1, 0.01, 0.001], index=1, key="fine_sweep_step")
+    with col_start:
+        if st.button("詳細掃引の開始", disabled=running, use_container_width=True):
+            job = manager.submit('詳細掃引', fine_sweep_job, calculator, theta_range, step)
+            st.session_state.fine_sweep_job = job.id
+            st.rerun()
+    with col_cancel:
+        if st.button("キャンセル", disabled=not running, use_container_width=True):
+            job.cancel()
+
+    if job is None:
+        return
+    state = job.snapshot()
+    if state['status'] == ERROR:
+        st.error(f"計算エラー: {state['error']}")
+        return
+    label = {DONE: "完了", CANCELLED: "キャンセル"}.get(state['status'], "計算中")
+    st.progress(state['progress'], text=f"{label}: {state['progress']:.0%}（{state['elapsed']:.1f} 秒）")
+
+    sweep = state['result'] or state['partial']
+    if sweep is None or np.isnan(sweep['max_P']):
+        return
+    st.write(f"最大P = {sweep['max_P']:.3f} kN/m²（θd = {sweep['critical_theta_deg']:.3f}°）"
+             + ("" if state['status'] == DONE else "　※評価済みの範囲での暫定値"))
+    # 表示範囲を狭めると、その範囲だけを同じ点数で間引いて詳細を表示する
+    view = st.slider("表示範囲 θd (°)", float(theta_range[0]), float(theta_range[1]),
+                     (float(theta_range[0]), float(theta_range[1])), step=0.1, key="fine_sweep_view")
+    critical = int(np.nanargmax(sweep['P']))
+    fig_fine = go.Figure(decimated_scattergl(sweep['theta_d_deg'], sweep['P'], keep=[critical], x_range=view,
+                                             mode='lines', name='必要切羽押え力'))
+    fig_fine.update_layout(xaxis_title="探索角度 θd (度)", yaxis_title="必要切羽押え力 P (kN/m²)",
+                           xaxis=dict(range=list(view)), height=350)
+    st.plotly_chart(fig_fine, use_container_width=True)
+
+
+def _batch_summary(cases, inverse, result):
+    """一括計算の集計表（必要切羽押え力の大きい順、ジョブごとに1回だけ作成）"""
+    summary = summarize_results(cases, result, inverse)
+    return summary.sort_values('必要切羽押え力P (kN/m²)', ascending=False, na_position='last')
+
+
+def _batch_panel(polling):
+    """ケースファイルの一括計算のジョブの開始・キャンセルと進捗・集計表の表示（フラグメント）"""
+    manager = _job_manager()
+    memory, session = _session_memory(), _session_id()
+    job = manager.get(st.session_state.get('batch_job', ''))
+    running = job is not None and not job.finished
+    if polling and not running:
+        # 完了したらアプリ全体を再実行してポーリングを止める
+        st.rerun()
+
+    uploaded = st.file_uploader("ケースファイル（CSV・Excel）", type=['csv', 'xlsx', 'xls'], key="batch_file",
+                                help="1行1区間。列: 区間, H_f, gamma, phi, coh, H（空欄は深部前提）, alpha, K, "
+                                     "force_finite_cover（alpha 以降は省略可）")
+    st.download_button("ひな形のダウンロード", data=case_file_template(), file_name="murayama_cases_template.csv",
+                       mime="text/csv;charset=utf-8-sig")
+    if uploaded is not None and st.session_state.get('batch_file_id') != uploaded.file_id:
+        # アップロードしたファイルごとに1回だけ読み込む（メモリ上限を超えた場合は永続キャッシュへ退避）
+        memory.discard(session, 'batch_cases')
+        try:
+            memory.put(session, 'batch_cases', read_case_file(uploaded.getvalue(), uploaded.name), spill=True)
+        except ImportError as e:
+            st.error(f"Excel ファイルの読み込みには openpyxl が必要です（CSV で保存してください）: {e}")
+        except ValueError as e:
+            st.error(f"入力エラー: {str(e)}")
+        st.session_state.batch_file_id = uploaded.file_id
+    if uploaded is None and st.session_state.get('batch_file_id') is not None:
+        # ファイルを取り除いたら読み込んだケースも削除する
+        memory.discard(session, 'batch_cases')
+        st.session_state.batch_file_id = None
+    cases = memory.get(session, 'batch_cases') if uploaded is not None else None
+
+    col_info, col_start, col_cancel = st.columns([2, 1, 1])
+    with col_info:
+        if cases is not None:
+            st.write(f"**{len(cases)} 区間**を読み込みました")
+    with col_start:
+        if st.button("一括計算の開始", type="primary", disabled=running or cases is None,
+                     use_container_width=True):
+            # 同じ条件の区間は1回だけ計算する
+            dedup = deduplicate_cases(**case_arrays(cases))
+            job = manager.submit('一括計算', batch_job, **dedup['cases'], safety_factor=True)
+            st.session_state.batch_job = job.id
+            memory.put(session, 'batch_job_cases', (cases, dedup['inverse'], dedup['n_unique']), spill=True)
+            memory.discard(session, 'render:batch_summary')
+            st.rerun()
+    with col_cancel:
+        if st.button("キャンセル", disabled=not running, use_container_width=True, key="batch_cancel"):
+            job.cancel()
+
+    if job is None:
+        return
+    state = job.snapshot()
+    if state['status'] == ERROR:
+        st.error(f"計算エラー: {state['error']}")
+        return
+    job_cases = memory.get(session, 'batch_job_cases')
+    if job_cases is None:
+        st.warning("保持期間を過ぎたため一括計算の結果を表示できません。再度計算してください。")
+        return
+    job_cases, inverse, n_unique = job_cases
+    partial = state['result'] or state['partial']
+    n_done = 0 if partial is None else partial['n_done']
+    label = {DONE: "完了", CANCELLED: "キャンセル"}.get(state['status'], "計算中")
+    st.progress(state['progress'], text=f"{label}: {state['progress']:.0%}（{len(job_cases)} 区間・"
+                                        f"重複を除く {n_done}/{n_unique} 条件、"
+                                        f"{state['elapsed']:.1f} 秒）")
+    if state['status'] != DONE:
+        return
+
+    summary = _render_cached('batch_summary', _batch_summary, job_cases, inverse, state['result'])
+
+    P_column = '必要切羽押え力P (kN/m²)'
+    unstable = summary['安定性評価'] == "不安定"
+    col_n, col_unstable, col_max = st.columns(3)
+    col_n.metric("区間数", f"{len(summary)}")
+    col_unstable.metric("不安定な区間", f"{int(unstable.sum())}")
+    if summary[P_column].notna().any():
+        worst = summary.iloc[0]
+        col_max.metric("最大の必要切羽押え力", f"{worst[P_column]:.2f} kN/m²",
+                       delta=f"区間 {worst['区間']}", delta_color="off")
+
+    # 不安定な区間（P > 0）をピンク色で強調表示（列見出しのクリックで並べ替え可能）
+    def highlight_unstable(row):
+        if row['安定性評価'] == "不安定":
+            return ['background-color: #FFB6C1'] * len(row)
+        return [''] * len(row)
+
+    if summary.size <= pd.get_option('styler.render.max_elements'):
+        st.dataframe(summary.style.apply(highlight_unstable, axis=1).format(precision=2),
+                     use_container_width=True, hide_index=True)
+    else:
+        # 強調表示できないほど大きい場合は表のみ
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    # CSVは再実行のたびではなく押したときに生成する（生成を遅らせるだけで、全体は一括でメモリ上に作る）
+    st.download_button(
+        label="一括計算結果の出力",
+        data=lambda: summary.to_csv(index=False).encode('utf-8-sig'),
+        file_name="murayama_batch_results.csv",
+        mime="text/csv;charset=utf-8-sig",
+        help="全区間の必要切羽押え力・安全率・臨界角度・安定性評価をCSVファイルでダウンロードします"
+    )
+
+
+
+def _scenario_figures(comparison):
+    """シナリオごとの P–θd 曲線の重ね描きと安全率の比較のグラフ"""
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, name in enumerate(comparison['names']):
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Scattergl(x=comparison['theta_d_deg'], y=comparison['P'][i], mode='lines',
+                                   name=name, legendgroup=name, line=dict(width=2, color=color)))
+        if np.isfinite(comparison['max_P'][i]):
+            # 最大値の位置（旗揚げはホバーで表示）
+            fig.add_trace(go.Scatter(
+                x=[comparison['critical_theta_d_deg'][i]], y=[comparison['max_P'][i]], mode='markers',
+                name=name, legendgroup=name, showlegend=False, marker=dict(size=10, color=color, symbol='diamond'),
+                hovertemplate=f"{name}<br>θd = %{{x:.1f}}°<br>P = %{{y:.2f}} kN/m²<extra></extra>"))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray")
+    fig.update_layout(xaxis_title="探索角度 θd (度)", yaxis_title="必要切羽押え力 P (kN/m²)", height=450,
+                      legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0))
+
+    # 安全率（∞ は表示範囲の上端に置き、ラベルで示す）
+    sf = np.asarray(comparison['safety_factor'], dtype=float)
+    finite = sf[np.isfinite(sf)]
+    top = max(2.0, finite.max() * 1.2) if finite.size else 2.0
+    fig_sf = go.Figure(go.Bar(
+        x=comparison['names'], y=np.where(np.isinf(sf), top, sf),
+        text=["∞" if np.isinf(v) else ("-" if np.isnan(v) else f"{v:.2f}") for v in sf], textposition='outside',
+        marker_color=["#ff0000" if v < 1.0 else "#ff9900" if v < 1.5 else "#00cc00" for v in np.nan_to_num(sf)]))
+    fig_sf.add_hline(y=1.0, line_dash="dash", line_color="red", annotation_text="Fs = 1.0")
+    fig_sf.update_layout(yaxis_title="安全率", yaxis=dict(range=[0, top * 1.15]), height=350)
+    return fig, fig_sf
+
+
+def _scenario_panel(theta_range):
+    """シナリオの編集と比較（フラグメント、条件を変更したシナリオのみ再計算）"""
+    memory, session = _session_memory(), _session_id()
+    if 'scenario_table' not in st.session_state:
+        # 現在の入力条件（未計算の場合は既定値）と粘着力を無視したケースから始める
+        base = st.session_state.get('inputs') or dict(H_f=10.0, gamma=20.0, phi=30.0, coh=20.0, H=30.0,
+                                                      alpha=1.8, K=1.0, force_finite_cover=True)
+        st.session_state.scenario_table = pd.concat(
+            [scenario_table(base), scenario_table(dict(base, coh=0.0), '粘着力なし')], ignore_index=True)
+        st.session_state.scenario_version = 0
+
+    if st.button("現在の入力条件をシナリオに追加", disabled='inputs' not in st.session_state):
+        table = st.session_state.scenario_editor_value
+        row = scenario_table(st.session_state.inputs, f"シナリオ{len(table) + 1}")
+        st.session_state.scenario_table = pd.concat([table, row], ignore_index=True)
+        # 編集欄を新しい表で作り直す
+        st.session_state.scenario_version += 1
+
+    table = st.data_editor(
+        st.session_state.scenario_table, num_rows="dynamic", use_container_width=True, hide_index=True,
+        key=f"scenario_editor_{st.session_state.scenario_version}",
+        column_order=SCENARIO_COLUMNS,
+        column_config={
+            'name': st.column_config.TextColumn("名称", required=True),
+            'H_f': st.column_config.NumberColumn("切羽高さ Hf (m)", min_value=0.1, max_value=50.0),
+            'gamma': st.column_config.NumberColumn("単位体積重量 γ (kN/m³)", min_value=10.0, max_value=30.0),
+            'phi': st.column_config.NumberColumn("内部摩擦角 φ (度)", min_value=0.0, max_value=60.0),
+            'coh': st.column_config.NumberColumn("粘着力 c (kPa)", min_value=0.0, max_value=1000.0),
+            'H': st.column_config.NumberColumn("土被り H (m)", min_value=0.0, max_value=200.0,
+                                               help="空欄は深部前提"),
+            'alpha': st.column_config.NumberColumn("影響幅係数 α", min_value=1.0, max_value=3.0),
+            'K': st.column_config.NumberColumn("経験係数 K", min_value=0.5, max_value=2.0),
+            'force_finite_cover': st.column_config.CheckboxColumn("有限土被り式", default=True),
+        })
+    st.session_state.scenario_editor_value = table
+
+    try:
+        scenarios = validate_scenarios(table)
+    except ValueError as e:
+        st.error(f"入力エラー: {str(e)}")
+        return
+
+    # 条件を変更したシナリオのみ計算（他はキャッシュから取得）し、比較結果を保持する
+    key = (scenarios.to_json(), tuple(theta_range))
+    comparison = memory.get(session, 'scenarios')
+    if comparison is None or comparison['key'] != key:
+        with st.spinner("シナリオを計算中..."):
+            comparison = dict(evaluate_scenarios(scenarios, _result_store(), theta_range), key=key)
+        memory.put(session, 'scenarios', comparison, spill=True)
+        memory.discard(session, 'render:scenario')
+    st.caption(f"{len(scenarios)} シナリオ（再計算 {comparison['n_computed']} 件、"
+               f"キャッシュ {comparison['n_hits']} 件）、θd = {theta_range[0]}°～{theta_range[1]}°（1度刻み）")
+
+    fig, fig_sf = _render_cached('scenario_figures', _scenario_figures, comparison)
+    st.plotly_chart(fig, use_container_width=True)
+
+    col_sf, col_table = st.columns([1, 2])
+    with col_sf:
+        st.plotly_chart(fig_sf, use_container_width=True)
+    with col_table:
+        summary = comparison['summary']
+
+        # 不安定なシナリオをピンク色で強調表示
+        def highlight_unstable(row):
+            if row['安定性評価'] == "不安定":
+                return ['background-color: #FFB6C1'] * len(row)
+            return [''] * len(row)
+
+        st.dataframe(summary.style.apply(highlight_unstable, axis=1).format(precision=2),
+                     use_container_width=True, hide_index=True)
+        st.download_button(
+            label="比較結果の出力",
+            data=lambda: summary.to_csv(index=False).encode('utf-8-sig'),
+            file_name="murayama_scenarios.csv",
+            mime="text/csv;charset=utf-8-sig",
+        )
+
 # CSSスタイルの適用
 st.markdown("""
 <style>
@@ -100,157 +827,174 @@ st.markdown("""
 st.markdown("<br>", unsafe_allow_html=True)
 
 # タブの作成
-tab1, tab2, tab3 = st.tabs(["安定性評価", "技術情報", "使い方"])
+tab1, tab_batch, tab_scenario, tab2, tab3 = st.tabs(["安定性評価", "一括計算", "シナリオ比較", "技術情報", "使い方"])
 
 with tab1:
     # 3列レイアウトにして、中央をスペーサーとして使用
     col1, spacer, col2 = st.columns([1, 0.2, 1])  # 中央に0.2の幅のスペーサー
     
     with col1:
+        @st.fragment
+        def _input_panel():
+            """入力欄と計算の実行（入力の変更ではこのフラグメントのみ再実行する）"""
         
-        # 地盤条件の入力
-        st.subheader("地盤条件")
+            # 地盤条件の入力
+            st.subheader("地盤条件")
         
-        # 2列レイアウトで配置
-        ground_col1, ground_col2 = st.columns(2)
+            # 2列レイアウトで配置
+            ground_col1, ground_col2 = st.columns(2)
         
-        with ground_col1:
-            # 土被り（最初に配置）
-            H = st.number_input(
-                "土被り H (m)",
-                min_value=0.0,
-                max_value=200.0,
-                value=30.0,
-                step=5.0,
-                help="地表面からトンネル天端までの土被りを入力してください"
-            )
+            with ground_col1:
+                # 土被り（最初に配置）
+                H = st.number_input(
+                    "土被り H (m)",
+                    min_value=0.0,
+                    max_value=200.0,
+                    value=30.0,
+                    step=5.0,
+                    help="地表面からトンネル天端までの土被りを入力してください"
+                )
             
-            # 切羽高さ
-            H_f = st.number_input(
-                "切羽高さ Hf (m)",
-                min_value=0.1,
-                max_value=50.0,
-                value=10.0,
-                step=0.5,
-                help="トンネル断面の高さを入力してください"
-            )
+                # 切羽高さ
+                H_f = st.number_input(
+                    "切羽高さ Hf (m)",
+                    min_value=0.1,
+                    max_value=50.0,
+                    value=10.0,
+                    step=0.5,
+                    help="トンネル断面の高さを入力してください"
+                )
         
-        with ground_col2:
-            # 地山単位体積重量
-            gamma = st.number_input(
-                "地山の単位体積重量 γ (kN/m³)",
-                min_value=10.0,
-                max_value=30.0,
-                value=20.0,
-                step=0.5,
-                help="地山の単位体積重量を入力してください"
-            )
+            with ground_col2:
+                # 地山単位体積重量
+                gamma = st.number_input(
+                    "地山の単位体積重量 γ (kN/m³)",
+                    min_value=10.0,
+                    max_value=30.0,
+                    value=20.0,
+                    step=0.5,
+                    help="地山の単位体積重量を入力してください"
+                )
             
-            # 地山内部摩擦角
-            phi = st.number_input(
-                "地山の内部摩擦角 φ (度)",
-                min_value=0.0,
-                max_value=60.0,
-                value=30.0,
-                step=1.0,
-                help="地山の内部摩擦角を入力してください"
-            )
+                # 地山内部摩擦角
+                phi = st.number_input(
+                    "地山の内部摩擦角 φ (度)",
+                    min_value=0.0,
+                    max_value=60.0,
+                    value=30.0,
+                    step=1.0,
+                    help="地山の内部摩擦角を入力してください"
+                )
             
-            # 地山粘着力
-            coh = st.number_input(
-                "地山の粘着力 c (kPa)",
-                min_value=0.0,
-                max_value=1000.0,
-                value=20.0,
-                step=5.0,
-                help="地山の粘着力を入力してください（kPa単位）"
-            )
+                # 地山粘着力
+                coh = st.number_input(
+                    "地山の粘着力 c (kPa)",
+                    min_value=0.0,
+                    max_value=1000.0,
+                    value=20.0,
+                    step=5.0,
+                    help="地山の粘着力を入力してください（kPa単位）"
+                )
         
-        # 地盤条件と概念図の間のスペース
-        st.write("")
-        st.write("")
+            # 地盤条件と概念図の間のスペース
+            st.write("")
+            st.write("")
         
-        # 詳細パラメータ
-        st.subheader("詳細パラメータ")
+            # 詳細パラメータ
+            st.subheader("詳細パラメータ")
         
-        with st.expander("係数の設定および探索角度の設定（通常は設定不要）"):
-            st.write("**村山の式に適用する係数の設定**")
-            alpha = st.number_input(
-                "影響幅係数 α",
-                min_value=1.0,
-                max_value=3.0,
-                value=1.8,
-                step=0.1,
-                help="標準値: 1.8（有効幅係数 = α/2 = 0.9）"
-            )
-            
-            K = st.number_input(
-                "経験係数 K",
-                min_value=0.5,
-                max_value=2.0,
-                value=1.0,
-                step=0.1,
-                help="Terzaghi実験による係数（標準値: 1.0、範囲: 1.0～1.5）"
-            )
-            
-            st.write("**探索角度 θd の範囲 (°)**")
-            theta_col1, theta_col2 = st.columns(2)
-            with theta_col1:
-                theta_min = st.number_input(
-                    "最小値",
-                    min_value=10,
-                    max_value=80,
-                    value=20,
-                    step=1,
-                    key="theta_min"
+            with st.expander("係数の設定および探索角度の設定（通常は設定不要）"):
+                st.write("**村山の式に適用する係数の設定**")
+                alpha = st.number_input(
+                    "影響幅係数 α",
+                    min_value=1.0,
+                    max_value=3.0,
+                    value=1.8,
+                    step=0.1,
+                    help="標準値: 1.8（有効幅係数 = α/2 = 0.9）"
                 )
-            with theta_col2:
-                theta_max = st.number_input(
-                    "最大値",
-                    min_value=20,
-                    max_value=90,
-                    value=80,
-                    step=1,
-                    key="theta_max"
+            
+                K = st.number_input(
+                    "経験係数 K",
+                    min_value=0.5,
+                    max_value=2.0,
+                    value=1.0,
+                    step=0.1,
+                    help="Terzaghi実験による係数（標準値: 1.0、範囲: 1.0～1.5）"
                 )
             
-            # 計算点数は自動で決定（1度刻み）
-            n_points = theta_max - theta_min + 1
-            st.write(f"**計算点数**: {n_points} 点（1度刻み）")
+                st.write("**探索角度 θd の範囲 (°)**")
+                theta_col1, theta_col2 = st.columns(2)
+                with theta_col1:
+                    theta_min = st.number_input(
+                        "最小値",
+                        min_value=10,
+                        max_value=80,
+                        value=20,
+                        step=1,
+                        key="theta_min"
+                    )
+                with theta_col2:
+                    theta_max = st.number_input(
+                        "最大値",
+                        min_value=20,
+                        max_value=90,
+                        value=80,
+                        step=1,
+                        key="theta_max"
+                    )
+            
+                # 計算点数は自動で決定（1度刻み）
+                n_points = theta_max - theta_min + 1
+                st.write(f"**計算点数**: {n_points} 点（1度刻み）")
             
-            force_finite_cover = st.checkbox(
-                "有限土被り式を強制的に使用", 
-                value=True,
-                help="チェックすると深部条件（H > 1.5B）でも常に有限土被り式を使用します"
-            )
+                force_finite_cover = st.checkbox(
+                    "有限土被り式を強制的に使用", 
+                    value=True,
+                    help="チェックすると深部条件（H > 1.5B）でも常に有限土被り式を使用します"
+                )
+            
+                use_adaptive = st.checkbox(
+                    "適応的サンプリングでグラフを描画",
+                    value=True,
+                    help="1度刻みの計算（臨界値・安全率・表）に加えて、最大値付近と曲率の大きい区間に評価点を集中させた"
+                         "滑らかなP-θd曲線を描画します（グラフのみ、計算点数は増えます）"
+                )
         
-        # 計算実行ボタンの前にスペースを追加
-        st.write("")  # 1行分のスペース
+            # 計算実行ボタンの前にスペースを追加
+            st.write("")  # 1行分のスペース
         
-        # 計算実行ボタン
-        if st.button("計算の実行", type="primary", use_container_width=True):
-            try:
-                # 計算機インスタンスの作成
-                calculator = MurayamaCalculatorRevised(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover)
+            # 計算実行ボタン
+            if st.button("計算の実行", type="primary", use_container_width=True):
+                try:
+                    inputs = dict(H_f=H_f, gamma=gamma, phi=phi, coh=coh, H=H, alpha=alpha, K=K,
+                                  force_finite_cover=force_finite_cover,
+                                  theta_range=(theta_min, theta_max), theta_step=1.0)
                 
-                # パラメトリックスタディの実行
-                with st.spinner("計算を実行中..."):
-                    results = calculator.parametric_study(
-                        (theta_min, theta_max),
-                        n_points
-                    )
+                    # パラメトリックスタディの実行（結果はメモリ上限つきで保持）
+                    with st.spinner("計算を実行中..."):
+                        _compute_results(inputs, use_adaptive)
+                
+                    # 臨界条件を 1度刻みより細かく段階的に精緻化（バックグラウンド）
+                    st.session_state.anytime_job = _job_manager().submit(
+                        '臨界条件の精緻化', anytime_job, _calculator(inputs), (theta_min, theta_max)).id
                 
-                # 結果をセッション状態に保存
-                st.session_state.results = results
-                st.session_state.calculator = calculator
-                st.session_state.calculated = True
+                    # 入力条件をセッション状態に保存（結果は入力条件から再計算できる）
+                    st.session_state.inputs = inputs
+                    st.session_state.use_adaptive = use_adaptive
+                    st.session_state.calculated = True
                 
-            except ValueError as e:
-                st.error(f"入力エラー: {str(e)}")
-                st.session_state.calculated = False
-            except Exception as e:
-                st.error(f"計算エラー: {str(e)}")
-                st.session_state.calculated = False
+                except ValueError as e:
+                    st.error(f"入力エラー: {str(e)}")
+                    st.session_state.calculated = False
+                except Exception as e:
+                    st.error(f"計算エラー: {str(e)}")
+                    st.session_state.calculated = False
+                else:
+                    # 結果パネルを含めてアプリ全体を再描画
+                    st.rerun()
+        
+        _input_panel()
     
     # spacerカラムは空のまま（自動的にスペースになる）
     
@@ -260,143 +1004,44 @@ with tab1:
         # 80%サイズで表示するため、中央の列に配置
         col_empty1, col_image, col_empty2 = st.columns([1, 4, 1])
         with col_image:
-            st.image("data/image.jpg", use_container_width=True)
+            st.image(_concept_image(), use_container_width=True)
             st.caption("引用元：「トンネル切羽安定に関する調査研究，平成9年12月，(財)高速道路技術センター」p.4")
     
-    # 詳細結果の表示
-    if hasattr(st.session_state, 'calculated') and st.session_state.calculated:
+    # 詳細結果の表示（結果パネル内の操作ではこのフラグメントのみ再実行する）
+    @st.fragment
+    def _results_panel():
         st.markdown("---")
         
-        results = st.session_state.results
+        inputs = st.session_state.inputs
+        results = _session_results()
+        H_f, gamma, phi, coh, H, alpha, K = (inputs[k] for k in ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K'))
+        theta_min, theta_max = inputs['theta_range']
         
         # 安定性の評価結果（簡素化済み）
         
         # 安定性の評価結果
         st.subheader("安定性の評価結果")
         
-        # 1行レイアウトで全ての評価結果を表示
-        col_eval1, col_eval2, col_eval3 = st.columns([1, 1, 1])
-        
-        # 安定性判定の色分け
-        stability_value = results['stability']
-        detailed_stability = results.get('detailed_stability', stability_value)
-        if stability_value == "安定":
-            stability_color_class = "metric-value-safe"
-            emoji_symbol = "😊"
-        else:
-            stability_color_class = "metric-value-danger"
-            emoji_symbol = "😰"
-        
-        # 必要切羽押え力の色分け
-        max_p = results['max_P']
-        if max_p <= 50:
-            p_color_class = "metric-value-safe"
-        elif max_p <= 100:
-            p_color_class = "metric-value-warning"
-        else:
-            p_color_class = "metric-value-danger"
-        
-        # 安全率の色分け
-        sf = results['safety_factor']
-        if sf == float('inf') or sf >= 1.5:
-            sf_color_class = "metric-value-safe"
-        elif sf >= 1.0:
-            sf_color_class = "metric-value-warning"
-        else:
-            sf_color_class = "metric-value-danger"
-        
-        with col_eval1:
-            # 安定性評価の表示
-            st.markdown(
-                f"""
-                <div class="custom-metric-card">
-                    <div class="metric-label">🏗️ 安定性判定</div>
-                    <div class="metric-value {stability_color_class}">
-                        {stability_value} {emoji_symbol}
-                    </div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        
-        with col_eval2:
-            st.markdown(
-                f"""
-                <div class="custom-metric-card">
-                    <div class="metric-label">💪 必要切羽押え力P (kN/m²)</div>
-                    <div class="metric-value {p_color_class}">
-                        {results['max_P']:.2f}
-                    </div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        
-        with col_eval3:
-            # 安全率の表示（無限大の場合は特別な表示）
-            if results['safety_factor'] == float('inf'):
-                sf_display = "∞"
-            else:
-                sf_display = f"{results['safety_factor']:.2f}"
-            
-            st.markdown(
-                f"""
-                <div class="custom-metric-card">
-                    <div class="metric-label">🛡️ 安全率</div>
-                    <div class="metric-value {sf_color_class}">
-                        {sf_display}
-                    </div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
+        # 段階的な精緻化の結果が届くたびに評価結果を更新する
+        refine_job = _job_manager().get(st.session_state.get('anytime_job', ''))
+        refine_polling = refine_job is not None and not refine_job.finished
+        st.fragment(_evaluation_panel, run_every=0.3 if refine_polling else None)(results, refine_polling)
         
         st.subheader("詳細計算結果")
         
         results_tab1, results_tab2, results_tab3 = st.tabs(["計算結果", "結果出力", "安全率計算"])
         
         with results_tab1:
-            # 必要切羽押え力の分布グラフ
-            fig = go.Figure()
-            
-            # theta_valuesを取得
-            theta_values = results.get('theta_degrees', [])
-            
-            # P値の抽出
-            if results.get('detailed_results') and len(results['detailed_results']) > 0:
-                P_values = [r.get('P_kN_m2', 0) for r in results['detailed_results']]
-            else:
-                P_values = []
-            
-            fig.add_trace(go.Scatter(
-                x=theta_values,
-                y=P_values,
-                mode='lines+markers',
-                name='必要切羽押え力',
-                line=dict(width=2)
-            ))
-            
-            # 最大値の位置にマーカーを追加（旗揚げ付き）
-            fig.add_trace(go.Scatter(
-                x=[results['critical_theta_deg']],
-                y=[results['max_P']],
-                mode='markers+text',
-                marker=dict(size=15, color='red', symbol='x'),
-                name='必要押え力(最大)点',
-                text=[f"必要押え力(最大)点<br>θd = {results['critical_theta_deg']:.1f}°<br>P = {results['max_P']:.2f} kN/m²"],
-                textposition="top center",
-                textfont=dict(size=12, color='red'),
-                showlegend=True
-            ))
-            
-            fig.update_layout(
-                title="探索角度θdと必要切羽押え力Pの関係",
-                xaxis_title="探索角度 θd (度)",
-                yaxis_title="必要切羽押え力 P (kN/m²)",
-                height=500
-            )
-            
+            # 必要切羽押え力の分布グラフ（計算結果ごとに1回だけ作成）
+            fig = _render_cached('pressure_figure', _pressure_figure, results)
             st.plotly_chart(fig, use_container_width=True)
+            
+            # 細かい刻みの掃引はバックグラウンドで実行（画面は操作可能なまま進捗を表示）
+            st.write("**詳細掃引（バックグラウンド計算）**")
+            fine_job = _job_manager().get(st.session_state.get('fine_sweep_job', ''))
+            fine_polling = fine_job is not None and not fine_job.finished
+            st.fragment(_fine_sweep_panel, run_every=0.5 if fine_polling else None)(
+                _calculator(inputs), (theta_min, theta_max), fine_polling)
         
         with results_tab2:
             # 2列レイアウトで表示
@@ -431,90 +1076,9 @@ with tab1:
                 st.table(pd.DataFrame(summary_data))
             
             
-            # 全角度範囲での詳細な計算結果を生成
-            calculator = st.session_state.calculator
-            theta_range = (theta_min, theta_max)
-            
-            # 全角度での計算結果を取得
-            all_results = []
-            for theta_deg in range(theta_min, theta_max + 1):
-                theta_rad = np.radians(theta_deg)
-                try:
-                    result = calculator.calculate_support_pressure(theta_rad)
-                    if result['valid']:
-                        geom = result['geometry']
-                        all_results.append({
-                            'theta_deg': theta_deg,
-                            'theta_rad': theta_rad,
-                            'r0_m': geom['r0'],
-                            'rd_m': geom['rd'],
-                            'B_m': geom['B'],
-                            'la_m': geom['la'],
-                            'lp_m': geom['lp'],
-                            'q_kN_m2': result['q'],
-                            'Wf_kN': result['Wf'],
-                            'lw_m': result['lw'],
-                            'Mc_kNm': result['Mc'],
-                            'P_kN_m2': result['P']
-                        })
-                except:
-                    continue
-            
-            # DataFrameを作成
-            df_all_results = pd.DataFrame(all_results)
-            
-            # プレビュー用のDataFrame（既存のresultsから）
-            df_detailed = pd.DataFrame(results['detailed_results'])
-            
-            # カラム名を日本語に変更
-            column_names = {
-                'theta_deg': '探索角度θd (度)',
-                'theta_rad': '探索角度θd (rad)',
-                'r0_m': '初期半径r0 (m)',
-                'rd_m': '終端半径rd (m)',
-                'B_m': '水平投影幅B (m)',
-                'la_m': '距離la (m)',
-                'lp_m': '支保圧作用腕lp (m)',
-                'q_kN_m2': '等価合力q (kN/m²)',
-                'Wf_kN': '自重Wf (kN)',
-                'lw_m': '自重作用点lw (m)',
-                'Mc_kNm': '粘着抵抗モーメントMc (kN·m)',
-                'P_kN_m2': '必要切羽押え力P (kN/m²)'
-            }
-            df_detailed_jp = df_detailed.rename(columns=column_names)
-            df_all_results_jp = df_all_results.rename(columns=column_names)
-            
-            # CSV変換（全結果）
-            csv_buffer = io.StringIO()
-            
-            # 入力パラメータセクション
-            csv_buffer.write("## 入力パラメータ\n")
-            csv_buffer.write("パラメータ,値\n")
-            csv_buffer.write(f"切羽高さ Hf,{H_f} m\n")
-            csv_buffer.write(f"地山の単位体積重量 γ,{gamma} kN/m³\n")
-            csv_buffer.write(f"地山の内部摩擦角 φ,{phi}°\n")
-            csv_buffer.write(f"地山の粘着力 c,{coh} kPa\n")
-            csv_buffer.write(f"土被り H,{H} m\n" if H is not None else "土被り H,深部前提\n")
-            csv_buffer.write(f"影響幅係数 α,{alpha}\n")
-            csv_buffer.write(f"経験係数 K,{K}\n")
-            csv_buffer.write("\n")
-            
-            # 計算結果サマリーセクション
-            csv_buffer.write("## 計算結果サマリー\n")
-            csv_buffer.write("項目,値\n")
-            csv_buffer.write(f"必要押え力(最大),{results['max_P']:.2f} kN/m²\n")
-            csv_buffer.write(f"臨界探索角度 θd,{results['critical_theta_deg']:.1f}°\n")
-            csv_buffer.write(f"対応する初期半径 r₀,{results['critical_r0']:.2f} m\n")
-            csv_buffer.write(f"水平投影幅 B,{results['critical_geometry']['B']:.2f} m\n")
-            safety_factor_str = "∞" if results['safety_factor'] == float('inf') else f"{results['safety_factor']:.2f}"
-            csv_buffer.write(f"安全率,{safety_factor_str}\n")
-            csv_buffer.write(f"安定性評価,{results['stability']}\n")
-            csv_buffer.write("\n")
-            
-            # 詳細計算結果セクション
-            csv_buffer.write("## 詳細計算結果\n")
-            df_all_results_jp.to_csv(csv_buffer, index=False)
-            csv = csv_buffer.getvalue().encode('utf-8-sig')
+            # 全角度範囲での詳細な計算結果とCSV（計算結果ごとに1回だけ作成）
+            csv, df_detailed, df_detailed_jp = _render_cached(
+                'results_csv', _results_csv, results, inputs, _calculator(inputs))
             
             # プレビュー表示（臨界角度±10データポイント）
             st.write("**データプレビュー（臨界角度θd周辺±10データポイント）**")
@@ -574,60 +1138,8 @@ with tab1:
             if results.get('true_safety_factor_result'):
                 sf_result = results['true_safety_factor_result']
                 
-                # データの準備
-                eval_points = sf_result['evaluation_points']
-                
-                # evaluation_pointsは既に安全率でソートされている
-                data_points = eval_points
-                
-                # ソート済みデータから各リストを作成
-                safety_factors = [d['safety_factor'] for d in data_points]
-                pressures = [d['P'] for d in data_points]
-                coh_values = [d['coh'] for d in data_points]
-                phi_values = [d['phi_deg'] for d in data_points]
-                
-                # グラフの作成
-                fig_sf = go.Figure()
-                
-                # 必要切羽押え力の曲線
-                fig_sf.add_trace(go.Scatter(
-                    x=safety_factors,
-                    y=pressures,
-                    mode='lines+markers',
-                    name='必要切羽押え力',
-                    line=dict(width=3, color='blue'),
-                    marker=dict(size=6)
-                ))
-                
-                # ゼロラインの追加
-                fig_sf.add_hline(y=0, line_dash="dash", line_color="red", 
-                               annotation_text="P = 0 (自立限界)")
-                
-                # 元の強度での点（現在の状態）
-                fig_sf.add_trace(go.Scatter(
-                    x=[sf_result['safety_factor']],
-                    y=[sf_result['original_P']],
-                    mode='markers+text',
-                    marker=dict(size=12, color='green', symbol='circle'),
-                    name='現在の状態',
-                    text=[f"P = {sf_result['original_P']:.2f} kN/m²"],
-                    textposition="top center"
-                ))
-                
-                # 安全率 = 1.0 の縦線を追加
-                fig_sf.add_vline(x=1.0, line_dash="dot", line_color="gray",
-                               annotation_text="安全率 = 1.0")
-                
-                fig_sf.update_layout(
-                    title="安全率と必要切羽押え力の関係",
-                    xaxis_title="安全率",
-                    yaxis_title="必要切羽押え力 P (kN/m²)",
-                    height=500,
-                    xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10]),
-                    yaxis=dict(autorange='reversed'),
-                    showlegend=True
-                )
-                
+                fig_sf, fig_coh, fig_phi, df_sf = _render_cached(
+                    'safety_factor_figures', _safety_factor_figures, sf_result)
                 st.plotly_chart(fig_sf, use_container_width=True)
                 
                 # 強度パラメータの変化
@@ -635,61 +1147,13 @@ with tab1:
                 
                 # 2つのグラフを並べて表示
                 col_graph1, col_graph2 = st.columns(2)
-                
                 with col_graph1:
-                    # 粘着力の変化
-                    fig_coh = go.Figure()
-                    fig_coh.add_trace(go.Scatter(
-                        x=safety_factors,
-                        y=coh_values,
-                        mode='lines+markers',
-                        name='粘着力',
-                        line=dict(width=2, color='orange')
-                    ))
-                    fig_coh.add_vline(x=sf_result['safety_factor'], 
-                                    line_dash="dash", line_color="red")
-                    fig_coh.add_vline(x=1.0, line_dash="dot", line_color="gray")
-                    fig_coh.update_layout(
-                        title="粘着力の変化",
-                        xaxis_title="安全率",
-                        yaxis_title="粘着力 coh (kPa)",
-                        height=300,
-                        xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10])
-                    )
                     st.plotly_chart(fig_coh, use_container_width=True)
-                
                 with col_graph2:
-                    # 内部摩擦角の変化
-                    fig_phi = go.Figure()
-                    fig_phi.add_trace(go.Scatter(
-                        x=safety_factors,
-                        y=phi_values,
-                        mode='lines+markers',
-                        name='内部摩擦角',
-                        line=dict(width=2, color='green')
-                    ))
-                    fig_phi.add_vline(x=sf_result['safety_factor'], 
-                                    line_dash="dash", line_color="red")
-                    fig_phi.add_vline(x=1.0, line_dash="dot", line_color="gray")
-                    fig_phi.update_layout(
-                        title="内部摩擦角の変化",
-                        xaxis_title="安全率",
-                        yaxis_title="内部摩擦角 φ (度)",
-                        height=300,
-                        xaxis=dict(range=[0, max(safety_factors) * 1.1] if max(safety_factors) < float('inf') else [0, 10])
-                    )
                     st.plotly_chart(fig_phi, use_container_width=True)
                 
                 # 詳細データの表示
                 with st.expander("計算詳細データ"):
-                    # DataFrameの作成
-                    df_sf = pd.DataFrame({
-                        '安全率': safety_factors,
-                        '粘着力 (kPa)': coh_values,
-                        '内部摩擦角 (度)': phi_values,
-                        '必要切羽押え力 (kN/m²)': pressures
-                    })
-                    
                     # 臨界点の行を強調
                     def highlight_critical(row):
                         if abs(row['安全率'] - sf_result['safety_factor']) < 0.01:
@@ -701,6 +1165,26 @@ with tab1:
             
             else:
                 st.warning("安全率の計算結果がありません。解析を実行してください。")
+    
+    if hasattr(st.session_state, 'calculated') and st.session_state.calculated:
+        _results_panel()
+
+
+with tab_batch:
+    # ケースファイルの多数の区間を一括計算（バックグラウンド、画面は操作可能なまま進捗を表示）
+    st.subheader("ケースファイルの一括計算")
+    batch = _job_manager().get(st.session_state.get('batch_job', ''))
+    batch_polling = batch is not None and not batch.finished
+    st.fragment(_batch_panel, run_every=0.5 if batch_polling else None)(batch_polling)
+
+
+with tab_scenario:
+    # 名前つきの条件の組を一括計算し、P–θd 曲線と安全率を重ねて比較
+    st.subheader("シナリオ比較")
+    st.write("表の行を追加・編集すると、条件を変更したシナリオのみ再計算します。")
+    st.fragment(_scenario_panel)(st.session_state.inputs['theta_range'] if 'inputs' in st.session_state
+                                 else (20, 80))
+
 
 with tab2:
     # 技術情報ページ
@@ -830,6 +1314,13 @@ with tab3:
     - coh: 20～40 kPa
     """)
 
+# セッションのメモリ使用量（計算結果・図・ケースの保持量。上限を超えると古いものから退避・破棄する）
+memory_usage = _session_memory().usage(_session_id())
+memory_total = _session_memory().total()
+st.caption(f"セッションのメモリ使用量: {memory_usage['bytes'] / 1024:.0f} KB"
+           f"（上限 {_session_memory().session_bytes / 2**20:.0f} MB、退避中 {memory_usage['spilled']} 件）"
+           f"／サーバー全体: {memory_total['bytes'] / 2**20:.1f} MB（{memory_total['sessions']} セッション）")
+
 # フッター
 st.markdown("---")
 st.markdown(
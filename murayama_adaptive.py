@@ -0,0 +1,191 @@
+"""
+θd の適応的サンプリング
+粗い等間隔グリッドから開始し、曲率と現在の最大値への近さに応じて区間を細分する
+"""
+
+import numpy as np
+from scipy.optimize import brentq
+from typing import Dict, Any, List
+
+from murayama_vectorized import evaluate_support_pressure
+
+
+# 有効とみなす水平投影幅の下限 [m]（calculate_support_pressure と同じ）
+B_MIN = 0.1
+
+
+def projected_width(calculator, theta_d: np.ndarray) -> np.ndarray:
+    """
+    水平投影幅 B(θd) の閉形式
+
+    B = H_f·(cosφ - e·cos(φ+θd)) / (e·sin(φ+θd) - sinφ)、e = exp(θd·tanφ)
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_d: 探索角度 [ラジアン]
+
+    Returns:
+        水平投影幅 B [m]
+    """
+    phi = calculator.phi
+    e = np.exp(theta_d * np.tan(phi))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return calculator.H_f * (np.cos(phi) - e * np.cos(phi + theta_d)) / (e * np.sin(phi + theta_d) - np.sin(phi))
+
+
+def find_validity_boundaries(calculator, theta_min: float, theta_max: float,
+                             n_scan: int = 181) -> List[float]:
+    """
+    B(θd) = 0.1 となる有効範囲の境界角度を求める
+
+    B(θd) の閉形式を走査して符号変化を括り出し、brentq で求根する。
+    閉合式の分母の極（B の発散点）による見かけの符号変化は除外する。
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_min: 探索角度の下限 [ラジアン]
+        theta_max: 探索角度の上限 [ラジアン]
+        n_scan: 符号変化の走査点数
+
+    Returns:
+        境界角度のリスト [ラジアン]
+    """
+    theta = np.linspace(theta_min, theta_max, n_scan)
+    g = projected_width(calculator, theta) - B_MIN
+    boundaries = []
+    for i in range(n_scan - 1):
+        if not (np.isfinite(g[i]) and np.isfinite(g[i + 1])) or np.sign(g[i]) == np.sign(g[i + 1]):
+            continue
+        root = brentq(lambda t: float(projected_width(calculator, t)) - B_MIN, theta[i], theta[i + 1],
+                      xtol=1e-12)
+        if abs(float(projected_width(calculator, root)) - B_MIN) < 1e-6:
+            boundaries.append(root)
+    return boundaries
+
+
+def adaptive_sweep(calculator, theta_range: tuple = (20, 80), coarse_step: float = 5.0,
+                   tol_deg: float = 0.01, smooth_rtol: float = 0.002,
+                   max_evaluations: int = 400) -> Dict[str, Any]:
+    """
+    適応的な θd 掃引による臨界支保圧の探索
+
+    1. 粗いグリッド（coarse_step 刻み）と B = 0.1 の境界角度で評価
+    2. 以下の区間を二分し、新しい中点をまとめてベクトル評価する
+       - 区間内に現在の最大値を超える P が存在し得る区間（最大値への近さ）
+       - 曲率から見積もった線形補間誤差が smooth_rtol·(P の変動幅) を超える区間（グラフの滑らかさ）
+       - 有効点と無効点に挟まれた区間（有効範囲の端）
+    3. いずれの区間も tol_deg 以下になるか、評価点数が上限に達したら終了
+       （上限で全区間を細分できない場合は、最大値を含み得る区間（端点の P の大きい順）、有効範囲の端、
+       補間誤差の大きい区間の順に優先する）
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_range: 探索角度範囲 [度] (min, max)
+        coarse_step: 初期グリッドの刻み [度]
+        tol_deg: 区間幅の下限（臨界角度の精度） [度]
+        smooth_rtol: 線形補間誤差の許容値（P の変動幅に対する比）
+        max_evaluations: 評価点数の上限
+
+    Returns:
+        結果の辞書
+        - theta_d, theta_d_deg: 評価した角度（昇順、非等間隔）
+        - P, valid: 各角度の支保圧と有効フラグ（無効な角度の P は NaN）
+        - max_P, critical_theta_d, critical_theta_d_deg: 臨界条件
+        - theta_bracket_deg: 臨界角度を含む区間 [度] (下限, 上限)
+        - validity_boundaries_deg: B = 0.1 の境界角度 [度]
+        - n_evaluations: 評価点数
+        - converged: 細分の条件を満たす区間がなくなって終了したか（False は評価点数の上限で打ち切り）
+    """
+    theta_min, theta_max = np.radians(theta_range[0]), np.radians(theta_range[1])
+    tol = np.radians(tol_deg)
+
+    # 初期点：粗いグリッド + 有効範囲の境界（有効側へわずかにずらす）
+    n_coarse = max(2, int(np.ceil((theta_range[1] - theta_range[0]) / coarse_step)) + 1)
+    theta = np.linspace(theta_min, theta_max, n_coarse)
+    boundaries = find_validity_boundaries(calculator, theta_min, theta_max)
+    shifted = []
+    for tb in boundaries:
+        eps = 1e-9 if projected_width(calculator, tb + 1e-6) > B_MIN else -1e-9
+        if theta_min <= tb + eps <= theta_max:
+            shifted.append(tb + eps)
+    theta = np.unique(np.concatenate([theta, shifted]))
+
+    res = evaluate_support_pressure(calculator, theta)
+    P, valid = res['P'], res['valid']
+    converged = False
+
+    while theta.size < max_evaluations:
+        width = np.diff(theta)
+        splittable = width > tol
+        if not splittable.any():
+            converged = True
+            break
+
+        both = valid[:-1] & valid[1:]
+
+        # 有効範囲の端
+        edge = (valid[:-1] ^ valid[1:]) & splittable
+        peak = np.zeros(width.size, dtype=bool)
+        smooth = np.zeros(width.size, dtype=bool)
+        upper_bound = chord_error = np.zeros(width.size)
+
+        if valid.any():
+            P_valid = P[valid]
+            P_max = P_valid.max()
+            P_span = max(P_max - P_valid.min(), 1e-12)
+
+            # 各点の2階微分（不等間隔差分）から区間ごとの線形補間誤差 |f''|·h²/8 を見積もる
+            curvature = np.zeros(theta.size)
+            with np.errstate(invalid='ignore'):
+                slope = np.diff(P) / width
+                curvature[1:-1] = 2.0 * np.abs(np.diff(slope)) / (width[:-1] + width[1:])
+            curvature[~np.isfinite(curvature)] = 0.0
+            chord_error = np.maximum(curvature[:-1], curvature[1:]) * width**2 / 8.0
+
+            upper_bound = np.fmax(P[:-1], P[1:]) + chord_error
+            peak = both & (upper_bound >= P_max) & splittable
+            smooth = both & (chord_error > smooth_rtol * P_span) & splittable
+
+        if not (peak.any() or edge.any() or smooth.any()):
+            converged = True
+            break
+
+        # 評価点数の上限に収まる分だけ、最大値を含み得る区間・有効範囲の端・補間誤差の大きい区間の順に細分する
+        peak_idx = np.flatnonzero(peak)
+        smooth_idx = np.flatnonzero(smooth)
+        candidates = np.concatenate([peak_idx[np.argsort(-np.fmax(P[peak_idx], P[peak_idx + 1]), kind='stable')],
+                                     np.flatnonzero(edge),
+                                     smooth_idx[np.argsort(-chord_error[smooth_idx], kind='stable')]])
+        _, first = np.unique(candidates, return_index=True)
+        idx = np.sort(candidates[np.sort(first)][:max_evaluations - theta.size])
+        new_theta = 0.5 * (theta[idx] + theta[idx + 1])
+        new = evaluate_support_pressure(calculator, new_theta)
+
+        order = np.argsort(np.concatenate([theta, new_theta]), kind='stable')
+        theta = np.concatenate([theta, new_theta])[order]
+        P = np.concatenate([P, new['P']])[order]
+        valid = np.concatenate([valid, new['valid']])[order]
+
+    result = {
+        'theta_d': theta,
+        'theta_d_deg': np.degrees(theta),
+        'P': P,
+        'valid': valid,
+        'validity_boundaries_deg': [float(np.degrees(tb)) for tb in boundaries],
+        'n_evaluations': int(theta.size),
+        'converged': converged,
+    }
+    if not valid.any():
+        result.update({'max_P': np.nan, 'critical_theta_d': np.nan, 'critical_theta_d_deg': np.nan,
+                       'theta_bracket_deg': (np.nan, np.nan)})
+        return result
+
+    i = int(np.argmax(np.where(valid, P, -np.inf)))
+    lo, hi = max(i - 1, 0), min(i + 1, theta.size - 1)
+    result.update({
+        'max_P': float(P[i]),
+        'critical_theta_d': float(theta[i]),
+        'critical_theta_d_deg': float(np.degrees(theta[i])),
+        'theta_bracket_deg': (float(np.degrees(theta[lo])), float(np.degrees(theta[hi]))),
+    })
+    return result
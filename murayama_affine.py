@@ -0,0 +1,178 @@
+"""
+支保圧 P の γ・c に関するアフィン分解
+φ, H_f, H, α, K を固定すると P(θd) = γ·A(θd) + c·C(θd) と書けることを利用し、
+任意の (γ, c) に対する最大Pと粘着力のみの強度低減安全率を O(n_theta) 以下で再評価する
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional
+
+from murayama_vectorized import ArrayLike, SweepPlan, theta_grid
+
+
+class AffinePressureModel:
+    """
+    P(θd) = γ·A(θd) + c·C(θd) の係数配列を保持するモデル
+
+    - Wf, w1, w2 は γ に比例し、lw は γ に依存しない → Wf·lw は γ に比例
+    - Mc は c に比例
+    - q = (αBγ - 2c)/(2K·tanφ)·[1 - exp(...)] は γ と c の1次式
+    A は (γ=1, c=0)、C は (γ=0, c=1) で掃引すれば得られる。無効な角度の係数は NaN。
+    """
+
+    def __init__(self, H_f: float, phi: float, H: Optional[float] = None, alpha: float = 1.8,
+                 K: float = 1.0, force_finite_cover: bool = False,
+                 theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                 theta_values: Optional[np.ndarray] = None):
+        """
+        係数配列の事前計算
+
+        Args:
+            H_f: 切羽高さ [m]
+            phi: 地山内部摩擦角 [度]
+            H: 土被り [m] (Noneの場合は深部前提)
+            alpha: 影響幅係数
+            K: 経験係数
+            force_finite_cover: 有限土被り式を強制的に使用するフラグ
+            theta_range: 探索角度範囲 [度] (min, max)
+            theta_step: 角度刻み [度]
+            theta_values: 探索角度の配列 [ラジアン]（指定時は theta_range/theta_step より優先）
+        """
+        self.H_f = H_f
+        self.phi_deg = phi
+        self.H = H
+        self.alpha = alpha
+        self.K = K
+        self.force_finite_cover = force_finite_cover
+
+        if theta_values is None:
+            theta_values = theta_grid(theta_range, theta_step)
+        plan = SweepPlan(theta_values, batch_size=2)
+        res = plan.execute(H_f, np.array([1.0, 0.0]), phi, np.array([0.0, 1.0]), H, alpha, K,
+                           force_finite_cover)
+
+        self.theta_d = plan.theta_d
+        self.theta_d_deg = plan.theta_d_deg
+        self.valid = res['valid'][0] & res['valid'][1]
+        self.A = np.where(self.valid, res['P'][0], np.nan)
+        self.C = np.where(self.valid, res['P'][1], np.nan)
+        # 係数行列 [A; C]（(γ, c) との内積で P を得る）
+        self.coefficients = np.vstack([self.A, self.C])
+
+        # 粘着力のみの強度低減安全率の係数 κ（FS = (c/γ)·κ）
+        self.cohesion_sf_coefficient = self._cohesion_sf_coefficient()
+
+    @classmethod
+    def from_calculator(cls, calculator, theta_range: tuple = (20, 80),
+                        theta_step: float = 1.0) -> 'AffinePressureModel':
+        """
+        計算機インスタンスの φ, H_f, H, α, K からモデルを作成
+
+        Args:
+            calculator: MurayamaCalculatorRevised のインスタンス
+            theta_range: 探索角度範囲 [度] (min, max)
+            theta_step: 角度刻み [度]
+
+        Returns:
+            アフィン分解モデル
+        """
+        return cls(calculator.H_f, calculator.phi_deg, calculator.H, calculator.alpha,
+                   calculator.K, calculator.force_finite_cover, theta_range, theta_step)
+
+    def pressure(self, gamma: ArrayLike, coh: ArrayLike) -> np.ndarray:
+        """
+        全角度の支保圧 P = γ·A + c·C
+
+        Args:
+            gamma: 地山単位体積重量 [kN/m³]（スカラーまたは長さmの配列）
+            coh: 地山粘着力 [kPa]（スカラーまたは長さmの配列）
+
+        Returns:
+            支保圧 (n_theta,) またはケースごと (m, n_theta)（無効な角度は NaN）
+        """
+        if np.ndim(gamma) == 0 and np.ndim(coh) == 0:
+            return gamma * self.A + coh * self.C
+        weights = np.column_stack(np.broadcast_arrays(np.asarray(gamma, dtype=float),
+                                                      np.asarray(coh, dtype=float)))
+        return weights @ self.coefficients
+
+    def max_pressure(self, gamma: ArrayLike, coh: ArrayLike,
+                     chunk_size: int = 4096) -> Dict[str, Any]:
+        """
+        (γ, c) の組ごとの最大支保圧と臨界角度
+
+        Args:
+            gamma: 地山単位体積重量 [kN/m³]（スカラーまたは長さmの配列）
+            coh: 地山粘着力 [kPa]（スカラーまたは長さmの配列）
+            chunk_size: 一度に展開する組数（メモリ使用量の上限）
+
+        Returns:
+            結果の辞書 (max_P, critical_index, critical_theta_d, critical_theta_d_deg)。
+            スカラー入力の場合は各値もスカラー
+        """
+        scalar = np.ndim(gamma) == 0 and np.ndim(coh) == 0
+        g, c = np.broadcast_arrays(np.atleast_1d(np.asarray(gamma, dtype=float)),
+                                   np.atleast_1d(np.asarray(coh, dtype=float)))
+        m = g.size
+        max_P = np.full(m, np.nan)
+        critical_index = np.full(m, -1, dtype=np.intp)
+
+        if self.valid.any():
+            A, C = self.A[self.valid], self.C[self.valid]
+            valid_index = np.flatnonzero(self.valid)
+            for start in range(0, m, chunk_size):
+                sl = slice(start, min(start + chunk_size, m))
+                P = np.multiply.outer(g[sl], A)
+                P += np.multiply.outer(c[sl], C)
+                j = np.argmax(P, axis=1)
+                critical_index[sl] = valid_index[j]
+                max_P[sl] = P[np.arange(j.size), j]
+
+        critical_theta_d = np.where(critical_index >= 0, self.theta_d[critical_index], np.nan)
+        result = {
+            'max_P': max_P,
+            'critical_index': critical_index,
+            'critical_theta_d': critical_theta_d,
+            'critical_theta_d_deg': np.degrees(critical_theta_d),
+        }
+        if scalar:
+            result = {k: v[0].item() for k, v in result.items()}
+        return result
+
+    def _cohesion_sf_coefficient(self) -> float:
+        """
+        粘着力のみを c' = c/F と低減する場合の安全率係数 κ
+
+        各角度で P = γA + (c/F)·C = 0 となる F は F = (c/γ)·(-C/A)（A > 0, C < 0 の場合）。
+        全角度の最大Pが0となる F はその最小値であり、κ = min(-C/A) は (γ, c) に依存しない。
+        - A ≤ 0 かつ C ≤ 0 の角度は F によらず P ≤ 0（寄与なし）
+        - A > 0 かつ C ≥ 0 の角度は c をいくら増やしても P > 0 → κ = 0
+        - A > 0 の角度がなければ κ = ∞
+        """
+        A, C = self.A[self.valid], self.C[self.valid]
+        driving = A > 0
+        if not driving.any():
+            return float('inf')
+        if (C[driving] >= 0).any():
+            return 0.0
+        return float(np.min(-C[driving] / A[driving]))
+
+    def cohesion_safety_factor(self, gamma: ArrayLike, coh: ArrayLike) -> ArrayLike:
+        """
+        粘着力のみの強度低減安全率（閉形式） FS = (c/γ)·κ
+
+        φ は低減しない。calculate_true_safety_factor（c と tanφ を同率で低減）とは定義が異なる。
+
+        Args:
+            gamma: 地山単位体積重量 [kN/m³]（スカラーまたは配列）
+            coh: 地山粘着力 [kPa]（スカラーまたは配列）
+
+        Returns:
+            安全率（∞: どの角度でも P ≤ 0、0: 粘着力によらず P > 0）
+        """
+        kappa = self.cohesion_sf_coefficient
+        with np.errstate(invalid='ignore'):
+            fs = np.divide(coh, gamma) * kappa
+        if np.isinf(kappa):
+            fs = np.full(np.shape(fs), np.inf)
+        return fs.item() if np.ndim(fs) == 0 else fs
@@ -0,0 +1,265 @@
+"""
+臨界支保圧の段階的（anytime）評価
+粗いグリッド（既定 5° 刻み）の結果をすぐに返し、臨界角度の周辺を段階的に細かく評価して
+改善した結果を順次返す。許容誤差・期限・評価点数の上限のいずれかに達したら終了する。
+結果には臨界角度と安全率を含む区間（精度の保証）と評価点数を付ける。
+"""
+
+import math
+import time
+import numpy as np
+from typing import Dict, Any, Iterator, Optional
+
+from murayama_vectorized import evaluate_support_pressure
+from murayama_numba import case_pressure, SF_LOWER, SF_UPPER, SF_TOLERANCE, SF_MAX_EXPAND, SF_MAX_ITERATIONS
+
+
+def _stability(max_P: float) -> str:
+    """安定性の評価（P値のみで判定、find_critical_pressure と同じ）"""
+    return "安定" if max_P <= 0 else "不安定"
+
+
+def bounded_safety_factor(calculator, theta_d: float, tolerance: float = SF_TOLERANCE,
+                          deadline: Optional[float] = None,
+                          max_evaluations: Optional[int] = None) -> Dict[str, Any]:
+    """
+    評価点数・期限つきの強度低減安全率（calculate_true_safety_factor と同じ括り出し・二分探索）
+
+    P(F) は低減係数 F について増加するため、P ≤ 0 となった最大の F と P > 0 となった最小の F で
+    安全率を挟む区間が確定する（幾何が不適切で P が NaN の点は区間の確定に使わない）。
+    予算内に収束しなかった場合は、区間が閉じていればその中点、閉じていなければ下限（安全側）を返す
+    （下限も得られていなければ NaN）。
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス（変更しない）
+        theta_d: 評価角度 [ラジアン]
+        tolerance: 二分探索の収束幅
+        deadline: 期限（time.monotonic() の値）
+        max_evaluations: 支保圧の評価回数の上限
+
+    Returns:
+        結果の辞書
+        - safety_factor: 安全率（収束時は calculate_true_safety_factor と同じ値）
+        - safety_factor_bracket: 安全率を含む区間 (下限, 上限)（上限は inf のことがある）
+        - n_evaluations: 評価回数、converged: 予算内に収束したか
+    """
+    args = (calculator.H_f, calculator.gamma, calculator.coh, math.inf if calculator.H is None else calculator.H,
+            calculator.alpha, calculator.K, calculator.force_finite_cover)
+    tan_phi = math.tan(calculator.phi)
+    bracket = [0.0, math.inf]
+    n = 0
+
+    def exhausted():
+        return ((max_evaluations is not None and n >= max_evaluations)
+                or (deadline is not None and time.monotonic() >= deadline))
+
+    def evaluate(factor):
+        nonlocal n
+        n += 1
+        H_f, gamma, coh, H, alpha, K, force_finite_cover = args
+        P = case_pressure(theta_d, H_f, gamma, math.atan(tan_phi / factor), coh / factor,
+                          H, alpha, K, force_finite_cover)
+        if P <= 0.0:
+            bracket[0] = max(bracket[0], factor)
+        elif P > 0.0:
+            bracket[1] = min(bracket[1], factor)
+        return P
+
+    def result(safety_factor, converged):
+        return {'safety_factor': safety_factor, 'safety_factor_bracket': tuple(bracket),
+                'n_evaluations': n, 'converged': converged}
+
+    def partial():
+        lower, upper = bracket
+        if math.isfinite(upper):
+            return result((lower + upper) / 2, False)
+        return result(lower if lower > 0 else math.nan, False)
+
+    # 初期括り出し: P(lower) と P(upper) が異符号になるまで範囲を拡張
+    lower, upper = SF_LOWER, SF_UPPER
+    if exhausted():
+        return partial()
+    P_lower = evaluate(lower)
+    if exhausted():
+        return partial()
+    P_upper = evaluate(upper)
+
+    def same_side():
+        return math.isnan(P_lower) or math.isnan(P_upper) or np.sign(P_lower) == np.sign(P_upper)
+
+    for _ in range(SF_MAX_EXPAND):
+        if not same_side():
+            break
+        if math.isnan(P_upper) or P_upper <= 0.0:
+            if exhausted():
+                return partial()
+            upper *= 2.0
+            P_upper = evaluate(upper)
+        if math.isnan(P_lower) or P_lower > 0.0:
+            if exhausted():
+                return partial()
+            lower /= 2.0
+            P_lower = evaluate(lower)
+
+    if same_side():
+        # 常に安定（P<=0）の場合は安全率→∞、常に不安定の場合は0
+        return result(math.inf if (P_lower <= 0 and P_upper <= 0) else 0.0, True)
+
+    # 二分探索
+    iteration = 0
+    while upper - lower > tolerance and iteration < SF_MAX_ITERATIONS:
+        if exhausted():
+            return result((upper + lower) / 2, False)
+        factor = (upper + lower) / 2
+        P = evaluate(factor)
+        if math.isnan(P):
+            if factor < 1.0:
+                lower = factor
+            else:
+                upper = factor
+        elif P > 0:
+            upper = factor
+        else:
+            lower = factor
+        iteration += 1
+    return result((upper + lower) / 2, True)
+
+
+def anytime_critical_pressure(calculator, theta_range: tuple = (20, 80), coarse_step: float = 5.0,
+                              refine_ratio: int = 5, tol_deg: float = 0.01,
+                              deadline: Optional[float] = None, max_evaluations: Optional[int] = None,
+                              safety_factor: bool = True,
+                              sf_tolerance: float = SF_TOLERANCE) -> Iterator[Dict[str, Any]]:
+    """
+    臨界支保圧を段階的に評価するジェネレーター
+
+    1. coarse_step 刻みのグリッド全体を評価して最初の結果を返す（予算にかかわらず必ず評価する）
+    2. 現在の臨界角度 ±（前段の刻み）の区間を、刻みを 1/refine_ratio にして評価し、改善した結果を返す
+    3. 刻みが tol_deg 以下になるか、次の段階（評価点と安全率の再計算）が期限・評価点数の上限に
+       収まらない見込みになったら終了する（最後の結果は final = True）
+
+    既定値（5° → 1° → 0.2° → 0.04° → 0.008°）では 1° の段階の評価点が find_critical_pressure の
+    1度刻みのグリッドに一致する。安全率は臨界角度が変わるたびに bounded_safety_factor で残りの予算内で
+    計算する。臨界角度の区間は、P(θd) が評価済みのグリッド上で単峰であることを前提とする。
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_range: 探索角度範囲 [度] (min, max)
+        coarse_step: 最初のグリッドの刻み [度]
+        refine_ratio: 段階ごとの刻みの縮小率（2以上の整数）
+        tol_deg: 臨界角度の許容誤差 [度]（刻みがこれ以下になったら終了）
+        deadline: 期限（time.monotonic() の値）。Noneの場合は期限なし
+        max_evaluations: 支保圧の評価点数（掃引と安全率の合計）の上限。Noneの場合は上限なし
+        safety_factor: 安全率を計算するか
+        sf_tolerance: 安全率の二分探索の収束幅
+
+    Yields:
+        各段階の結果の辞書
+        - stage: 段階番号（0 が粗いグリッド）、theta_step_deg: その段階の刻み [度]
+        - max_P, critical_theta_d, critical_theta_d_deg, stability: 臨界条件
+        - theta_bracket_deg: 臨界角度を含む区間 [度] (下限, 上限)
+        - safety_factor, safety_factor_bracket: 臨界角度での安全率とそれを含む区間
+          （safety_factor=False の場合は NaN）
+        - n_evaluations: 累計の評価点数（n_sweep_evaluations + n_sf_evaluations）
+        - elapsed: 経過時間 [秒]
+        - converged: 臨界角度・安全率とも許容誤差に達したか、final: 最後の結果か
+
+    Raises:
+        ValueError: 粗いグリッドに有効な角度がない場合
+    """
+    if refine_ratio < 2:
+        raise ValueError("refine_ratio は2以上としてください")
+    start_time = time.monotonic()
+    theta_lo, theta_hi = float(theta_range[0]), float(theta_range[1])
+
+    step = float(coarse_step)
+    n = int(np.floor((theta_hi - theta_lo) / step + 1e-9))
+    theta_deg = theta_lo + step * np.arange(n + 1)
+    if theta_deg[-1] < theta_hi - 1e-9:
+        theta_deg = np.append(theta_deg, theta_hi)
+
+    best_P = -np.inf
+    best_theta_deg = np.nan
+    n_sweep = 0
+    n_sf = 0
+    sf = {'safety_factor': np.nan, 'safety_factor_bracket': (np.nan, np.nan), 'n_evaluations': 0,
+          'converged': True}
+    sf_theta_deg = np.nan
+    stage = 0
+
+    while True:
+        res = evaluate_support_pressure(calculator, np.radians(theta_deg))
+        n_sweep += theta_deg.size
+        if res['valid'].any():
+            P = np.where(res['valid'], res['P'], -np.inf)
+            i = int(np.argmax(P))
+            if P[i] > best_P:
+                best_P, best_theta_deg = float(P[i]), float(theta_deg[i])
+        if not np.isfinite(best_P):
+            raise ValueError("有効な解が見つかりませんでした")
+
+        if safety_factor and best_theta_deg != sf_theta_deg:
+            remaining = None if max_evaluations is None else max(max_evaluations - n_sweep - n_sf, 0)
+            sf = bounded_safety_factor(calculator, np.radians(best_theta_deg), sf_tolerance,
+                                       deadline, remaining)
+            n_sf += sf['n_evaluations']
+            sf_theta_deg = best_theta_deg
+
+        # 次の段階の評価点数と、これまでの1点あたりの時間から予算内に収まるかを見積もる
+        n_used = n_sweep + n_sf
+        elapsed = time.monotonic() - start_time
+        n_next = 2 * refine_ratio + (sf['n_evaluations'] if safety_factor else 0)
+        exhausted = ((max_evaluations is not None and n_used + n_next > max_evaluations)
+                     or (deadline is not None
+                         and time.monotonic() + elapsed / n_used * n_next >= deadline))
+        converged = step <= tol_deg and sf['converged']
+        final = step <= tol_deg or exhausted
+        yield {
+            'stage': stage,
+            'theta_step_deg': step,
+            'max_P': best_P,
+            'critical_theta_d': np.radians(best_theta_deg),
+            'critical_theta_d_deg': best_theta_deg,
+            'stability': _stability(best_P),
+            'theta_bracket_deg': (max(best_theta_deg - step, theta_lo), min(best_theta_deg + step, theta_hi)),
+            'safety_factor': sf['safety_factor'],
+            'safety_factor_bracket': sf['safety_factor_bracket'],
+            'n_evaluations': n_used,
+            'n_sweep_evaluations': n_sweep,
+            'n_sf_evaluations': n_sf,
+            'elapsed': elapsed,
+            'converged': converged,
+            'final': final,
+        }
+        if final:
+            return
+
+        # 臨界角度 ±（前段の刻み）を細かい刻みで評価（評価済みの中心は除く）
+        offsets = np.arange(-refine_ratio, refine_ratio + 1) * (step / refine_ratio)
+        step /= refine_ratio
+        theta_deg = best_theta_deg + offsets[offsets != 0]
+        theta_deg = theta_deg[(theta_deg >= theta_lo - 1e-9) & (theta_deg <= theta_hi + 1e-9)]
+        stage += 1
+
+
+def critical_pressure_until(calculator, deadline: Optional[float] = None,
+                            time_budget: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+    """
+    期限・評価点数の予算内で得られた最良の結果を返す（anytime_critical_pressure の最後の結果）
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        deadline: 期限（time.monotonic() の値）。Noneの場合は time_budget から決める
+        time_budget: 計算時間の予算 [秒]（deadline と両方指定した場合は早い方）
+        **kwargs: anytime_critical_pressure のその他の引数（max_evaluations など）
+
+    Returns:
+        最後の段階の結果の辞書
+    """
+    if time_budget is not None:
+        budget_deadline = time.monotonic() + time_budget
+        deadline = budget_deadline if deadline is None else min(deadline, budget_deadline)
+    result = None
+    for result in anytime_critical_pressure(calculator, deadline=deadline, **kwargs):
+        pass
+    return result
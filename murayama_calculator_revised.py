@@ -3,10 +3,31 @@
 murayama_stability_design_revised.mdに基づく実装
 """
 
+import math
 import numpy as np
 from typing import Dict, Any, Optional, List
 import warnings
 
+from murayama_vectorized import self_weight_kernel
+
+
+# math.exp がオーバーフローしない引数の上限
+_EXP_MAX = math.log(np.finfo(float).max)
+
+
+def _safe_exp(x: float) -> float:
+    """オーバーフロー時に例外ではなく inf を返す math.exp"""
+    return math.exp(x) if x < _EXP_MAX else math.inf
+
+
+def _divide(a: float, b: float) -> float:
+    """ゼロ除算で例外を送出せず NumPy と同じ inf/NaN を返す除算"""
+    if b != 0.0:
+        return a / b
+    if a == 0.0 or a != a:
+        return math.nan
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
 
 class MurayamaCalculatorRevised:
     """村山の式による切羽安定性計算クラス（修正版）"""
@@ -36,6 +57,7 @@ class MurayamaCalculatorRevised:
         self.alpha = alpha
         self.K = K
         self.force_finite_cover = force_finite_cover
+        self._trig_phi = None  # _trig のキャッシュキー
         
         # 入力値の妥当性チェック
         self._validate_inputs()
@@ -76,25 +98,77 @@ class MurayamaCalculatorRevised:
         if errors:
             raise ValueError("\n".join(errors))
     
+    def _trig(self) -> tuple:
+        """
+        tanφ, sinφ, cosφ（スカラー計算用、φが変更された場合のみ再計算）
+        
+        Returns:
+            (tanφ, sinφ, cosφ)
+        """
+        if self._trig_phi != self.phi:
+            phi = float(self.phi)
+            self._trig_cache = (math.tan(phi), math.sin(phi), math.cos(phi))
+            self._trig_phi = self.phi
+        return self._trig_cache
+    
     def calculate_geometry(self, theta_d: float) -> Dict[str, float]:
         """
         幾何の閉合計算
         
         Args:
-            theta_d: 探索角度 [ラジアン]
+            theta_d: 探索角度 [ラジアン]（配列の場合は NumPy で一括計算）
             
         Returns:
             幾何パラメータの辞書 (r0, rd, la, B, lp)
+            （配列の場合は有効フラグ valid も含む。閉合式の分母が極小の角度は例外を送出せず NaN・valid=False、
+            B ≤ 0.1 の角度も valid=False）
         """
-        # r0の計算（幾何の閉合式）
-        denominator = np.exp(theta_d * np.tan(self.phi)) * np.sin(self.phi + theta_d) - np.sin(self.phi)
+        if np.ndim(theta_d) > 0:
+            return self._calculate_geometry_array(np.asarray(theta_d, dtype=float))
+        
+        e, denominator = self._closure_terms(theta_d)
         if abs(denominator) < 1e-10:
             raise ValueError(f"幾何的に不適切な角度: theta_d = {np.degrees(theta_d):.1f}°")
         
+        return self._geometry_from_denominator(theta_d, e, denominator)
+    
+    def _closure_terms(self, theta_d: float) -> tuple:
+        """幾何の閉合式の e = exp(θd·tanφ) と分母 e·sin(φ+θd) - sinφ"""
+        tan_phi, sin_phi, _ = self._trig()
+        e = _safe_exp(theta_d * tan_phi)
+        return e, e * math.sin(self.phi + theta_d) - sin_phi
+    
+    def _geometry_from_denominator(self, theta_d: float, e: float, denominator: float) -> Dict[str, float]:
+        """閉合式の分母から幾何パラメータを計算（分母の妥当性は呼び出し側で確認）"""
+        _, sin_phi, cos_phi = self._trig()
+        
+        # r0の計算（幾何の閉合式）
         r0 = self.H_f / denominator
         
         # その他の幾何パラメータ
-        rd = r0 * np.exp(theta_d * np.tan(self.phi))
+        rd = r0 * e
+        la = rd * math.cos(self.phi + theta_d)
+        B = r0 * cos_phi - la
+        lp = r0 * sin_phi + self.H_f / 2
+        
+        return {
+            'r0': r0,
+            'rd': rd,
+            'la': la,
+            'B': B,
+            'lp': lp
+        }
+    
+    def _calculate_geometry_array(self, theta_d: np.ndarray) -> Dict[str, np.ndarray]:
+        """幾何の閉合計算（配列版、NumPy）"""
+        e = np.exp(theta_d * np.tan(self.phi))
+        denominator = e * np.sin(self.phi + theta_d) - np.sin(self.phi)
+        # 分母が極小の角度は例外を送出せず NaN とする
+        degenerate = np.abs(denominator) < 1e-10
+        denominator = np.where(degenerate, np.nan, denominator)
+        
+        r0 = self.H_f / denominator
+        rd = r0 * e
         la = rd * np.cos(self.phi + theta_d)
         B = r0 * np.cos(self.phi) - la
         lp = r0 * np.sin(self.phi) + self.H_f / 2
@@ -104,7 +178,8 @@ class MurayamaCalculatorRevised:
             'rd': rd,
             'la': la,
             'B': B,
-            'lp': lp
+            'lp': lp,
+            'valid': B > 0.1
         }
     
     def calculate_equivalent_surcharge(self, B: float) -> float:
@@ -112,13 +187,21 @@ class MurayamaCalculatorRevised:
         上載荷重の等価合力 q をユーザー式で算定（指数の"中"に tanφ）。深部/有限は B に基づき都度評価。
         
         Args:
-            B: 滑り面の水平投影幅 [m]
+            B: 滑り面の水平投影幅 [m]（配列の場合は NumPy で一括計算）
             
         Returns:
             等価合力 q [kN/m²]
         """
+        if np.ndim(B) > 0:
+            return self._calculate_equivalent_surcharge_array(np.asarray(B, dtype=float))
+        
+        tan_phi = self._trig()[0]
+        
+        # 土被りの指定がない場合は深部前提（force_finite_cover でも H = ∞ の有限土被り式と同じ、配列版・一括計算と同じ）
+        if self.H is None:
+            is_deep = True
         # force_finite_coverがTrueの場合は常に有限土被り式を使用
-        if self.force_finite_cover:
+        elif self.force_finite_cover:
             is_deep = False
         else:
             # 深部条件の判定（土被りが幅の1.5倍以上：便宜上の閾値）
@@ -126,13 +209,24 @@ class MurayamaCalculatorRevised:
         
         if is_deep:
             # 深部前提（角括弧→1）
-            q = (self.alpha * B * (self.gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * np.tan(self.phi))
+            q = (self.alpha * B * (self.gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * tan_phi)
         else:
             # 有限土被り（指数の"中"に tanφ を掛ける）
-            fac = 1.0 - np.exp(-2.0 * self.K * self.H * np.tan(self.phi) / (self.alpha * B))
-            q = (self.alpha * B * (self.gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * np.tan(self.phi)) * fac
+            fac = 1.0 - _safe_exp(-2.0 * self.K * self.H * tan_phi / (self.alpha * B))
+            q = (self.alpha * B * (self.gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * tan_phi) * fac
         
-        return float(q)  # 丸めない（負値も許容：Excel整合）  # 丸めない（負値も許容：Excel整合）
+        return float(q)  # 丸めない（負値も許容：Excel整合）
+    
+    def _calculate_equivalent_surcharge_array(self, B: np.ndarray) -> np.ndarray:
+        """上載荷重の等価合力 q（配列版、NumPy）"""
+        q = (self.alpha * B * (self.gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * np.tan(self.phi))
+        if self.H is None and not self.force_finite_cover:
+            return q
+        
+        H = np.inf if self.H is None else self.H
+        fac = 1.0 - np.exp(-2.0 * self.K * H * np.tan(self.phi) / (self.alpha * B))
+        is_deep = np.zeros(B.shape, dtype=bool) if self.force_finite_cover else H > 1.5 * B
+        return np.where(is_deep, q, q * fac)
     
     def calculate_self_weight(self, r0: float, rd: float, theta_d: float, B: float, la: float) -> Dict[str, float]:
         """
@@ -144,14 +238,24 @@ class MurayamaCalculatorRevised:
             theta_d: 探索角度 [ラジアン]
             B: 滑り面の水平投影幅 [m]
             la: 滑り面上端の水平位置 [m]
+            （いずれかが配列の場合は murayama_vectorized のカーネルで一括計算）
             
         Returns:
             自重関連のパラメータ (Wf, lw, w1, lw1, w2, lw2)
         """
+        if any(np.ndim(x) > 0 for x in (r0, rd, theta_d, B, la)):
+            arrays = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (r0, rd, theta_d, B, la)))
+            shape = arrays[0].shape
+            out = self_weight_kernel(*(a.ravel() for a in arrays), self.H_f, self.gamma, self.phi)
+            return {k: v.reshape(shape) for k, v in out.items()}
+        
+        tan_phi = self._trig()[0]
+        phi = self.phi
+        
         # 自重の等価合力（1m幅当たり）
         term1 = self.H_f * B / 2  # 三角形部分
-        term2 = (rd**2 - r0**2) / (4 * np.tan(self.phi))  # 曲線領域
-        term3 = r0 * rd * np.sin(theta_d) / 2
+        term2 = (rd * rd - r0 * r0) / (4 * tan_phi)  # 曲線領域
+        term3 = r0 * rd * math.sin(theta_d) / 2
         
         Wf = self.gamma * (term1 + term2 - term3)
         
@@ -166,47 +270,53 @@ class MurayamaCalculatorRevised:
         # 曲線部分の重心（Excel M9式の実装）
 
         # 中間パラメータの計算（ExcelのS,T,U,V）
-        O = np.hypot(B, self.H_f)  # 切羽の対角線長
-        P = np.arctan2(self.H_f, B)  # 方向角（rad）
+        O = math.hypot(B, self.H_f)  # 切羽の対角線長
+        P = math.atan2(self.H_f, B)  # 方向角（rad）
+        sin_P_phi = math.sin(P + phi)
+        cos_P_phi = math.cos(P + phi)
         
-        # S（Excelのx）の計算
-        S = np.sqrt((O**2)/4.0 + r0**2 - O*r0*np.cos(P + self.phi))
+        # S（Excelのx）の計算（丸め誤差による微小な負値は0とする）
+        S = math.sqrt(max(O * O / 4.0 + r0 * r0 - O * r0 * cos_P_phi, 0.0))
         
         # T（Excelのθc）の計算
-        R = r0 * np.sin(P + self.phi)
-        cos_arg = np.clip(R / S, -1.0, 1.0) if S > 0.0 else 1.0
-        T = np.arccos(cos_arg) - (P + self.phi - np.pi/2.0)
+        R = r0 * sin_P_phi
+        if S > 0.0:
+            cos_arg = R / S
+            cos_arg = -1.0 if cos_arg < -1.0 else (1.0 if cos_arg > 1.0 else cos_arg)
+        else:
+            cos_arg = 1.0
+        T = math.acos(cos_arg) - (P + phi - math.pi / 2.0)
         
         # U（Excelのh）の計算
-        U = (r0*np.exp(T*np.tan(self.phi)) - S) * (r0*np.sin(P + self.phi)) / (S if S != 0.0 else 1.0)
+        U = (r0 * _safe_exp(T * tan_phi) - S) * R / (S if S != 0.0 else 1.0)
         
         # V（Excelのβ）の計算
         if abs(U) > 1e-12:
-            V = np.pi - 2*np.arctan(O/(2*U))
+            V = math.pi - 2 * math.atan(O / (2 * U))
         else:
-            V = np.pi
+            V = math.pi
         
         # Excel M9式の実装
         # 第1項
-        term1_lw2 = S * np.cos(self.phi + T)
+        term1_lw2 = S * math.cos(phi + T)
         
         # 第2項の計算
-        cos_V = np.cos(V)
-        sin_V = np.sin(V)
+        cos_V = math.cos(V)
+        sin_V = math.sin(V)
         
 
         # 各要素の計算
-        A = U / (1 - cos_V)
-        B_num = 1 - cos_V**2
+        A = _divide(U, 1 - cos_V)
+        B_num = 1 - cos_V * cos_V
         B_den = V - sin_V * cos_V
         
 
-        B_frac = B_num / B_den
+        B_frac = _divide(B_num, B_den)
         C = sin_V
-        D = U * cos_V / (1 - cos_V)
+        D = _divide(U * cos_V, 1 - cos_V)
         
         # 第2項（Excel準拠：常にB/H_fを使用）
-        cos_direction = np.cos(np.arctan2(B, self.H_f))
+        cos_direction = math.cos(math.atan2(B, self.H_f))
         
         term2_inner = (2.0/3.0) * A * B_frac * C - D
         term2_lw2 = term2_inner * cos_direction
@@ -234,35 +344,55 @@ class MurayamaCalculatorRevised:
         粘着の抵抗モーメント（閉形式）
         
         Args:
-            r0: 初期半径 [m]
-            rd: 終端半径 [m]
+            r0: 初期半径 [m]（配列も可）
+            rd: 終端半径 [m]（配列も可）
             
         Returns:
             粘着抵抗モーメント Mc [kN·m]
         """
-        Mc = self.coh * (rd**2 - r0**2) / (2 * np.tan(self.phi))
+        Mc = self.coh * (rd * rd - r0 * r0) / (2 * self._trig()[0])
         return Mc
     
-    def calculate_support_pressure(self, theta_d: float) -> Dict[str, Any]:
+    def calculate_support_pressure(self, theta_d: float, detail: str = 'full') -> Dict[str, Any]:
         """
         指定角度での必要支保圧の計算
         
         Args:
             theta_d: 探索角度 [ラジアン]
+            detail: 結果の詳細度
+                'full': 幾何・荷重・モーメントの内訳を含む全結果（標準）
+                'pressure': theta_d, P, valid のみ（臨界角度探索・安全率の二分探索用）
             
         Returns:
-            計算結果の辞書
+            計算結果の辞書（無効な角度は P = NaN、valid = False、reason = 'degenerate'（幾何不適切）/ 'narrow'（B ≤ 0.1））
         """
-        # 幾何の計算
-        geom = self.calculate_geometry(theta_d)
+        if detail not in ('full', 'pressure'):
+            raise ValueError(f"不明な詳細度: {detail}")
+        if detail == 'pressure':
+            P, reason = self._pressure_only(theta_d)
+            if reason is not None:
+                return {'theta_d': theta_d, 'P': P, 'valid': False, 'reason': reason}
+            return {'theta_d': theta_d, 'P': P, 'valid': True}
+        
+        # 幾何の計算（分母が極小の角度は例外を送出せず無効扱い）
+        e, denominator = self._closure_terms(theta_d)
+        if abs(denominator) < 1e-10:
+            return {
+                'theta_d': theta_d,
+                'P': np.nan,
+                'valid': False,
+                'reason': 'degenerate'
+            }
+        geom = self._geometry_from_denominator(theta_d, e, denominator)
         r0, rd, la, B, lp = geom['r0'], geom['rd'], geom['la'], geom['B'], geom['lp']
         
-        # B が負または極小の場合はスキップ
-        if B <= 0.1:
+        # B が負または極小（または非有限値）の場合はスキップ（幾何不適切と同じく NaN）
+        if not B > 0.1:
             return {
                 'theta_d': theta_d,
-                'P': -float('inf'),
-                'valid': False
+                'P': np.nan,
+                'valid': False,
+                'reason': 'narrow'
             }
         
         # 等価合力の計算
@@ -282,7 +412,7 @@ class MurayamaCalculatorRevised:
         
         # 支保圧の算定（モーメント釣合い）
         numerator = Wf * lw + q * B * (la + B/2) - Mc
-        P = numerator / lp
+        P = _divide(numerator, lp)
         
         return {
             'theta_d': theta_d,
@@ -301,6 +431,83 @@ class MurayamaCalculatorRevised:
             'numerator': numerator
         }
     
+    def _pressure_only(self, theta_d: float) -> tuple:
+        """
+        支保圧 P のみの計算（detail='pressure' 用）
+        
+        幾何・上載荷重・自重・粘着の各メソッドと同じ式・同じ演算順序を中間の辞書を作らずに計算する
+        （結果は detail='full' の P とビット単位で一致する）。
+        
+        Returns:
+            (P, 無効な理由)（有効な角度の理由は None、無効な角度の P は NaN）
+        """
+        theta_d = float(theta_d)
+        tan_phi, sin_phi, cos_phi = self._trig()
+        phi = self.phi
+        H_f = self.H_f
+        gamma = self.gamma
+        
+        # 幾何の閉合
+        e = _safe_exp(theta_d * tan_phi)
+        denominator = e * math.sin(phi + theta_d) - sin_phi
+        if abs(denominator) < 1e-10:
+            return math.nan, 'degenerate'
+        r0 = H_f / denominator
+        rd = r0 * e
+        la = rd * math.cos(phi + theta_d)
+        B = r0 * cos_phi - la
+        lp = r0 * sin_phi + H_f / 2
+        if not B > 0.1:
+            return math.nan, 'narrow'
+        
+        # 上載荷重の等価合力 q（calculate_equivalent_surcharge と同じ）
+        q = (self.alpha * B * (gamma - 2 * self.coh / (self.alpha * B))) / (2 * self.K * tan_phi)
+        if self.H is not None and (self.force_finite_cover or not self.H > 1.5 * B):
+            q = q * (1.0 - _safe_exp(-2.0 * self.K * self.H * tan_phi / (self.alpha * B)))
+        
+        # 自重と作用点（calculate_self_weight と同じ Excel M9式）
+        term2 = (rd * rd - r0 * r0) / (4 * tan_phi)
+        term3 = r0 * rd * math.sin(theta_d) / 2
+        Wf = gamma * (H_f * B / 2 + term2 - term3)
+        w1 = gamma * H_f * B / 2
+        lw1 = la + B / 3
+        w2 = gamma * (term2 - term3)
+        O = math.hypot(B, H_f)
+        P_dir = math.atan2(H_f, B)
+        sin_P_phi = math.sin(P_dir + phi)
+        cos_P_phi = math.cos(P_dir + phi)
+        S = math.sqrt(max(O * O / 4.0 + r0 * r0 - O * r0 * cos_P_phi, 0.0))
+        R = r0 * sin_P_phi
+        if S > 0.0:
+            cos_arg = R / S
+            cos_arg = -1.0 if cos_arg < -1.0 else (1.0 if cos_arg > 1.0 else cos_arg)
+        else:
+            cos_arg = 1.0
+        T = math.acos(cos_arg) - (P_dir + phi - math.pi / 2.0)
+        U = (r0 * _safe_exp(T * tan_phi) - S) * R / (S if S != 0.0 else 1.0)
+        V = math.pi - 2 * math.atan(O / (2 * U)) if abs(U) > 1e-12 else math.pi
+        cos_V = math.cos(V)
+        sin_V = math.sin(V)
+        term2_inner = ((2.0/3.0) * _divide(U, 1 - cos_V) * _divide(1 - cos_V * cos_V, V - sin_V * cos_V) * sin_V
+                       - _divide(U * cos_V, 1 - cos_V))
+        lw2 = S * math.cos(phi + T) + term2_inner * math.cos(math.atan2(B, H_f))
+        if abs(w1 + w2) > 1e-12:
+            lw = (w1 * lw1 + w2 * lw2) / (w1 + w2)
+        else:
+            lw = la + B / 2
+        
+        # 粘着抵抗モーメントと支保圧（モーメント釣合い）
+        Mc = self.coh * (rd * rd - r0 * r0) / (2 * tan_phi)
+        numerator = Wf * lw + q * B * (la + B/2) - Mc
+        return _divide(numerator, lp), None
+    
+    def _reduced_pressure(self, theta_d: float) -> float:
+        """
+        強度低減の二分探索での支保圧（幾何不適切は NaN、B ≤ 0.1 は安定側として -inf。murayama_numba と同じ扱い）
+        """
+        P, reason = self._pressure_only(theta_d)
+        return -math.inf if reason == 'narrow' else P
+    
     def calculate_true_safety_factor(self, theta_d: float) -> Dict[str, Any]:
         """
         強度定数を低減して必要支保圧が0になる低減係数を求め、真の安全率を計算
@@ -318,7 +525,7 @@ class MurayamaCalculatorRevised:
         original_phi_deg = self.phi_deg
         
         # まず現在の強度での必要支保圧を計算
-        original_result = self.calculate_support_pressure(theta_d)
+        original_result = self.calculate_support_pressure(theta_d, detail='pressure')
         original_P = original_result['P']
         
         # 強度変化履歴を記録
@@ -343,11 +550,8 @@ class MurayamaCalculatorRevised:
             self.coh = original_coh / factor
             self.phi = np.arctan(np.tan(original_phi) / factor)
             self.phi_deg = np.degrees(self.phi)
-            try:
-                result = self.calculate_support_pressure(theta_d)
-                return result['P']
-            except Exception:
-                return np.nan
+            # 幾何が不適切な場合は NaN
+            return self._reduced_pressure(theta_d)
         
         # 初期括り出し: P(lower)とP(upper)が異符号になるまで範囲を拡張
         P_lower = evaluate_P_at_factor(lower)
@@ -415,10 +619,15 @@ class MurayamaCalculatorRevised:
             self.phi_deg = np.degrees(self.phi)
             
             # 変更した強度で必要支保圧を計算
-            try:
-                result = self.calculate_support_pressure(theta_d)
-                P_modified = result['P']
-                
+            P_modified = self._reduced_pressure(theta_d)
+            
+            if np.isnan(P_modified):
+                # 幾何が不適切な場合は範囲を狭める
+                if factor < 1.0:
+                    lower = factor
+                else:
+                    upper = factor
+            else:
                 # 履歴に追加
                 reduction_history.append({
                     'factor': factor,
@@ -433,13 +642,6 @@ class MurayamaCalculatorRevised:
                 else:
                     # 安定しているので安全率を上げる（強度を下げる）
                     lower = factor
-                    
-            except Exception:
-                # 計算エラーの場合は範囲を狭める
-                if factor < 1.0:
-                    lower = factor
-                else:
-                    upper = factor
             
             iteration += 1
         
@@ -491,8 +693,8 @@ class MurayamaCalculatorRevised:
             self.phi = np.arctan(np.tan(original_phi) / actual_factor)
             self.phi_deg = np.degrees(self.phi)
             
-            try:
-                result = self.calculate_support_pressure(theta_d)
+            result = self.calculate_support_pressure(theta_d, detail='pressure')
+            if not np.isnan(result['P']):
                 evaluation_points.append({
                     'factor': actual_factor,
                     'safety_factor': eval_safety_factor,
@@ -500,8 +702,6 @@ class MurayamaCalculatorRevised:
                     'phi_deg': self.phi_deg,
                     'P': result['P']
                 })
-            except Exception:
-                pass
         
         # 強度定数を最終的に元に戻す
         self.coh = original_coh
@@ -519,13 +719,15 @@ class MurayamaCalculatorRevised:
         }
     
     def find_critical_pressure(self, theta_range: tuple = (20, 80), 
-                             theta_step: float = 1.0) -> Dict[str, Any]:
+                             theta_step: float = 1.0, detail: str = 'full') -> Dict[str, Any]:
         """
         臨界支保圧の探索
         
         Args:
             theta_range: 探索角度範囲 [度] (min, max)
             theta_step: 角度刻み [度]
+            detail: all_results の詳細度（calculate_support_pressure と同じ）。
+                'pressure' の場合は探索中は P のみを計算し、内訳は臨界角度についてのみ計算する
             
         Returns:
             臨界条件での計算結果
@@ -540,24 +742,43 @@ class MurayamaCalculatorRevised:
         
         # 結果保存用
         results = []
-        max_P = -float('inf')
-        critical_result = None
+        degenerate_theta_deg = []
+        n_narrow = 0
         
         for theta_d in theta_values:
-            try:
-                result = self.calculate_support_pressure(theta_d)
-                if result['valid']:
-                    results.append(result)
-                    if result['P'] > max_P:
-                        max_P = result['P']
-                        critical_result = result
-            except Exception as e:
-                # エラーが発生した角度はスキップ
-                warnings.warn(f"計算エラー at θ = {np.degrees(theta_d):.1f}°: {str(e)}")
-                continue
-        
-        if critical_result is None:
+            result = self.calculate_support_pressure(theta_d, detail=detail)
+            if result['valid']:
+                results.append(result)
+            elif result['reason'] == 'degenerate':
+                degenerate_theta_deg.append(float(np.degrees(theta_d)))
+            else:
+                n_narrow += 1
+        
+        # 無効な角度の集計（角度ごとではなく探索1回につき1件）
+        diagnostics = {
+            'n_evaluated': len(theta_values),
+            'n_valid': len(results),
+            'n_degenerate': len(degenerate_theta_deg),
+            'n_narrow': n_narrow,
+            'degenerate_theta_deg': degenerate_theta_deg
+        }
+        if degenerate_theta_deg:
+            warnings.warn(
+                f"幾何的に不適切な角度を{len(degenerate_theta_deg)}点スキップしました: "
+                f"θ = {', '.join(f'{t:.1f}°' for t in degenerate_theta_deg)}"
+            )
+        
+        # 有効な角度の中での最大値（非有限値の P は除く）
+        P_valid = np.array([result['P'] for result in results], dtype=float)
+        if not np.isfinite(P_valid).any():
             raise ValueError("有効な解が見つかりませんでした")
+        P_valid[~np.isfinite(P_valid)] = np.nan
+        critical_result = results[int(np.nanargmax(P_valid))]
+        max_P = critical_result['P']
+        
+        # 内訳は臨界角度についてのみ計算
+        if detail != 'full':
+            critical_result = self.calculate_support_pressure(critical_result['theta_d'])
         
         # 新しい安全率計算
         true_sf_result = self.calculate_true_safety_factor(critical_result['theta_d'])
@@ -581,9 +802,35 @@ class MurayamaCalculatorRevised:
             'detailed_stability': detailed_stability,
             'safety_factor': safety_factor,
             'true_safety_factor_result': true_sf_result,
-            'all_results': results
+            'all_results': results,
+            'diagnostics': diagnostics
         }
     
+    def find_critical_pressure_anytime(self, theta_range: tuple = (20, 80), coarse_step: float = 5.0,
+                                       tol_deg: float = 0.01, deadline: Optional[float] = None,
+                                       max_evaluations: Optional[int] = None):
+        """
+        臨界支保圧の段階的（anytime）探索
+
+        粗いグリッドの結果をすぐに返し、臨界角度の周辺を細かくして改善した結果を順次返す
+        （murayama_anytime.anytime_critical_pressure を参照）。
+        
+        Args:
+            theta_range: 探索角度範囲 [度] (min, max)
+            coarse_step: 最初のグリッドの刻み [度]
+            tol_deg: 臨界角度の許容誤差 [度]
+            deadline: 期限（time.monotonic() の値）
+            max_evaluations: 支保圧の評価点数（掃引と安全率の合計）の上限
+            
+        Returns:
+            各段階の結果（max_P, critical_theta_d_deg, safety_factor など）を返すジェネレーター
+        """
+        # 上位の層（murayama_numba 等を読み込む）のため、使用時に読み込む
+        from murayama_anytime import anytime_critical_pressure
+        
+        return anytime_critical_pressure(self, theta_range, coarse_step, tol_deg=tol_deg, deadline=deadline,
+                                         max_evaluations=max_evaluations)
+    
     def parametric_study(self, theta_range: tuple = (20, 80), 
                         n_points: int = None) -> Dict[str, Any]:
         """
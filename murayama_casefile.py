@@ -0,0 +1,201 @@
+"""
+ケースファイル（CSV・Excel）の読み込みと一括計算結果の集計
+路線の多数の区間の地盤条件を1つのファイルで与え、一括計算の入力とする。
+列名は英字（H_f, gamma, ...）・記号（γ, φ, ...）・画面と同じ日本語名（単位の括弧は無視）のいずれでもよい。
+"""
+
+import io
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+
+
+# 列名の別名（空白・括弧内の単位を除き小文字にした名前で照合する）
+COLUMN_ALIASES = {
+    'section': ('section', 'name', '区間', '断面', '測点', '名称'),
+    'H_f': ('h_f', 'hf', '切羽高さ', '切羽高さhf'),
+    'gamma': ('gamma', 'γ', '単位体積重量', '単位体積重量γ', '地山の単位体積重量', '地山の単位体積重量γ'),
+    'phi': ('phi', 'φ', '内部摩擦角', '内部摩擦角φ', '地山の内部摩擦角', '地山の内部摩擦角φ'),
+    'coh': ('coh', 'c', '粘着力', '粘着力c', '地山の粘着力', '地山の粘着力c'),
+    'H': ('h', '土被り', '土被りh'),
+    'alpha': ('alpha', 'α', '影響幅係数', '影響幅係数α'),
+    'K': ('k', '経験係数', '経験係数k'),
+    'force_finite_cover': ('force_finite_cover', '有限土被り式', '有限土被り式を強制'),
+}
+
+# 必須の列と、省略時の既定値（画面の入力の既定値と同じ、土被りの空欄は深部前提）
+REQUIRED_COLUMNS = ('H_f', 'gamma', 'phi', 'coh')
+DEFAULTS = {'H': np.nan, 'alpha': 1.8, 'K': 1.0, 'force_finite_cover': True}
+
+# 値の範囲（下限, 上限, 下限を含むか）
+VALUE_RANGES = {
+    'H_f': (0.0, np.inf, False),
+    'gamma': (0.0, np.inf, False),
+    'phi': (0.0, 90.0, True),
+    'coh': (0.0, np.inf, True),
+    'H': (0.0, np.inf, True),
+    'alpha': (0.0, np.inf, False),
+    'K': (0.0, np.inf, False),
+}
+
+# 集計結果の列名
+SUMMARY_COLUMNS = {
+    'section': '区間',
+    'H_f': '切羽高さHf (m)',
+    'gamma': '単位体積重量γ (kN/m³)',
+    'phi': '内部摩擦角φ (度)',
+    'coh': '粘着力c (kPa)',
+    'H': '土被りH (m)',
+    'max_P': '必要切羽押え力P (kN/m²)',
+    'safety_factor': '安全率',
+    'critical_theta_d_deg': '臨界角度θd (度)',
+    'stability': '安定性評価',
+}
+
+_TRUE_STRINGS = ('1', '1.0', 'true', 'yes', 'on', 'はい', '○', '〇')
+
+
+def _normalize(name) -> str:
+    """列名の照合用の正規化（括弧内の単位と空白を除き小文字にする）"""
+    name = re.sub(r'[(（\[].*?[)）\]]', '', str(name))
+    return re.sub(r'\s+', '', name).lower()
+
+
+def _rows(mask: np.ndarray, row_numbers: np.ndarray) -> str:
+    """該当する行番号（ファイル上の行、最初の5件）の表示"""
+    rows = row_numbers[mask]
+    text = ', '.join(str(r) for r in rows[:5])
+    return text + (f" ほか {rows.size - 5} 行" if rows.size > 5 else "")
+
+
+def read_case_file(data, file_name: str = 'cases.csv') -> pd.DataFrame:
+    """
+    ケースファイルを読み込み、列名を揃えて検証する
+
+    Args:
+        data: ファイルの内容（バイト列またはファイルオブジェクト、Streamlit の UploadedFile など）
+        file_name: ファイル名（拡張子 .xlsx / .xls の場合は Excel、それ以外は CSV として読む）
+
+    Returns:
+        列 section, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover の DataFrame
+        （H の NaN は深部前提、section がない場合は行番号）
+
+    Raises:
+        ValueError: 必須の列がない、数値でない・範囲外の値がある、ケースがない場合
+        ImportError: Excel の読み込みに必要なパッケージ（openpyxl など）がない場合
+    """
+    if isinstance(data, (bytes, bytearray)):
+        data = io.BytesIO(data)
+    if file_name.lower().endswith(('.xlsx', '.xls')):
+        raw = pd.read_excel(data)
+    else:
+        raw = pd.read_csv(data, encoding='utf-8-sig', skipinitialspace=True)
+    return validate_cases(raw)
+
+
+def validate_cases(raw: pd.DataFrame, first_row: int = 2) -> pd.DataFrame:
+    """
+    ケースの表の列名を揃えて検証する（read_case_file・アプリで編集した表の共通処理）
+
+    Args:
+        raw: ケースの表（列名は COLUMN_ALIASES のいずれか、空行は無視する）
+        first_row: エラーメッセージでの最初の行の行番号（ファイルではヘッダーの次の 2）
+
+    Returns:
+        列 section, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover の DataFrame
+        （H の NaN は深部前提、section がない場合は行番号）
+
+    Raises:
+        ValueError: 必須の列がない、数値でない・範囲外の値がある、ケースがない場合
+    """
+    # 空行を除き、残った行の元の行番号を記録する
+    filled = ~raw.isna().all(axis=1).to_numpy()
+    row_numbers = np.flatnonzero(filled) + first_row
+    raw = raw[filled]
+    if raw.empty:
+        raise ValueError("ケースがありません")
+
+    lookup = {alias: name for name, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    columns = {}
+    for column in raw.columns:
+        name = lookup.get(_normalize(column))
+        if name is not None and name not in columns:
+            columns[name] = raw[column]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"必須の列がありません: {', '.join(missing)}（列名: {', '.join(map(str, raw.columns))}）")
+
+    cases = pd.DataFrame(index=raw.index)
+    if 'section' in columns:
+        cases['section'] = columns['section'].fillna('').astype(str)
+    else:
+        cases['section'] = [str(i + 1) for i in range(len(raw))]
+
+    for name in ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K'):
+        if name not in columns:
+            cases[name] = DEFAULTS[name]
+            continue
+        values = pd.to_numeric(columns[name], errors='coerce').to_numpy(dtype=float)
+        given = columns[name].notna().to_numpy()
+        if np.any(given & np.isnan(values)):
+            raise ValueError(f"{name} に数値でない値があります（{_rows(given & np.isnan(values), row_numbers)} 行目）")
+        if name in REQUIRED_COLUMNS and not given.all():
+            raise ValueError(f"{name} が空欄です（{_rows(~given, row_numbers)} 行目）")
+        if name in ('alpha', 'K'):
+            values = np.where(given, values, DEFAULTS[name])
+        lo, hi, inclusive = VALUE_RANGES[name]
+        with np.errstate(invalid='ignore'):
+            bad = ((values < lo) if inclusive else (values <= lo)) | (values >= hi)
+        if np.any(bad):
+            raise ValueError(f"{name} が範囲外です（{_rows(bad, row_numbers)} 行目）")
+        cases[name] = values
+
+    if 'force_finite_cover' in columns:
+        flags = columns['force_finite_cover']
+        cases['force_finite_cover'] = [DEFAULTS['force_finite_cover'] if pd.isna(v)
+                                       else str(v).strip().lower() in _TRUE_STRINGS for v in flags]
+    else:
+        cases['force_finite_cover'] = DEFAULTS['force_finite_cover']
+    return cases.reset_index(drop=True)
+
+
+def case_arrays(cases: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """ケースの DataFrame を一括計算（find_critical_pressure_batch など）の引数に変換する"""
+    arrays = {name: cases[name].to_numpy(dtype=float) for name in ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K')}
+    arrays['force_finite_cover'] = cases['force_finite_cover'].to_numpy(dtype=bool)
+    return arrays
+
+
+def summarize_results(cases: pd.DataFrame, result: Dict[str, Any],
+                      inverse: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    区間ごとの一括計算結果の集計表
+
+    Args:
+        cases: read_case_file のケース
+        result: 一括計算の結果の辞書（max_P, critical_theta_d_deg[, safety_factor]）
+        inverse: 重複を除いて計算した場合の対応（deduplicate_cases の inverse）
+
+    Returns:
+        区間・地盤条件・必要切羽押え力・安全率・臨界角度・安定性評価の DataFrame（日本語の列名）
+    """
+    take = (lambda v: np.asarray(v)[inverse]) if inverse is not None else np.asarray
+    max_P = take(result['max_P'])
+    summary = cases[['section', 'H_f', 'gamma', 'phi', 'coh', 'H']].copy()
+    summary['max_P'] = max_P
+    summary['safety_factor'] = take(result['safety_factor']) if 'safety_factor' in result else np.nan
+    summary['critical_theta_d_deg'] = take(result['critical_theta_d_deg'])
+    # 安定性の評価（P値のみで判定、find_critical_pressure と同じ）
+    summary['stability'] = np.where(np.isnan(max_P), "判定不可", np.where(max_P <= 0, "安定", "不安定"))
+    return summary.rename(columns=SUMMARY_COLUMNS)
+
+
+def case_file_template() -> bytes:
+    """ケースファイルのひな形（CSV）"""
+    template = pd.DataFrame({
+        '区間': ['No.1', 'No.2'],
+        'H_f': [10.0, 10.0], 'gamma': [20.0, 21.0], 'phi': [30.0, 35.0], 'coh': [20.0, 30.0],
+        'H': [30.0, None], 'alpha': [1.8, 1.8], 'K': [1.0, 1.0], 'force_finite_cover': [1, 1],
+    })
+    return template.to_csv(index=False).encode('utf-8-sig')
@@ -0,0 +1,378 @@
+"""
+複数マシンへの一括計算の分散（コーディネーター／ワーカー）
+TCP または Unix ソケット上の簡易プロトコルで、ワーカーがチャンクを取りに行く（pull型）作業キューを構成する。
+- チャンク記述子（番号・範囲）と入力ケース配列を送り、結果（最大P・臨界角度）を受け取るたびに逐次反映する
+- ワーカーは一定間隔でハートビートを送り、途絶えた・切断されたワーカーのチャンクは再投入する
+- 待ち行列が空になると、手の空いたワーカーは長時間処理中のチャンクを横取りして重複実行する（先着の結果を採用）
+"""
+
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Tuple, Union
+
+from murayama_vectorized import (
+    ArrayLike, SweepPlan, theta_grid, find_critical_pressure_batch, merge_diagnostics
+)
+from murayama_parallel import SHARED_CASE_ROWS
+
+
+Address = Union[Tuple[str, int], str]
+
+# メッセージのヘッダー（JSON 長、ペイロード長）
+_FRAME = struct.Struct('!II')
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("接続が切断されました")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b''):
+    """
+    メッセージの送信（JSON ヘッダー + バイナリのペイロード）
+
+    Args:
+        sock: 送信先ソケット
+        header: メッセージ種別 'type' を含む辞書
+        payload: 配列データ（生のバイト列）
+    """
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """
+    メッセージの受信
+
+    Returns:
+        (ヘッダーの辞書, ペイロード)
+    """
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size).decode('utf-8'))
+    payload = _recv_exact(sock, payload_size) if payload_size else b''
+    return header, payload
+
+
+def _family(address: Address) -> int:
+    return socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+
+
+class Coordinator:
+    """
+    一括計算のコーディネーター
+
+    ケースをチャンクに分割して待ち行列に入れ、接続したワーカーの要求に応じて配布する。
+    全チャンクの結果がそろうと wait() が find_critical_pressure_batch と同じ形式の結果を返す。
+    """
+
+    def __init__(self, H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                 H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8, K: ArrayLike = 1.0,
+                 force_finite_cover: ArrayLike = False, theta_range: tuple = (20, 80),
+                 theta_step: float = 1.0, chunk_size: int = 1024,
+                 address: Address = ('127.0.0.1', 0), heartbeat_timeout: float = 10.0,
+                 steal_after: float = 5.0, max_retries: int = 3,
+                 on_result: Optional[Callable[[int, int, np.ndarray, np.ndarray], None]] = None):
+        """
+        初期化（待ち受けは start() で開始）
+
+        Args:
+            H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+            theta_range: 探索角度範囲 [度] (min, max)
+            theta_step: 角度刻み [度]
+            chunk_size: 1チャンクのケース数
+            address: 待ち受けアドレス（(host, port) は TCP、文字列は Unix ソケットのパス）
+            heartbeat_timeout: この秒数メッセージがないワーカーは失われたとみなす
+            steal_after: 待ち行列が空の場合、この秒数以上処理中のチャンクを他のワーカーに重複配布する
+            max_retries: 失われたチャンクを再投入する最大回数
+            on_result: チャンクの結果を受け取るたびに呼ばれる関数 (start, stop, max_P, critical_index)
+        """
+        if chunk_size <= 0:
+            raise ValueError("チャンクのケース数は正の値である必要があります")
+        inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+                  'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+                  'force_finite_cover': force_finite_cover}
+        self.n = max(np.size(v) for v in inputs.values())
+        # 入力ケース配列（ケースごとの行 (n, 8)、行方向に連続のためチャンクは連続領域として送信できる）
+        self.cases = np.empty((self.n, len(SHARED_CASE_ROWS)))
+        for j, name in enumerate(SHARED_CASE_ROWS):
+            self.cases[:, j] = inputs[name]
+        self.theta_range = tuple(theta_range)
+        self.theta_step = theta_step
+        self.theta_d = theta_grid(theta_range, theta_step)
+        self.chunk_size = int(chunk_size)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.steal_after = steal_after
+        self.max_retries = max_retries
+        self.on_result = on_result
+
+        self.chunks = [(start, min(start + self.chunk_size, self.n))
+                       for start in range(0, self.n, self.chunk_size)]
+        self.max_P = np.full(self.n, np.nan)
+        self.critical_index = np.full(self.n, -1, dtype=np.intp)
+        self.retries = [0] * len(self.chunks)
+        self.stats = {'dispatched': 0, 'stolen': 0, 'requeued': 0, 'duplicates': 0, 'workers': 0}
+
+        self._pending = deque(range(len(self.chunks)))
+        self._in_flight: Dict[int, Dict[int, float]] = {}  # チャンク番号 → {接続番号: 配布時刻}
+        self._diagnostics: Dict[int, Dict[str, Any]] = {}
+        self._error: Optional[str] = None
+        self._cond = threading.Condition()
+        self._address = address
+        self._server: Optional[socket.socket] = None
+        self._threads = []
+        self._closed = False
+
+    @property
+    def address(self) -> Address:
+        """実際の待ち受けアドレス（ポート 0 指定時は割り当てられたポート）"""
+        return self._server.getsockname() if self._server is not None else self._address
+
+    @property
+    def done(self) -> bool:
+        return len(self._diagnostics) == len(self.chunks)
+
+    def start(self) -> 'Coordinator':
+        """待ち受けの開始"""
+        server = socket.socket(_family(self._address), socket.SOCK_STREAM)
+        if isinstance(self._address, str):
+            if os.path.exists(self._address):
+                os.unlink(self._address)
+        else:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self._address)
+        server.listen()
+        self._server = server
+        thread = threading.Thread(target=self._accept_loop, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def _accept_loop(self):
+        conn_id = 0
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            conn_id += 1
+            thread = threading.Thread(target=self._serve, args=(conn, conn_id), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_chunk(self, conn_id: int) -> Optional[int]:
+        """配布するチャンク番号（待ち行列が空なら横取り対象、なければ None）"""
+        if self._pending:
+            return self._pending.popleft()
+        now = time.monotonic()
+        candidates = [(min(owners.values()), chunk_id) for chunk_id, owners in self._in_flight.items()
+                      if conn_id not in owners and now - min(owners.values()) >= self.steal_after]
+        if not candidates:
+            return None
+        self.stats['stolen'] += 1
+        return min(candidates)[1]
+
+    def _release(self, conn_id: int):
+        """接続が失われたワーカーのチャンクを待ち行列に戻す"""
+        with self._cond:
+            for chunk_id in list(self._in_flight):
+                owners = self._in_flight[chunk_id]
+                if owners.pop(conn_id, None) is None or owners:
+                    continue
+                del self._in_flight[chunk_id]
+                self.retries[chunk_id] += 1
+                if self.retries[chunk_id] > self.max_retries:
+                    self._error = f"チャンク {chunk_id} の再試行回数が上限を超えました"
+                else:
+                    self._pending.appendleft(chunk_id)
+                    self.stats['requeued'] += 1
+            self._cond.notify_all()
+
+    def _serve(self, conn: socket.socket, conn_id: int):
+        """1ワーカーとの通信"""
+        conn.settimeout(self.heartbeat_timeout)
+        try:
+            while True:
+                header, payload = recv_message(conn)
+                kind = header.get('type')
+                if kind == 'hello':
+                    with self._cond:
+                        self.stats['workers'] += 1
+                    send_message(conn, {'type': 'config', 'theta_range': list(self.theta_range),
+                                        'theta_step': self.theta_step, 'chunk_size': self.chunk_size,
+                                        'heartbeat_interval': self.heartbeat_timeout / 4})
+                elif kind == 'request':
+                    with self._cond:
+                        if self.done or self._error:
+                            send_message(conn, {'type': 'done'})
+                            break
+                        chunk_id = self._next_chunk(conn_id)
+                        if chunk_id is not None:
+                            self._in_flight.setdefault(chunk_id, {})[conn_id] = time.monotonic()
+                            self.stats['dispatched'] += 1
+                    if chunk_id is None:
+                        send_message(conn, {'type': 'wait', 'seconds': 0.05})
+                        continue
+                    start, stop = self.chunks[chunk_id]
+                    send_message(conn, {'type': 'chunk', 'chunk_id': chunk_id, 'start': start,
+                                        'stop': stop, 'columns': list(SHARED_CASE_ROWS)},
+                                 np.ascontiguousarray(self.cases[start:stop]).tobytes())
+                elif kind == 'result':
+                    self._accept_result(conn_id, header, payload)
+                # 'heartbeat' は受信したことのみで十分（タイムアウトの延長）
+        except (ConnectionError, socket.timeout, OSError, ValueError):
+            pass
+        finally:
+            conn.close()
+            self._release(conn_id)
+
+    def _accept_result(self, conn_id: int, header: Dict[str, Any], payload: bytes):
+        """ワーカーの結果の反映（不正なメッセージは ValueError とし、そのワーカーの切断として扱う）"""
+        chunk_id = header.get('chunk_id')
+        if not isinstance(chunk_id, int) or not 0 <= chunk_id < len(self.chunks) or 'diagnostics' not in header:
+            raise ValueError(f"不正な結果メッセージです（チャンク番号 {chunk_id!r}）")
+        start, stop = self.chunks[chunk_id]
+        m = stop - start
+        if len(payload) != 16 * m:
+            raise ValueError(f"チャンク {chunk_id} の結果の長さが不正です（{len(payload)} バイト）")
+        max_P = np.frombuffer(payload, dtype=np.float64, count=m)
+        critical_index = np.frombuffer(payload, dtype=np.int64, count=m, offset=8 * m)
+        if np.any((critical_index < -1) | (critical_index >= self.theta_d.size)):
+            raise ValueError(f"チャンク {chunk_id} の臨界角度の番号が範囲外です")
+        with self._cond:
+            self._in_flight.pop(chunk_id, None)
+            if chunk_id in self._diagnostics:
+                self.stats['duplicates'] += 1
+                return
+            self.max_P[start:stop] = max_P
+            self.critical_index[start:stop] = critical_index
+            self._diagnostics[chunk_id] = header['diagnostics']
+            self._cond.notify_all()
+        if self.on_result is not None:
+            self.on_result(start, stop, self.max_P[start:stop], self.critical_index[start:stop])
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        全チャンクの完了待ち
+
+        Args:
+            timeout: 最大待ち時間 [秒]（Noneの場合は無制限）
+
+        Returns:
+            結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+            diagnostics, stats)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.done or self._error is not None, timeout):
+                raise TimeoutError(f"分散計算が完了しません（{len(self._diagnostics)}/{len(self.chunks)} チャンク）")
+            if self._error is not None:
+                raise RuntimeError(self._error)
+
+        diagnostics = None
+        for chunk_id, (start, _) in enumerate(self.chunks):
+            diagnostics = merge_diagnostics(diagnostics, self._diagnostics[chunk_id], offset=start)
+        critical_theta_d = np.where(self.critical_index >= 0,
+                                    self.theta_d[self.critical_index], np.nan)
+        return {
+            'max_P': self.max_P,
+            'critical_theta_d': critical_theta_d,
+            'critical_theta_d_deg': np.degrees(critical_theta_d),
+            'critical_index': self.critical_index,
+            'theta_d': self.theta_d,
+            'diagnostics': diagnostics,
+            'stats': dict(self.stats),
+        }
+
+    def close(self):
+        """待ち受けの終了"""
+        self._closed = True
+        if self._server is not None:
+            self._server.close()
+            if isinstance(self._address, str) and os.path.exists(self._address):
+                os.unlink(self._address)
+
+    def __enter__(self) -> 'Coordinator':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_worker(address: Address, connect_timeout: float = 10.0) -> int:
+    """
+    ワーカーの実行（コーディネーターから 'done' を受け取るまでチャンクを処理する）
+
+    Args:
+        address: コーディネーターのアドレス（(host, port) または Unix ソケットのパス）
+        connect_timeout: 接続を試み続ける最大時間 [秒]
+
+    Returns:
+        処理したチャンク数
+    """
+    address = tuple(address) if not isinstance(address, str) else address
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        sock = socket.socket(_family(address), socket.SOCK_STREAM)
+        try:
+            sock.connect(address)
+            break
+        except OSError:
+            sock.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+    send_lock = threading.Lock()
+    stop = threading.Event()
+
+    def send(header, payload=b''):
+        with send_lock:
+            send_message(sock, header, payload)
+
+    def heartbeat(interval):
+        while not stop.wait(interval):
+            try:
+                send({'type': 'heartbeat'})
+            except OSError:
+                break
+
+    processed = 0
+    try:
+        send({'type': 'hello', 'pid': os.getpid()})
+        config, _ = recv_message(sock)
+        theta = theta_grid(tuple(config['theta_range']), config['theta_step'])
+        plan = SweepPlan(theta, config['chunk_size'])
+        threading.Thread(target=heartbeat, args=(config['heartbeat_interval'],), daemon=True).start()
+
+        while True:
+            send({'type': 'request'})
+            header, payload = recv_message(sock)
+            if header['type'] == 'done':
+                break
+            if header['type'] == 'wait':
+                time.sleep(header['seconds'])
+                continue
+
+            m = header['stop'] - header['start']
+            cases = np.frombuffer(payload, dtype=np.float64).reshape(m, len(header['columns']))
+            res = find_critical_pressure_batch(**{name: cases[:, j] for j, name in enumerate(header['columns'])},
+                                               plan=plan)
+            send({'type': 'result', 'chunk_id': header['chunk_id'], 'diagnostics': res['diagnostics']},
+                 res['max_P'].astype(np.float64).tobytes() + res['critical_index'].astype(np.int64).tobytes())
+            processed += 1
+    except ConnectionError:
+        pass
+    finally:
+        stop.set()
+        sock.close()
+    return processed
@@ -0,0 +1,245 @@
+"""
+入力変更に応じた差分再計算
+中間量（幾何・自重・粘着・上載荷重・支保圧・臨界条件・安全率）ごとに依存する入力を記録し、
+変更された入力に依存する段階だけを再計算する
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional, Set
+
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import (
+    SELF_WEIGHT_FIELDS, theta_grid, geometry_kernel, surcharge_kernel, self_weight_kernel,
+    cohesion_moment_kernel, support_pressure_kernel, SelfWeightWorkspace
+)
+
+
+# 入力パラメータ名
+INPUT_NAMES = ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K', 'force_finite_cover',
+               'theta_range', 'theta_step')
+
+# 各段階が直接依存する入力・段階（計算順）
+STAGE_DEPENDENCIES = {
+    'geometry': ('H_f', 'phi', 'theta_range', 'theta_step'),
+    'self_weight': ('geometry', 'gamma'),
+    'cohesion': ('geometry', 'coh'),
+    'surcharge': ('geometry', 'gamma', 'coh', 'H', 'alpha', 'K', 'force_finite_cover'),
+    'pressure': ('self_weight', 'cohesion', 'surcharge'),
+    'critical': ('pressure',),
+    'safety_factor': ('critical', 'gamma', 'coh', 'H', 'alpha', 'K', 'force_finite_cover'),
+}
+
+
+def _affected_stages(changed: Set[str]) -> Set[str]:
+    """変更された入力に（推移的に）依存する段階の集合"""
+    affected = set()
+    for stage, deps in STAGE_DEPENDENCIES.items():
+        if any(d in changed or d in affected for d in deps):
+            affected.add(stage)
+    return affected
+
+
+class IncrementalStudy:
+    """
+    差分再計算に対応したパラメトリックスタディ
+
+    update で入力を変更すると、その入力に依存する段階だけが無効化され、
+    次回の parametric_study / sweep で無効化された段階のみ再計算される。
+    例：α や K の変更では幾何・自重・粘着の計算は再利用され、上載荷重以降のみ再計算する。
+    """
+
+    def __init__(self, H_f: float, gamma: float, phi: float, coh: float,
+                 H: Optional[float] = None, alpha: float = 1.8, K: float = 1.0,
+                 force_finite_cover: bool = False, theta_range: tuple = (20, 80),
+                 theta_step: float = 1.0):
+        """
+        初期化（引数は MurayamaCalculatorRevised と find_critical_pressure と同じ）
+        """
+        self.inputs: Dict[str, Any] = {}
+        self.stages: Dict[str, Any] = {}
+        self.recompute_count = {stage: 0 for stage in STAGE_DEPENDENCIES}
+        self.calculator = None
+        self.update(H_f=H_f, gamma=gamma, phi=phi, coh=coh, H=H, alpha=alpha, K=K,
+                    force_finite_cover=force_finite_cover, theta_range=tuple(theta_range),
+                    theta_step=theta_step)
+
+    def update(self, **changes) -> Set[str]:
+        """
+        入力の変更と依存段階の無効化
+
+        Args:
+            **changes: 変更する入力（INPUT_NAMES のいずれか）
+
+        Returns:
+            無効化された段階の集合
+        """
+        unknown = set(changes) - set(INPUT_NAMES)
+        if unknown:
+            raise ValueError(f"不明な入力パラメータ: {', '.join(sorted(unknown))}")
+        if 'theta_range' in changes:
+            changes['theta_range'] = tuple(changes['theta_range'])
+
+        changed = {k for k, v in changes.items() if k not in self.inputs or self.inputs[k] != v}
+        if not changed:
+            return set()
+
+        new_inputs = dict(self.inputs, **changes)
+        # 入力値の妥当性チェック（安全率の計算にも使用）
+        calculator = MurayamaCalculatorRevised(
+            new_inputs['H_f'], new_inputs['gamma'], new_inputs['phi'], new_inputs['coh'],
+            new_inputs['H'], new_inputs['alpha'], new_inputs['K'], new_inputs['force_finite_cover']
+        )
+        self.inputs = new_inputs
+        self.calculator = calculator
+
+        affected = _affected_stages(changed)
+        for stage in affected:
+            self.stages.pop(stage, None)
+        return affected
+
+    def _compute(self, stage: str):
+        """段階を（必要なら依存段階から順に）計算して返す"""
+        if stage in self.stages:
+            return self.stages[stage]
+        for dep in STAGE_DEPENDENCIES[stage]:
+            if dep in STAGE_DEPENDENCIES:
+                self._compute(dep)
+        self.stages[stage] = getattr(self, f'_stage_{stage}')()
+        self.recompute_count[stage] += 1
+        return self.stages[stage]
+
+    # 各段階の計算 -------------------------------------------------------
+
+    def _stage_geometry(self) -> Dict[str, np.ndarray]:
+        inp = self.inputs
+        theta = theta_grid(inp['theta_range'], inp['theta_step'])
+        n = theta.size
+        self._work = {name: np.empty(n) for name in ('e', 'phi_theta', 'tmp')}
+        self._work['ok'] = np.empty(n, dtype=bool)
+        self._self_weight_work, _ = SelfWeightWorkspace(n).views(n)
+
+        geom = {name: np.empty(n) for name in ('r0', 'rd', 'la', 'B', 'lp')}
+        geometry_kernel(theta, inp['H_f'], np.radians(inp['phi']), geom, self._work)
+        geom['theta_d'] = theta
+        geom['valid'] = self._work['ok'] & (geom['B'] > 0.1)
+        return geom
+
+    def _stage_self_weight(self) -> Dict[str, np.ndarray]:
+        inp, geom = self.inputs, self.stages['geometry']
+        out = {name: np.empty(geom['theta_d'].size) for name in SELF_WEIGHT_FIELDS}
+        return self_weight_kernel(geom['r0'], geom['rd'], geom['theta_d'], geom['B'], geom['la'],
+                                  inp['H_f'], inp['gamma'], np.radians(inp['phi']),
+                                  out=out, work=self._self_weight_work)
+
+    def _stage_cohesion(self) -> np.ndarray:
+        inp, geom = self.inputs, self.stages['geometry']
+        return cohesion_moment_kernel(geom['r0'], geom['rd'], np.radians(inp['phi']), inp['coh'],
+                                      np.empty(geom['theta_d'].size), self._work)
+
+    def _stage_surcharge(self) -> np.ndarray:
+        inp, geom = self.inputs, self.stages['geometry']
+        H = np.inf if inp['H'] is None else inp['H']
+        return surcharge_kernel(geom['B'], inp['gamma'], np.radians(inp['phi']), inp['coh'], H,
+                                inp['alpha'], inp['K'], inp['force_finite_cover'],
+                                np.empty(geom['theta_d'].size), self._work)
+
+    def _stage_pressure(self) -> Dict[str, np.ndarray]:
+        geom = self.stages['geometry']
+        fields = dict(geom, **self.stages['self_weight'])
+        fields['q'] = self.stages['surcharge']
+        fields['Mc'] = self.stages['cohesion']
+        fields['P'] = np.empty(geom['theta_d'].size)
+        P = support_pressure_kernel(fields, self._work)
+        valid = geom['valid'] & np.isfinite(P)
+        P[~valid] = np.nan
+        return {'P': P, 'valid': valid}
+
+    def _stage_critical(self) -> Dict[str, Any]:
+        pressure = self.stages['pressure']
+        if not pressure['valid'].any():
+            raise ValueError("有効な解が見つかりませんでした")
+        i = int(np.argmax(np.where(pressure['valid'], pressure['P'], -np.inf)))
+        return {'index': i, 'max_P': float(pressure['P'][i]),
+                'theta_d': float(self.stages['geometry']['theta_d'][i])}
+
+    def _stage_safety_factor(self) -> Dict[str, Any]:
+        return self.calculator.calculate_true_safety_factor(self.stages['critical']['theta_d'])
+
+    # 結果 ---------------------------------------------------------------
+
+    def sweep(self) -> Dict[str, np.ndarray]:
+        """
+        全角度の計算結果（安全率は計算しない）
+
+        Returns:
+            角度ごとの量の辞書 (theta_d, r0, rd, la, B, lp, q, Wf, lw, w1, lw1, w2, lw2, Mc, P, valid)
+        """
+        self._compute('pressure')
+        out = dict(self.stages['geometry'])
+        out.update(self.stages['self_weight'])
+        out['q'] = self.stages['surcharge']
+        out['Mc'] = self.stages['cohesion']
+        out.update(self.stages['pressure'])
+        return out
+
+    def parametric_study(self) -> Dict[str, Any]:
+        """
+        MurayamaCalculatorRevised.parametric_study と同じ形式の結果
+
+        Returns:
+            解析結果の辞書
+        """
+        sweep = self.sweep()
+        critical = self._compute('critical')
+        sf_result = self._compute('safety_factor')
+        i = critical['index']
+        max_P = critical['max_P']
+        theta_range = self.inputs['theta_range']
+
+        valid_index = np.flatnonzero(sweep['valid'])
+        detailed_results = [{
+            'theta_deg': float(np.degrees(sweep['theta_d'][j])),
+            'theta_rad': float(sweep['theta_d'][j]),
+            'r0_m': float(sweep['r0'][j]),
+            'rd_m': float(sweep['rd'][j]),
+            'B_m': float(sweep['B'][j]),
+            'la_m': float(sweep['la'][j]),
+            'lp_m': float(sweep['lp'][j]),
+            'q_kN_m2': float(sweep['q'][j]),
+            'Wf_kN': float(sweep['Wf'][j]),
+            'lw_m': float(sweep['lw'][j]),
+            'Mc_kNm': float(sweep['Mc'][j]),
+            'P_kN_m2': float(sweep['P'][j])
+        } for j in valid_index]
+
+        critical_geometry = {k: float(sweep[k][i]) for k in ('r0', 'rd', 'la', 'B', 'lp')}
+        safety_factor = sf_result['safety_factor']
+        stability = "安定" if max_P <= 0 else "不安定"
+        theta_degrees = np.degrees(sweep['theta_d'])
+        if self.inputs['theta_step'] == 1.0:
+            theta_degrees = np.arange(theta_range[0], theta_range[1] + 1, 1)
+
+        return {
+            'r0_values': np.ones(len(theta_degrees)) * critical_geometry['r0'],
+            'theta_values': np.radians(theta_degrees),
+            'theta_degrees': theta_degrees,
+            'P_matrix': sweep['P'][valid_index].reshape(1, -1),
+            'detailed_results': detailed_results,
+            'max_P': max_P,
+            'critical_r0': critical_geometry['r0'],
+            'critical_theta': critical['theta_d'],
+            'critical_theta_deg': float(np.degrees(critical['theta_d'])),
+            'critical_geometry': critical_geometry,
+            'critical_moments': {
+                'area': 0,  # ダミー値
+                'centroid_x': float(sweep['lw'][i]),
+                'M_W': float(sweep['Wf'][i] * sweep['lw'][i]),
+                'M_Q': float(sweep['q'][i] * critical_geometry['B'] * (critical_geometry['la'] + critical_geometry['B'] / 2)),
+                'M_tau': float(sweep['Mc'][i])
+            },
+            'safety_factor': safety_factor,
+            'stability': stability,
+            'detailed_stability': stability,
+            'stability_percentage': min(100, safety_factor * 50) if safety_factor != float('inf') else 100,
+            'true_safety_factor_result': sf_result
+        }
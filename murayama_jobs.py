@@ -0,0 +1,325 @@
+"""
+バックグラウンド計算ジョブ
+細かい刻みの θd 掃引や多数ケースの一括計算を共有のワーカープールで実行し、
+進捗・途中結果の参照とキャンセルを可能にする（Streamlit の複数セッションで1つのプールを共有）。
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+import numpy as np
+
+from murayama_vectorized import (ArrayLike, theta_grid, evaluate_support_pressure,
+                                 find_critical_pressure_batch)
+from murayama_numba import find_critical_pressure_fused
+from murayama_anytime import anytime_critical_pressure
+
+
+# ジョブの状態
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+
+FINISHED = (DONE, CANCELLED, ERROR)
+
+
+class JobCancelled(Exception):
+    """ジョブがキャンセルされた"""
+
+
+class JobContext:
+    """ジョブ関数に渡す進捗報告・キャンセル確認の窓口"""
+
+    def __init__(self, job: 'Job'):
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job._cancel.is_set()
+
+    def check(self):
+        """キャンセルされていれば JobCancelled を送出"""
+        if self._job._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, progress: float, partial: Optional[Dict[str, Any]] = None):
+        """
+        進捗と途中結果を報告し、キャンセルされていれば JobCancelled を送出
+
+        Args:
+            progress: 進捗 (0～1)
+            partial: 途中結果（参照側はコピーせずに読む）
+        """
+        with self._job._lock:
+            self._job.progress = min(max(float(progress), 0.0), 1.0)
+            if partial is not None:
+                self._job.partial = partial
+        self.check()
+
+
+class Job:
+    """1つのバックグラウンド計算"""
+
+    def __init__(self, job_id: str, name: str):
+        self.id = job_id
+        self.name = name
+        self.status = PENDING
+        self.progress = 0.0
+        self.partial: Optional[Dict[str, Any]] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def elapsed(self) -> float:
+        """実行時間 [秒]（未開始は0）"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def cancel(self):
+        """キャンセルを要求（実行中のジョブは次の進捗報告で停止する）"""
+        self._cancel.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """表示用の状態（進捗と途中結果の組が一貫した値）"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'progress': self.progress,
+                'partial': self.partial,
+                'result': self.result,
+                'error': None if self.error is None else str(self.error),
+                'elapsed': self.elapsed,
+            }
+
+
+class JobManager:
+    """
+    共有ワーカープールでジョブを実行する
+
+    ジョブ関数は第1引数に JobContext を受け取り、適宜 report で進捗と途中結果を報告する。
+    完了したジョブは retention 秒後に一覧から削除する。
+    """
+
+    def __init__(self, max_workers: int = 2, retention: float = 3600.0):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='murayama-job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.retention = retention
+
+    def submit(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        ジョブを投入
+
+        Args:
+            name: 表示用のジョブ名
+            func: ジョブ関数 func(ctx, *args, **kwargs)
+            *args, **kwargs: func の引数
+
+        Returns:
+            投入したジョブ
+        """
+        job = Job(f"job-{next(self._ids)}", name)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job: Job, func, args, kwargs):
+        with job._lock:
+            if job._cancel.is_set():
+                job.status = CANCELLED
+                job.finished_at = time.time()
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = func(JobContext(job), *args, **kwargs)
+        except JobCancelled:
+            status, result, error = CANCELLED, None, None
+        except Exception as e:
+            status, result, error = ERROR, None, e
+        else:
+            status, error = DONE, None
+        with job._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            if status == DONE:
+                job.progress = 1.0
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """ジョブを取得（存在しない・削除済みの場合は None）"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """ジョブのキャンセルを要求（未完了のジョブがあれば True）"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def active_count(self) -> int:
+        """未完了のジョブ数"""
+        with self._lock:
+            return sum(not job.finished for job in self._jobs.values())
+
+    def _purge(self):
+        limit = time.time() - self.retention
+        for job_id in [k for k, job in self._jobs.items()
+                       if job.finished and job.finished_at < limit]:
+            del self._jobs[job_id]
+
+    def shutdown(self, cancel: bool = True):
+        """プールを停止（cancel=True の場合は未完了のジョブをキャンセル）"""
+        if cancel:
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                job.cancel()
+        self._executor.shutdown(wait=True)
+
+
+def fine_sweep_job(ctx: JobContext, calculator, theta_range: tuple = (20, 80),
+                   theta_step: float = 0.01, chunk_points: int = 500) -> Dict[str, Any]:
+    """
+    1ケースの細かい刻みの θd 掃引（ジョブ関数）
+
+    chunk_points 点ごとに evaluate_support_pressure で評価し、途中結果として
+    評価済みの角度・P と暫定の最大値を報告する。
+
+    Args:
+        ctx: JobContext
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        chunk_points: 1回の評価・報告の角度数
+
+    Returns:
+        結果の辞書 (theta_d_deg, P, valid, max_P, critical_theta_deg)。有効な角度がない場合 max_P = NaN
+    """
+    theta = theta_grid(theta_range, theta_step)
+    n = len(theta)
+    P = np.full(n, np.nan)
+    valid = np.zeros(n, dtype=bool)
+    theta_deg = np.degrees(theta)
+
+    def summary(stop):
+        P_done = np.where(valid[:stop], P[:stop], np.nan)
+        if not np.any(valid[:stop]):
+            return {'theta_d_deg': theta_deg[:stop], 'P': P_done, 'valid': valid[:stop],
+                    'max_P': np.nan, 'critical_theta_deg': np.nan}
+        i = int(np.nanargmax(P_done))
+        return {'theta_d_deg': theta_deg[:stop], 'P': P_done, 'valid': valid[:stop],
+                'max_P': float(P_done[i]), 'critical_theta_deg': float(theta_deg[i])}
+
+    for start in range(0, n, chunk_points):
+        stop = min(start + chunk_points, n)
+        res = evaluate_support_pressure(calculator, theta[start:stop])
+        P[start:stop] = res['P']
+        valid[start:stop] = res['valid']
+        ctx.report(stop / n, summary(stop))
+    return summary(n)
+
+
+def batch_job(ctx: JobContext, H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+              H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8, K: ArrayLike = 1.0,
+              force_finite_cover: ArrayLike = False, theta_range: tuple = (20, 80),
+              theta_step: float = 1.0, chunk_size: int = 1024,
+              safety_factor: bool = False) -> Dict[str, Any]:
+    """
+    多数ケースの臨界支保圧の一括探索（ジョブ関数、グリッド・モンテカルロ・ケースファイルの計算用）
+
+    chunk_size ケースごとに find_critical_pressure_batch で計算し、未計算のケースを NaN とした
+    max_P と計算済みケース数 n_done を途中結果として報告する（配列は計算の進行に伴い埋まっていく）。
+    safety_factor=True の場合は find_critical_pressure_fused で臨界角度での安全率も計算する。
+
+    Args:
+        ctx: JobContext
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        chunk_size: 1回の計算・報告のケース数
+        safety_factor: True の場合は臨界角度での強度低減安全率も計算する
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d_deg, critical_index, theta_d, n_done[, safety_factor])
+    """
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+              'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    n = max(np.size(v) for v in inputs.values())
+    theta = theta_grid(theta_range, theta_step)
+    max_P = np.full(n, np.nan)
+    critical_theta_d_deg = np.full(n, np.nan)
+    critical_index = np.full(n, -1, dtype=np.intp)
+    sf = np.full(n, np.nan) if safety_factor else None
+
+    def summary(stop):
+        result = {'max_P': max_P, 'critical_theta_d_deg': critical_theta_d_deg,
+                  'critical_index': critical_index, 'theta_d': theta, 'n_done': stop}
+        if safety_factor:
+            result['safety_factor'] = sf
+        return result
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        sl = slice(start, stop)
+        chunk = {k: (v if np.ndim(v) == 0 else np.asarray(v)[sl]) for k, v in inputs.items()}
+        if safety_factor:
+            res = find_critical_pressure_fused(**chunk, theta_range=theta_range, theta_step=theta_step,
+                                               safety_factor=True)
+            sf[sl] = res['safety_factor']
+        else:
+            res = find_critical_pressure_batch(**chunk, theta_range=theta_range, theta_step=theta_step,
+                                               batch_size=chunk_size)
+        max_P[sl] = res['max_P']
+        critical_theta_d_deg[sl] = res['critical_theta_d_deg']
+        critical_index[sl] = res['critical_index']
+        ctx.report(stop / n, summary(stop))
+    return summary(n)
+
+
+def anytime_job(ctx: JobContext, calculator, theta_range: tuple = (20, 80), coarse_step: float = 5.0,
+                refine_ratio: int = 5, tol_deg: float = 0.01,
+                deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    臨界条件の段階的な精緻化（ジョブ関数）
+
+    anytime_critical_pressure の各段階の結果を途中結果として報告する。
+
+    Args:
+        ctx: JobContext
+        calculator: MurayamaCalculatorRevised のインスタンス（ジョブ専用のもの）
+        theta_range, coarse_step, refine_ratio, tol_deg, deadline: anytime_critical_pressure と同じ
+
+    Returns:
+        最後の段階の結果の辞書
+    """
+    n_stages = 1 + max(0, int(np.ceil(np.log(coarse_step / tol_deg) / np.log(refine_ratio))))
+    result = None
+    for result in anytime_critical_pressure(calculator, theta_range, coarse_step, refine_ratio,
+                                            tol_deg, deadline):
+        ctx.report((result['stage'] + 1) / n_stages, result)
+    return result
@@ -0,0 +1,420 @@
+"""
+村山の式の融合カーネル（Numba JIT、オプション）
+幾何 → q, Wf, lw, Mc → P → θd 方向の最大値 をケースごとに1要素ずつ計算し、中間配列を作らない。
+Numba がインストールされていない場合は NumPy 実装（murayama_vectorized）で計算する。
+"""
+
+import math
+import numpy as np
+from typing import Dict, Any, Optional
+
+from murayama_vectorized import (
+    ArrayLike, theta_grid, find_critical_pressure_batch, geometry_kernel, surcharge_kernel,
+    self_weight_kernel, cohesion_moment_kernel, support_pressure_kernel, SELF_WEIGHT_FIELDS
+)
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Numba がない場合は関数をそのまま返す"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# 安全率の二分探索の設定（calculate_true_safety_factor と同じ）
+SF_LOWER = 0.1
+SF_UPPER = 10.0
+SF_TOLERANCE = 0.001
+SF_MAX_EXPAND = 8
+SF_MAX_ITERATIONS = 30
+
+# NumPy 版で1回の実行計画に載せるケース数×角度の点数の上限（作業配列 約 250 MB）
+PLAN_POINTS = 1 << 20
+
+# math.exp がオーバーフローしない引数の上限
+_EXP_MAX = math.log(np.finfo(float).max)
+
+
+@njit(cache=True)
+def _exp(x):
+    """オーバーフロー時に inf を返す exp"""
+    return math.exp(x) if x < _EXP_MAX else math.inf
+
+
+@njit(cache=True)
+def _div(a, b):
+    """ゼロ除算で NumPy と同じ inf/NaN を返す除算"""
+    if b != 0.0:
+        return a / b
+    if a == 0.0 or a != a:
+        return math.nan
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+@njit(cache=True)
+def case_pressure(theta_d, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover):
+    """
+    1ケース・1角度の支保圧（calculate_support_pressure(detail='pressure') と同じ式）
+
+    Args:
+        theta_d: 探索角度 [ラジアン]
+        H_f, gamma, coh, alpha, K: 地盤条件・係数
+        phi: 内部摩擦角 [ラジアン]
+        H: 土被り [m]（inf は深部前提）
+        force_finite_cover: 有限土被り式を強制するフラグ
+
+    Returns:
+        支保圧 P [kN/m²]（幾何不適切は NaN、B ≤ 0.1 は安全率の二分探索で安定側とするため -inf。
+        calculate_support_pressure ではいずれも NaN・valid=False）
+    """
+    tan_phi = math.tan(phi)
+    sin_phi = math.sin(phi)
+    cos_phi = math.cos(phi)
+
+    # 幾何の閉合
+    e = _exp(theta_d * tan_phi)
+    denominator = e * math.sin(phi + theta_d) - sin_phi
+    if abs(denominator) < 1e-10:
+        return math.nan
+    r0 = H_f / denominator
+    rd = r0 * e
+    la = rd * math.cos(phi + theta_d)
+    B = r0 * cos_phi - la
+    lp = r0 * sin_phi + H_f / 2
+    if not B > 0.1:
+        return -math.inf
+
+    # 上載荷重 q
+    q = (alpha * B * (gamma - 2 * coh / (alpha * B))) / (2 * K * tan_phi)
+    if force_finite_cover or not H > 1.5 * B:
+        q *= 1.0 - _exp(-2.0 * K * H * tan_phi / (alpha * B))
+
+    # 自重（Excel M9式）
+    term2 = (rd * rd - r0 * r0) / (4 * tan_phi)
+    term3 = r0 * rd * math.sin(theta_d) / 2
+    Wf = gamma * (H_f * B / 2 + term2 - term3)
+    w1 = gamma * H_f * B / 2
+    lw1 = la + B / 3
+    w2 = gamma * (term2 - term3)
+
+    O = math.hypot(B, H_f)
+    a = math.atan2(H_f, B) + phi
+    sin_a = math.sin(a)
+    S = math.sqrt(max(O * O / 4.0 + r0 * r0 - O * r0 * math.cos(a), 0.0))
+    R = r0 * sin_a
+    if S > 0.0:
+        cos_arg = R / S
+        cos_arg = -1.0 if cos_arg < -1.0 else (1.0 if cos_arg > 1.0 else cos_arg)
+    else:
+        cos_arg = 1.0
+    T = math.acos(cos_arg) - (a - math.pi / 2.0)
+    U = (r0 * _exp(T * tan_phi) - S) * R / (S if S != 0.0 else 1.0)
+    V = math.pi - 2 * math.atan(O / (2 * U)) if abs(U) > 1e-12 else math.pi
+    cos_V = math.cos(V)
+    sin_V = math.sin(V)
+    inner = ((2.0 / 3.0) * _div(U, 1 - cos_V) * _div(1 - cos_V * cos_V, V - sin_V * cos_V) * sin_V
+             - _div(U * cos_V, 1 - cos_V))
+    lw2 = S * math.cos(phi + T) + inner * math.cos(math.atan2(B, H_f))
+    if abs(w1 + w2) > 1e-12:
+        lw = (w1 * lw1 + w2 * lw2) / (w1 + w2)
+    else:
+        lw = la + B / 2
+
+    # 粘着抵抗モーメントと支保圧
+    Mc = coh * (rd * rd - r0 * r0) / (2 * tan_phi)
+    return _div(Wf * lw + q * B * (la + B / 2) - Mc, lp)
+
+
+@njit(cache=True, parallel=True)
+def fused_sweep_kernel(theta, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover,
+                       max_P, critical_index):
+    """
+    全ケースの θd 掃引と最大値（ケース方向に並列化）
+
+    Args:
+        theta: 探索角度 (n_theta,) [ラジアン]
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: ケースパラメータ (n,)（φはラジアン）
+        max_P: 出力 最大支保圧 (n,)（有効な角度がない場合は NaN）
+        critical_index: 出力 臨界角度のインデックス (n,)（有効な角度がない場合は -1）
+    """
+    for i in prange(H_f.shape[0]):
+        best = -math.inf
+        best_index = -1
+        for j in range(theta.shape[0]):
+            P = case_pressure(theta[j], H_f[i], gamma[i], phi[i], coh[i], H[i], alpha[i], K[i],
+                              force_finite_cover[i])
+            # 非有限値（幾何不適切・B ≤ 0.1）は無効
+            if P > best and P < math.inf:
+                best = P
+                best_index = j
+        max_P[i] = best if best_index >= 0 else math.nan
+        critical_index[i] = best_index
+
+
+@njit(cache=True)
+def _sign(x):
+    """np.sign と同じ符号（0 は 0）"""
+    if x > 0.0:
+        return 1
+    if x < 0.0:
+        return -1
+    return 0
+
+
+@njit(cache=True)
+def _reduced_pressure(factor, theta_d, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover):
+    """強度低減係数 factor（c' = c/F, tanφ' = tanφ/F）での支保圧"""
+    return case_pressure(theta_d, H_f, gamma, math.atan(math.tan(phi) / factor), coh / factor,
+                         H, alpha, K, force_finite_cover)
+
+
+@njit(cache=True, parallel=True)
+def fused_safety_factor_kernel(theta_d, H_f, gamma, phi, coh, H, alpha, K, force_finite_cover,
+                               safety_factor):
+    """
+    全ケースの強度低減安全率（calculate_true_safety_factor の二分探索、ケース方向に並列化）
+
+    Args:
+        theta_d: ケースごとの臨界角度 (n,) [ラジアン]（NaN のケースは安全率 NaN）
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: ケースパラメータ (n,)（φはラジアン）
+        safety_factor: 出力 安全率 (n,)
+    """
+    for i in prange(H_f.shape[0]):
+        t = theta_d[i]
+        if t != t:
+            safety_factor[i] = math.nan
+            continue
+        # ケースの値は型の揃わないタプルにまとめず、個別の変数で渡す（prange 内の型推論のため）
+        h_f = H_f[i]
+        g = gamma[i]
+        p = phi[i]
+        c = coh[i]
+        h = H[i]
+        a = alpha[i]
+        k = K[i]
+        finite = force_finite_cover[i]
+
+        # 初期括り出し
+        lower = SF_LOWER
+        upper = SF_UPPER
+        P_lower = _reduced_pressure(lower, t, h_f, g, p, c, h, a, k, finite)
+        P_upper = _reduced_pressure(upper, t, h_f, g, p, c, h, a, k, finite)
+        for _ in range(SF_MAX_EXPAND):
+            if not (P_lower != P_lower or P_upper != P_upper or _sign(P_lower) == _sign(P_upper)):
+                break
+            if P_upper != P_upper or P_upper <= 0.0:
+                upper *= 2.0
+                P_upper = _reduced_pressure(upper, t, h_f, g, p, c, h, a, k, finite)
+            if P_lower != P_lower or P_lower > 0.0:
+                lower /= 2.0
+                P_lower = _reduced_pressure(lower, t, h_f, g, p, c, h, a, k, finite)
+
+        if P_lower != P_lower or P_upper != P_upper or _sign(P_lower) == _sign(P_upper):
+            # 常に安定（P<=0）の場合は安全率→∞、常に不安定の場合は0
+            safety_factor[i] = math.inf if (P_lower <= 0 and P_upper <= 0) else 0.0
+            continue
+
+        # 二分探索
+        iteration = 0
+        while upper - lower > SF_TOLERANCE and iteration < SF_MAX_ITERATIONS:
+            factor = (upper + lower) / 2
+            P = _reduced_pressure(factor, t, h_f, g, p, c, h, a, k, finite)
+            if P != P:
+                if factor < 1.0:
+                    lower = factor
+                else:
+                    upper = factor
+            elif P > 0:
+                upper = factor
+            else:
+                lower = factor
+            iteration += 1
+        safety_factor[i] = (upper + lower) / 2
+
+
+def _case_arrays(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover) -> Dict[str, np.ndarray]:
+    """ケースパラメータを長さnの連続配列に揃える（φはラジアン、H の None/NaN は inf）"""
+    H = np.inf if H is None else H
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float))
+                                   for v in (H_f, gamma, phi, coh, H, alpha, K)))
+    n = arrays[0].size
+    case = dict(zip(('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K'),
+                    (np.ascontiguousarray(a.ravel()) for a in arrays)))
+    case['phi'] = np.radians(case['phi'])
+    case['H'] = np.where(np.isnan(case['H']), np.inf, case['H'])
+    case['force_finite_cover'] = np.ascontiguousarray(
+        np.broadcast_to(np.asarray(force_finite_cover, dtype=np.bool_).ravel(), (n,)))
+    return case
+
+
+def _pressure_numpy(theta_d: np.ndarray, case: Dict[str, np.ndarray]) -> np.ndarray:
+    """ケースごとに1角度の支保圧（NumPy版、幾何不適切は NaN、B ≤ 0.1 は -inf）"""
+    n = theta_d.size
+    v = {name: np.empty(n) for name in ('r0', 'rd', 'la', 'B', 'lp', 'q', 'Mc', 'P') + SELF_WEIGHT_FIELDS}
+    work = {name: np.empty(n) for name in ('e', 'phi_theta', 'tmp')}
+    work['ok'] = np.empty(n, dtype=bool)
+
+    geometry_kernel(theta_d, case['H_f'], case['phi'], v, work)
+    degenerate = ~work['ok']
+    surcharge_kernel(v['B'], case['gamma'], case['phi'], case['coh'], case['H'], case['alpha'],
+                     case['K'], case['force_finite_cover'], v['q'], work)
+    self_weight_kernel(v['r0'], v['rd'], theta_d, v['B'], v['la'], case['H_f'], case['gamma'],
+                       case['phi'], out=v)
+    cohesion_moment_kernel(v['r0'], v['rd'], case['phi'], case['coh'], v['Mc'], work)
+    P = support_pressure_kernel(v, work)
+    with np.errstate(invalid='ignore'):
+        P[~(v['B'] > 0.1)] = -np.inf
+    P[degenerate] = np.nan
+    return P
+
+
+def _safety_factor_numpy(theta_d: np.ndarray, case: Dict[str, np.ndarray]) -> np.ndarray:
+    """fused_safety_factor_kernel と同じ二分探索を全ケース同時に行う（NumPy版）"""
+    n = theta_d.size
+    base = dict(case)
+
+    def pressure(factor):
+        reduced = dict(base, coh=base['coh'] / factor, phi=np.arctan(np.tan(base['phi']) / factor))
+        return _pressure_numpy(theta_d, reduced)
+
+    def bracketed(P_lower, P_upper):
+        return ~(np.isnan(P_lower) | np.isnan(P_upper) | (np.sign(P_lower) == np.sign(P_upper)))
+
+    lower = np.full(n, SF_LOWER)
+    upper = np.full(n, SF_UPPER)
+    P_lower = pressure(lower)
+    P_upper = pressure(upper)
+    with np.errstate(invalid='ignore'):
+        for _ in range(SF_MAX_EXPAND):
+            todo = ~bracketed(P_lower, P_upper)
+            if not todo.any():
+                break
+            grow = todo & (np.isnan(P_upper) | (P_upper <= 0.0))
+            upper = np.where(grow, upper * 2.0, upper)
+            P_upper = np.where(grow, pressure(upper), P_upper)
+            shrink = todo & (np.isnan(P_lower) | (P_lower > 0.0))
+            lower = np.where(shrink, lower / 2.0, lower)
+            P_lower = np.where(shrink, pressure(lower), P_lower)
+
+        ok = bracketed(P_lower, P_upper)
+        safety_factor = np.where((P_lower <= 0) & (P_upper <= 0), np.inf, 0.0)
+
+        for _ in range(SF_MAX_ITERATIONS):
+            active = ok & (upper - lower > SF_TOLERANCE)
+            if not active.any():
+                break
+            factor = (upper + lower) / 2
+            P = pressure(factor)
+            move_upper = np.where(np.isnan(P), factor >= 1.0, P > 0)
+            upper = np.where(active & move_upper, factor, upper)
+            lower = np.where(active & ~move_upper, factor, lower)
+
+    safety_factor[ok] = ((upper + lower) / 2)[ok]
+    safety_factor[np.isnan(theta_d)] = np.nan
+    return safety_factor
+
+
+def find_critical_pressure_fused(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                                 H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                 K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                 theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                 safety_factor: bool = False, backend: str = 'auto') -> Dict[str, Any]:
+    """
+    多数ケースの臨界支保圧（と安全率）の一括計算
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        safety_factor: True の場合は臨界角度での強度低減安全率も計算する
+        backend: 'auto'（Numba があれば 'numba'、なければ 'numpy'）, 'numba', 'numpy',
+                 'python'（融合カーネルをコンパイルせずに実行、検証用）
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        backend[, safety_factor])
+    """
+    if backend == 'auto':
+        backend = 'numba' if NUMBA_AVAILABLE else 'numpy'
+    if backend not in ('numba', 'numpy', 'python'):
+        raise ValueError(f"不明な backend: {backend}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("backend='numba' には numba のインストールが必要です")
+
+    theta = theta_grid(theta_range, theta_step)
+    case = _case_arrays(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover)
+    n = case['H_f'].size
+
+    if backend == 'numpy':
+        # 実行計画の作業配列がケース数×角度の点数に比例するため、1回に扱う点数を PLAN_POINTS までとする
+        res = find_critical_pressure_batch(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover,
+                                           theta_range, theta_step,
+                                           batch_size=max(1, min(1024, PLAN_POINTS // theta.size)))
+        max_P, critical_index = res['max_P'], res['critical_index']
+    else:
+        # 'python' は Numba がある場合もコンパイル前の関数を使う
+        sweep = getattr(fused_sweep_kernel, 'py_func', fused_sweep_kernel) if backend == 'python' \
+            else fused_sweep_kernel
+        max_P = np.empty(n)
+        critical_index = np.empty(n, dtype=np.intp)
+        sweep(theta, case['H_f'], case['gamma'], case['phi'], case['coh'], case['H'],
+              case['alpha'], case['K'], case['force_finite_cover'], max_P, critical_index)
+
+    critical_theta_d = np.where(critical_index >= 0, theta[critical_index], np.nan)
+    result = {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': theta,
+        'backend': backend,
+    }
+
+    if safety_factor:
+        result['safety_factor'] = _safety_factor(critical_theta_d, case, backend)
+    return result
+
+
+def _safety_factor(theta_d: np.ndarray, case: Dict[str, np.ndarray], backend: str) -> np.ndarray:
+    """臨界角度での安全率（backend は 'numba', 'numpy', 'python'）"""
+    if backend == 'numpy':
+        return _safety_factor_numpy(theta_d, case)
+    solver = getattr(fused_safety_factor_kernel, 'py_func', fused_safety_factor_kernel) \
+        if backend == 'python' else fused_safety_factor_kernel
+    out = np.empty(theta_d.size)
+    solver(theta_d, case['H_f'], case['gamma'], case['phi'], case['coh'], case['H'],
+           case['alpha'], case['K'], case['force_finite_cover'], out)
+    return out
+
+
+def safety_factor_at(critical_theta_d: ArrayLike, H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike,
+                     coh: ArrayLike, H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                     K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                     backend: str = 'auto') -> np.ndarray:
+    """
+    臨界角度が既知のケースの強度低減安全率（掃引をやり直さない、find_critical_pressure_fused と同じ値）
+
+    Args:
+        critical_theta_d: ケースごとの臨界角度 [ラジアン]（NaN のケースは安全率 NaN）
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        backend: find_critical_pressure_fused と同じ
+
+    Returns:
+        安全率 (n,)
+    """
+    if backend == 'auto':
+        backend = 'numba' if NUMBA_AVAILABLE else 'numpy'
+    if backend not in ('numba', 'numpy', 'python'):
+        raise ValueError(f"不明な backend: {backend}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("backend='numba' には numba のインストールが必要です")
+    case = _case_arrays(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover)
+    theta_d = np.ascontiguousarray(np.broadcast_to(np.asarray(critical_theta_d, dtype=float).ravel(),
+                                                   case['H_f'].shape))
+    return _safety_factor(theta_d, case, backend)
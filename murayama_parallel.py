@@ -0,0 +1,305 @@
+"""
+多数ケースの並列一括計算
+大きなバッチをチャンクに分割し、各チャンクを SweepPlan で計算して事前確保した結果配列に書き込む
+- スレッド並列: 同一プロセス内の共有配列に書き込む
+- プロセス並列: 入力・結果配列を共有メモリ上に置き、ワーカーにはチャンクの範囲のみを渡す
+"""
+
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Any, Optional, List
+
+from murayama_vectorized import (
+    ArrayLike, SweepPlan, theta_grid, sweep_diagnostics, merge_diagnostics
+)
+
+
+# チャンクの作業配列の目安（L2キャッシュ程度）[バイト]
+DEFAULT_CACHE_BYTES = 1 << 20
+
+
+def chunk_cases_for_cache(n_theta: int, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                          dtype=np.float64) -> int:
+    """
+    作業配列がキャッシュに収まるチャンクのケース数
+
+    1ケースあたりの作業配列の大きさは SweepPlan.bytes_per_case による。
+
+    Args:
+        n_theta: 探索角度の数
+        cache_bytes: 作業配列の目安サイズ [バイト]
+        dtype: 浮動小数点型
+
+    Returns:
+        チャンクのケース数（1以上）
+    """
+    return max(1, int(cache_bytes // SweepPlan.bytes_per_case(n_theta, dtype)))
+
+
+def find_critical_pressure_threaded(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                                    H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                    K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                    theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                    chunk_size: Optional[int] = None,
+                                    max_workers: Optional[int] = None,
+                                    return_sweep: bool = False,
+                                    executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """
+    多数ケースの臨界支保圧のスレッド並列一括探索（find_critical_pressure_batch と同じ結果）
+
+    NumPy の ufunc は大きな配列の計算中に GIL を解放するため、
+    プロセスプールのような pickle・起動のコストなしに複数コアを使える。
+    スレッドごとに SweepPlan を1つ確保し、各チャンクの結果は共有の結果配列の該当範囲に直接書き込む。
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        chunk_size: 1チャンクのケース数（Noneの場合は chunk_cases_for_cache で決定）
+        max_workers: スレッド数（Noneの場合は CPU 数）
+        return_sweep: True の場合は全角度の P (n, n_theta) も返す
+        executor: 再利用するスレッドプール（Streamlit サーバー内などで共有する場合）
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        diagnostics[, P])
+    """
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+              'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    n = max(np.size(v) for v in inputs.values())
+    theta = theta_grid(theta_range, theta_step)
+    if chunk_size is None:
+        chunk_size = chunk_cases_for_cache(theta.size)
+    chunk_size = max(1, min(int(chunk_size), n))
+
+    # 共有の結果配列（各チャンクは重ならない範囲に書き込む）
+    max_P = np.empty(n)
+    critical_index = np.empty(n, dtype=np.intp)
+    P_all = np.empty((n, theta.size)) if return_sweep else None
+
+    local = threading.local()
+
+    def run_chunk(start: int) -> Dict[str, Any]:
+        plan = getattr(local, 'plan', None)
+        if plan is None:
+            plan = local.plan = SweepPlan(theta, chunk_size)
+        sl = slice(start, min(start + chunk_size, n))
+        chunk = {k: (v if np.ndim(v) == 0 else np.asarray(v)[sl]) for k, v in inputs.items()}
+        res = plan.execute(**chunk)
+        max_P[sl] = res['max_P']
+        critical_index[sl] = res['critical_index']
+        if P_all is not None:
+            P_all[sl] = res['P']
+        return sweep_diagnostics(res)
+
+    starts = range(0, n, chunk_size)
+    if executor is None:
+        workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=min(workers, len(starts))) as pool:
+            parts = list(pool.map(run_chunk, starts))
+    else:
+        parts = list(executor.map(run_chunk, starts))
+
+    diagnostics = None
+    for start, part in zip(starts, parts):
+        diagnostics = merge_diagnostics(diagnostics, part, offset=start)
+
+    critical_theta_d = np.where(critical_index >= 0, theta[critical_index], np.nan)
+    result = {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': theta,
+        'diagnostics': diagnostics,
+    }
+    if P_all is not None:
+        result['P'] = P_all
+    return result
+
+
+# 共有メモリ上の入力配列の行（SoA、H の NaN は深部前提、force_finite_cover は 0/1）
+SHARED_CASE_ROWS = ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K', 'force_finite_cover')
+
+
+class SharedCaseBuffers:
+    """
+    入力ケース配列と結果配列の共有メモリ領域（SoA）
+
+    - cases: 入力 (len(SHARED_CASE_ROWS), n)、行ごとのビューは case(name)
+    - max_P, critical_index: 結果 (n,)
+    - P: 全角度の支保圧 (n, n_theta)（return_sweep=True の場合のみ）
+    ワーカープロセスは descriptor() の名前で同じ領域に接続し、配列をコピーせずに読み書きする。
+    使用後は close() で解放する（with 文でも可）。解放後は配列を参照しないこと。
+    """
+
+    def __init__(self, n: int, n_theta: int, return_sweep: bool = False):
+        """
+        共有メモリ領域の確保
+
+        Args:
+            n: ケース数
+            n_theta: 探索角度の数
+            return_sweep: 全角度の P の領域も確保するか
+        """
+        if n <= 0 or n_theta <= 0:
+            raise ValueError("ケース数・角度数は正の値である必要があります")
+        self.n = int(n)
+        self.n_theta = int(n_theta)
+        self._blocks: Dict[str, SharedMemory] = {}
+        self._layout: Dict[str, tuple] = {}
+        self.cases = self._allocate('cases', (len(SHARED_CASE_ROWS), self.n), np.float64)
+        self.max_P = self._allocate('max_P', (self.n,), np.float64)
+        self.critical_index = self._allocate('critical_index', (self.n,), np.int64)
+        self.P = self._allocate('P', (self.n, self.n_theta), np.float64) if return_sweep else None
+
+    def _allocate(self, key: str, shape: tuple, dtype) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        block = SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self._blocks[key] = block
+        self._layout[key] = (block.name, shape, dtype.str)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def case(self, name: str) -> np.ndarray:
+        """入力配列の1行（パラメータ name の全ケース）のビュー"""
+        return self.cases[SHARED_CASE_ROWS.index(name)]
+
+    def descriptor(self) -> Dict[str, tuple]:
+        """ワーカーに渡す領域の記述子 {名前: (共有メモリ名, 形状, dtype)}"""
+        return dict(self._layout)
+
+    @staticmethod
+    def attach(descriptor: Dict[str, tuple]) -> tuple:
+        """
+        記述子から共有メモリ領域に接続する（ワーカー側）
+
+        Returns:
+            (配列の辞書, 接続した SharedMemory のリスト)
+        """
+        blocks: List[SharedMemory] = []
+        arrays = {}
+        for key, (name, shape, dtype) in descriptor.items():
+            block = SharedMemory(name=name)
+            blocks.append(block)
+            arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        """共有メモリ領域の解放"""
+        self.cases = self.max_P = self.critical_index = self.P = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def __enter__(self) -> 'SharedCaseBuffers':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ワーカープロセス内の状態（初期化時に共有メモリへ接続）
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_shared_worker(descriptor: Dict[str, tuple], theta: np.ndarray, chunk_size: int):
+    arrays, blocks = SharedCaseBuffers.attach(descriptor)
+    _worker_state.update(arrays=arrays, blocks=blocks, plan=SweepPlan(theta, chunk_size))
+
+
+def _run_shared_chunk(start: int, stop: int) -> Dict[str, Any]:
+    """共有メモリ上のケース [start, stop) を計算して結果配列に書き込む"""
+    arrays, plan = _worker_state['arrays'], _worker_state['plan']
+    cases = arrays['cases'][:, start:stop]
+    res = plan.execute(**dict(zip(SHARED_CASE_ROWS, cases)))
+    arrays['max_P'][start:stop] = res['max_P']
+    arrays['critical_index'][start:stop] = res['critical_index']
+    if 'P' in arrays:
+        arrays['P'][start:stop] = res['P']
+    return sweep_diagnostics(res)
+
+
+def find_critical_pressure_processes(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                                     H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                     K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                     theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                     chunk_size: Optional[int] = None,
+                                     max_workers: Optional[int] = None,
+                                     return_sweep: bool = False,
+                                     buffers: Optional[SharedCaseBuffers] = None) -> Dict[str, Any]:
+    """
+    多数ケースの臨界支保圧のプロセス並列一括探索（find_critical_pressure_batch と同じ結果）
+
+    入力ケース配列と結果配列を共有メモリに置き、ワーカーにはチャンクの範囲 (start, stop) のみを渡す。
+    パラメータ配列や角度ごとの結果は pickle されない。
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        chunk_size: 1チャンクのケース数（Noneの場合はワーカー数の4倍程度に分割）
+        max_workers: プロセス数（Noneの場合は CPU 数）
+        return_sweep: True の場合は全角度の P (n, n_theta) も返す
+        buffers: 結果を書き込む共有メモリ領域。指定した場合、結果の配列は buffers のビューとなり
+                 コピーされない（解放は呼び出し側で行う）。Noneの場合は一時領域から結果をコピーして返す
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        diagnostics[, P])
+    """
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+              'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    n = max(np.size(v) for v in inputs.values())
+    theta = theta_grid(theta_range, theta_step)
+    workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = -(-n // (4 * workers))
+    chunk_size = max(1, min(int(chunk_size), n))
+
+    owned = buffers is None
+    if owned:
+        buffers = SharedCaseBuffers(n, theta.size, return_sweep)
+    elif buffers.n != n or buffers.n_theta != theta.size or (return_sweep and buffers.P is None):
+        raise ValueError("共有メモリ領域の大きさが入力と一致しません")
+
+    try:
+        for name, value in inputs.items():
+            buffers.case(name)[:] = value
+
+        ranges = [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)),
+                                 initializer=_init_shared_worker,
+                                 initargs=(buffers.descriptor(), theta, chunk_size)) as pool:
+            parts = list(pool.map(_run_shared_chunk, *zip(*ranges)))
+
+        diagnostics = None
+        for (start, _), part in zip(ranges, parts):
+            diagnostics = merge_diagnostics(diagnostics, part, offset=start)
+
+        max_P = buffers.max_P.copy() if owned else buffers.max_P
+        critical_index = buffers.critical_index.astype(np.intp, copy=owned)
+        P_all = None
+        if return_sweep:
+            P_all = buffers.P.copy() if owned else buffers.P
+    finally:
+        if owned:
+            buffers.close()
+
+    critical_theta_d = np.where(critical_index >= 0, theta[critical_index], np.nan)
+    result = {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': theta,
+        'diagnostics': diagnostics,
+    }
+    if P_all is not None:
+        result['P'] = P_all
+    return result
@@ -0,0 +1,92 @@
+"""
+大量の点を含むグラフの描画用データの間引き
+細かい刻みの θd 掃引や多数ケースの結果をそのままブラウザに送るとデータ量が大きくなるため、
+x 方向の区間（画素幅に相当）ごとに最初・最後・最小・最大の点だけを残す（ピークを保存する間引き）。
+臨界点など指定した点は必ず残し、表示範囲を指定した場合はその範囲だけを同じ点数で間引く
+（拡大表示時に詳細を読み込む）。描画は WebGL（go.Scattergl）で行う。
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+from typing import Optional, Sequence
+
+from murayama_vectorized import ArrayLike
+
+
+# 既定の区間数（グラフの横幅の画素数程度、1区間あたり最大4点）
+DEFAULT_BUCKETS = 1000
+
+
+def minmax_decimate(x: ArrayLike, y: ArrayLike, n_buckets: int = DEFAULT_BUCKETS,
+                    keep: Sequence[int] = (), x_range: Optional[tuple] = None) -> np.ndarray:
+    """
+    ピークを保存する間引き（区間ごとに最初・最後・最小・最大の点を残す）
+
+    y が NaN の点（無効な角度など）は区間ごとに1点残し、線の途切れを保つ。
+
+    Args:
+        x: 昇順の x 座標 (n,)
+        y: y 座標 (n,)
+        n_buckets: 区間数（残る点数は最大 4·n_buckets + len(keep) 程度）
+        keep: 必ず残す点の添字（臨界点など）
+        x_range: 表示範囲 (min, max)。指定した場合は範囲内（と両隣の1点）のみを間引く
+
+    Returns:
+        残す点の添字（昇順）
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    index = np.arange(x.size)
+    if x_range is not None:
+        lo = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+        hi = min(np.searchsorted(x, x_range[1], side='right') + 1, x.size)
+        index = index[lo:hi]
+    keep = np.asarray(keep, dtype=np.intp).ravel()
+    if x_range is not None and keep.size:
+        keep = keep[(keep >= index[0]) & (keep <= index[-1])] if index.size else keep[:0]
+    if index.size <= 4 * n_buckets:
+        return np.union1d(index, keep)
+
+    xs, ys = x[index], y[index]
+    edges = np.linspace(xs[0], xs[-1], n_buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, xs, side='right') - 1, 0, n_buckets - 1)
+
+    # 区間ごとの最初・最後（x が昇順のため bucket も昇順）
+    first = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    last = np.r_[first[1:] - 1, bucket.size - 1]
+
+    # 区間ごとの最小・最大（NaN は除く）
+    finite = np.isfinite(ys)
+    order = np.lexsort((np.where(finite, ys, np.inf), bucket))
+    group_start = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    y_min = order[group_start]
+    order = np.lexsort((np.where(finite, ys, -np.inf), bucket))
+    group_end = np.r_[group_start[1:] - 1, order.size - 1]
+    y_max = order[group_end]
+
+    # 区間ごとに NaN を1点
+    nan_positions = np.flatnonzero(~finite)
+    nan_first = nan_positions[np.r_[True, bucket[nan_positions][1:] != bucket[nan_positions][:-1]]] \
+        if nan_positions.size else nan_positions
+
+    selected = np.concatenate([first, last, y_min, y_max, nan_first])
+    return np.union1d(index[selected], keep)
+
+
+def decimated_scattergl(x: ArrayLike, y: ArrayLike, n_buckets: int = DEFAULT_BUCKETS,
+                        keep: Sequence[int] = (), x_range: Optional[tuple] = None,
+                        **kwargs) -> go.Scattergl:
+    """
+    間引いたデータの WebGL トレース
+
+    Args:
+        x, y, n_buckets, keep, x_range: minmax_decimate と同じ
+        **kwargs: go.Scattergl の引数（mode, name, line など）
+
+    Returns:
+        go.Scattergl
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    selected = minmax_decimate(x, y, n_buckets, keep, x_range)
+    return go.Scattergl(x=x[selected], y=y[selected], **kwargs)
@@ -0,0 +1,106 @@
+"""
+シナリオ（名前つきの条件の組）の比較
+同じ断面の複数の条件（粘着力の仮定、土被り・上載荷重の有無、α・K の違いなど）を1回の一括計算で評価し、
+P–θd 曲線と安全率を並べて比較する。結果は入力条件のキーで永続キャッシュに保存し、
+条件を変更したシナリオだけを再計算する。
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_numba import safety_factor_at
+from murayama_store import ResultStore, find_critical_pressure_cached
+from murayama_casefile import validate_cases, case_arrays, summarize_results
+
+
+# シナリオの表の列（名称と計算条件、アプリの入力欄と同じ）
+SCENARIO_COLUMNS = ('name', 'H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K', 'force_finite_cover')
+
+
+def scenario_table(inputs: Dict[str, Any], name: str = '基本ケース') -> pd.DataFrame:
+    """
+    入力条件からシナリオの表（1行）を作成
+
+    Args:
+        inputs: 計算条件の辞書（H_f, gamma, phi, coh, H, alpha, K, force_finite_cover）
+        name: シナリオの名称
+
+    Returns:
+        列 SCENARIO_COLUMNS の DataFrame（H の None は NaN）
+    """
+    row = {column: inputs.get(column) for column in SCENARIO_COLUMNS[1:]}
+    row['H'] = np.nan if row['H'] is None else row['H']
+    return pd.DataFrame([dict(name=name, **row)], columns=list(SCENARIO_COLUMNS))
+
+
+def validate_scenarios(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    シナリオの表の検証（validate_cases と同じ検証に加え、名称が空欄・重複していないこと）
+
+    Args:
+        table: シナリオの表（列 SCENARIO_COLUMNS、アプリで編集したもの）
+
+    Returns:
+        validate_cases の DataFrame（section が名称）
+
+    Raises:
+        ValueError: 検証に失敗した場合（行番号は表の1行目を1とする）
+    """
+    scenarios = validate_cases(table, first_row=1)
+    names = scenarios['section'].str.strip()
+    if (names == '').any():
+        raise ValueError("名称が空欄のシナリオがあります")
+    duplicated = names[names.duplicated()].unique()
+    if duplicated.size:
+        raise ValueError(f"名称が重複しています: {', '.join(duplicated)}")
+    scenarios['section'] = names
+    return scenarios
+
+
+def evaluate_scenarios(scenarios: pd.DataFrame, store: Optional[ResultStore] = None,
+                       theta_range: tuple = (20, 80), theta_step: float = 1.0) -> Dict[str, Any]:
+    """
+    全シナリオの臨界支保圧・安全率・P–θd 曲線の一括計算
+
+    store を指定した場合は find_critical_pressure_cached で、キャッシュにない（条件を変更した）
+    シナリオだけをまとめて計算する。
+
+    Args:
+        scenarios: validate_scenarios のシナリオ
+        store: 永続キャッシュ（Noneの場合は全シナリオを計算する）
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+
+    Returns:
+        結果の辞書
+        - names: 名称のリスト、theta_d_deg: 角度 [度] (n_theta,)
+        - P: 全角度の P (n, n_theta)（無効な角度は NaN）
+        - max_P, critical_theta_d_deg, safety_factor: 各 (n,)
+        - summary: summarize_results の集計表（区間の列はシナリオ）
+        - n_computed, n_hits: 計算したシナリオ数・キャッシュから得たシナリオ数
+    """
+    arrays = case_arrays(scenarios)
+    if store is not None:
+        res = find_critical_pressure_cached(store, **arrays, theta_range=theta_range, theta_step=theta_step,
+                                            safety_factor=True, return_sweep=True)
+    else:
+        res = find_critical_pressure_batch(**arrays, theta_range=theta_range, theta_step=theta_step,
+                                           return_sweep=True)
+        res['safety_factor'] = safety_factor_at(res['critical_theta_d'], **arrays)
+        res['n_computed'], res['n_hits'] = len(scenarios), 0
+
+    P = np.where(np.isfinite(res['P']), res['P'], np.nan)
+    summary = summarize_results(scenarios, res).rename(columns={'区間': 'シナリオ'})
+    return {
+        'names': scenarios['section'].tolist(),
+        'theta_d_deg': np.degrees(res['theta_d']),
+        'P': P,
+        'max_P': res['max_P'],
+        'critical_theta_d_deg': res['critical_theta_d_deg'],
+        'safety_factor': res['safety_factor'],
+        'summary': summary,
+        'n_computed': res['n_computed'],
+        'n_hits': res['n_hits'],
+    }
@@ -0,0 +1,146 @@
+"""
+一括計算の前処理（重複除去・量子化・並べ替え）
+路線全体のケースファイルには同一地質の区間などで同じ（またはほぼ同じ）条件が繰り返し現れるため、
+重複を除いたケースだけを計算して結果を元の並びに戻す。
+残ったケースは (φ, H_f) の順に並べ、幾何が共通なケースをまとめて計算する。
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional, Union
+
+from murayama_vectorized import ArrayLike, theta_grid, find_critical_pressure_batch
+from murayama_affine import AffinePressureModel
+
+
+# 並べ替えの優先順（幾何は φ, H_f のみ、上載荷重係数は H, α, K, force_finite_cover で決まる）
+SCHEDULE_COLUMNS = ('phi', 'H_f', 'H', 'alpha', 'K', 'force_finite_cover', 'gamma', 'coh')
+
+# 量子化の対象となる連続量
+QUANTIZABLE = ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K')
+
+
+def deduplicate_cases(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                      H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8, K: ArrayLike = 1.0,
+                      force_finite_cover: ArrayLike = False,
+                      precision: Optional[Union[float, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """
+    ケースの重複除去と (φ, H_f, H, α, K, force_finite_cover, γ, c) 順への並べ替え
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        precision: 設計上の精度（量子化の刻み）。数値は全連続量に共通、辞書はパラメータごと
+                   （例: {'phi': 0.1, 'coh': 0.5}）。Noneの場合は完全一致のみを重複とする
+
+    Returns:
+        結果の辞書
+        - cases: 重複を除いて並べ替えたケースパラメータの辞書（各 (m,)、H の深部前提は inf）
+        - inverse: 元のケース i の結果は重複除去後の inverse[i] 番目 (n,)
+        - n_cases, n_unique: 元のケース数・重複除去後のケース数
+    """
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+              'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    columns = dict(zip(inputs, np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float))
+                                                     for v in inputs.values()))))
+    columns = {k: v.ravel() + 0.0 for k, v in columns.items()}  # -0.0 → 0.0（コピー）
+    columns['H'][np.isnan(columns['H'])] = np.inf
+    columns['force_finite_cover'] = (columns['force_finite_cover'] != 0).astype(float)
+
+    if precision is not None:
+        steps = precision if isinstance(precision, dict) else dict.fromkeys(QUANTIZABLE, precision)
+        for name, step in steps.items():
+            if name not in QUANTIZABLE:
+                raise ValueError(f"量子化できないパラメータ: {name}")
+            if step:
+                finite = np.isfinite(columns[name])
+                columns[name][finite] = np.round(columns[name][finite] / step) * step
+
+    table = np.column_stack([columns[name] for name in SCHEDULE_COLUMNS])
+    unique, inverse = np.unique(table, axis=0, return_inverse=True)
+    cases = {name: unique[:, j] for j, name in enumerate(SCHEDULE_COLUMNS)}
+    cases['force_finite_cover'] = cases['force_finite_cover'].astype(bool)
+    return {
+        'cases': cases,
+        'inverse': inverse.ravel(),
+        'n_cases': table.shape[0],
+        'n_unique': unique.shape[0],
+    }
+
+
+def find_critical_pressure_deduplicated(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                                        H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                        K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                        theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                        precision: Optional[Union[float, Dict[str, float]]] = None,
+                                        min_group: int = 8, batch_size: int = 1024) -> Dict[str, Any]:
+    """
+    重複除去・並べ替えを行う多数ケースの臨界支保圧の一括探索
+
+    (φ, H_f, H, α, K, force_finite_cover) が共通で (γ, c) のみ異なるケースが min_group 件以上ある場合は、
+    幾何・自重の計算を1回にまとめ、アフィン分解 P = γ·A(θd) + c·C(θd) で最大Pを求める。
+    それ以外のケースは (φ, H_f) 順のまま find_critical_pressure_batch で計算する。
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        precision: 量子化の刻み（deduplicate_cases と同じ、指定時は量子化後の条件での結果となる）
+        min_group: アフィン分解でまとめて計算する最小ケース数
+        batch_size: find_critical_pressure_batch のバッチサイズ
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        n_cases, n_unique, n_grouped)。各配列は元のケースの並び
+    """
+    dedup = deduplicate_cases(H_f, gamma, phi, coh, H, alpha, K, force_finite_cover, precision)
+    cases = dedup['cases']
+    m = dedup['n_unique']
+    theta = theta_grid(theta_range, theta_step)
+    max_P = np.empty(m)
+    critical_index = np.empty(m, dtype=np.intp)
+
+    # (γ, c) 以外が共通な連続区間（並べ替え済みのため隣接する）
+    key = np.column_stack([cases[name] for name in SCHEDULE_COLUMNS[:6]])
+    boundaries = np.flatnonzero(np.any(key[1:] != key[:-1], axis=1)) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [m]))
+
+    rest = []
+    n_grouped = 0
+    for start, stop in zip(starts, stops):
+        if stop - start < min_group:
+            rest.append(np.arange(start, stop))
+            continue
+        H_group = cases['H'][start]
+        model = AffinePressureModel(cases['H_f'][start], cases['phi'][start],
+                                    None if np.isinf(H_group) else H_group, cases['alpha'][start],
+                                    cases['K'][start], bool(cases['force_finite_cover'][start]),
+                                    theta_values=theta)
+        res = model.max_pressure(cases['gamma'][start:stop], cases['coh'][start:stop])
+        max_P[start:stop] = res['max_P']
+        critical_index[start:stop] = res['critical_index']
+        n_grouped += stop - start
+
+    if rest:
+        rest = np.concatenate(rest)
+        res = find_critical_pressure_batch(**{name: values[rest] for name, values in cases.items()},
+                                           theta_range=theta_range, theta_step=theta_step,
+                                           batch_size=batch_size)
+        max_P[rest] = res['max_P']
+        critical_index[rest] = res['critical_index']
+
+    # 元の並びに戻す
+    inverse = dedup['inverse']
+    max_P = max_P[inverse]
+    critical_index = critical_index[inverse]
+    critical_theta_d = np.where(critical_index >= 0, theta[critical_index], np.nan)
+    return {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': theta,
+        'n_cases': dedup['n_cases'],
+        'n_unique': m,
+        'n_grouped': n_grouped,
+    }
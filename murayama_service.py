@@ -0,0 +1,472 @@
+"""
+村山の式の計算 HTTP サービス（asyncio、JSON）
+Streamlit 以外のツール（BIM プラグイン、計測ダッシュボード等）から計算結果を取得するための API。
+同時に届いた単一ケースの要求は最大待ち時間内でまとめ（マイクロバッチ）、ベクトル化計算で一括評価する。
+条件が同一の同時要求は1回の計算の結果を共有する（single-flight）。
+
+エンドポイント:
+- POST /v1/critical: 単一ケース {H_f, gamma, phi, coh[, H, alpha, K, force_finite_cover,
+  theta_range, theta_step, safety_factor]}
+  time_budget_ms / max_evaluations を指定すると、要求の到着から予算内で得られる最良の結果を
+  臨界角度・安全率の区間と評価点数とともに返す（段階的評価、tol_deg で臨界角度の許容誤差を指定）
+- POST /v1/batch: 多数ケース {cases: [{...}, ...][, theta_range, theta_step, safety_factor]}
+- GET /health: 稼働状況
+数値の NaN は null、±∞ は文字列 "inf" / "-inf" で返す。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_numba import find_critical_pressure_fused
+from murayama_singleflight import AsyncSingleFlight, flight_key
+from murayama_anytime import critical_pressure_until
+
+
+# ケースのパラメータと既定値（MurayamaCalculatorRevised と同じ）
+CASE_DEFAULTS = {'H': None, 'alpha': 1.8, 'K': 1.0, 'force_finite_cover': False}
+CASE_REQUIRED = ('H_f', 'gamma', 'phi', 'coh')
+
+# 期限つきの要求を single-flight でまとめる到着時刻の区間 [秒]
+DEADLINE_BUCKET = 0.01
+
+# 予算つきの要求の最初のグリッドの刻み [度]
+COARSE_STEP = 5.0
+
+# 1ケースの探索角度の点数の上限（超えると 400）と、一括計算のケース数×角度の点数の上限（超えると 413）
+MAX_THETA_POINTS = 10_000
+MAX_GRID_POINTS = 10_000_000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class Overloaded(Exception):
+    """未処理の要求が上限に達した（503 を返す）"""
+
+
+class RequestError(Exception):
+    """不正な要求（status の HTTP エラーを返す）"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_number(value: float) -> Any:
+    value = float(value)
+    if math.isnan(value):
+        return None
+    if math.isinf(value):
+        return 'inf' if value > 0 else '-inf'
+    return value
+
+
+def _number(data: Dict[str, Any], name: str) -> float:
+    """数値パラメータ（JSON の数値のみ、真偽値・文字列・非有限値は不可）"""
+    value = data[name]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(400, f"{name} は有限の数値で指定してください")
+    return float(value)
+
+
+def parse_case(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    要求の1ケースの検証（型の検査と MurayamaCalculatorRevised と同じ入力チェック）
+
+    Returns:
+        ケースパラメータの辞書（数値は float、force_finite_cover は bool）
+    """
+    if not isinstance(data, dict):
+        raise RequestError(400, "ケースは JSON オブジェクトで指定してください")
+    missing = [name for name in CASE_REQUIRED if name not in data]
+    if missing:
+        raise RequestError(400, f"必須パラメータがありません: {', '.join(missing)}")
+    case = dict(CASE_DEFAULTS)
+    for name in CASE_REQUIRED + ('alpha', 'K'):
+        if name in data:
+            case[name] = _number(data, name)
+    if data.get('H') is not None:
+        case['H'] = _number(data, 'H')
+    if 'force_finite_cover' in data:
+        if not isinstance(data['force_finite_cover'], bool):
+            raise RequestError(400, "force_finite_cover は true / false で指定してください")
+        # 土被りの指定がない場合は深部前提（一括計算と同じ結果になるよう無効にする）
+        case['force_finite_cover'] = data['force_finite_cover'] and case['H'] is not None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            MurayamaCalculatorRevised(**case)
+    except (TypeError, ValueError) as e:
+        raise RequestError(400, str(e))
+    return case
+
+
+def _options(data: Dict[str, Any]) -> Tuple[tuple, float, bool]:
+    """探索条件 (theta_range, theta_step, safety_factor)"""
+    try:
+        theta_range = tuple(float(t) for t in data.get('theta_range', (20, 80)))
+        theta_step = float(data.get('theta_step', 1.0))
+    except (TypeError, ValueError):
+        raise RequestError(400, "theta_range / theta_step が不正です")
+    if len(theta_range) != 2 or not theta_range[0] < theta_range[1] or not theta_step > 0 \
+            or not all(math.isfinite(t) for t in theta_range + (theta_step,)):
+        raise RequestError(400, "theta_range / theta_step が不正です")
+    return theta_range, theta_step, bool(data.get('safety_factor', False))
+
+
+def grid_points(theta_range: tuple, theta_step: float) -> int:
+    """探索角度の点数（theta_grid と同じ数え方、配列は作らない）"""
+    return int(math.floor((theta_range[1] - theta_range[0]) / theta_step)) + 1
+
+
+def _budget(data: Dict[str, Any]) -> Optional[Tuple[Optional[float], Optional[int], float]]:
+    """予算の指定 (time_budget [秒], max_evaluations, tol_deg)。指定がなければ None"""
+    if data.get('time_budget_ms') is None and data.get('max_evaluations') is None:
+        return None
+    try:
+        time_budget = None if data.get('time_budget_ms') is None else float(data['time_budget_ms']) / 1000.0
+        max_evaluations = None if data.get('max_evaluations') is None else int(data['max_evaluations'])
+        tol_deg = float(data.get('tol_deg', 0.01))
+    except (TypeError, ValueError):
+        raise RequestError(400, "time_budget_ms / max_evaluations / tol_deg が不正です")
+    if (time_budget is not None and not time_budget >= 0) or (max_evaluations is not None and max_evaluations < 1) \
+            or not tol_deg > 0:
+        raise RequestError(400, "time_budget_ms / max_evaluations / tol_deg が不正です")
+    return time_budget, max_evaluations, tol_deg
+
+
+def compute_within_budget(case: Dict[str, Any], theta_range: tuple, deadline: Optional[float],
+                          max_evaluations: Optional[int], tol_deg: float,
+                          safety_factor: bool) -> Dict[str, Any]:
+    """
+    1ケースを期限・評価点数の予算内で段階的に計算して JSON 用の結果を返す（スレッドプール上で実行）
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        calculator = MurayamaCalculatorRevised(**case)
+    try:
+        res = critical_pressure_until(calculator, deadline=deadline, theta_range=theta_range,
+                                      coarse_step=COARSE_STEP, tol_deg=tol_deg, max_evaluations=max_evaluations,
+                                      safety_factor=safety_factor)
+    except ValueError:
+        # 有効な角度がない
+        return {'max_P': None, 'critical_theta_d_deg': None, 'theta_bracket_deg': None,
+                'n_evaluations': 0, 'converged': False}
+    row = {
+        'max_P': _json_number(res['max_P']),
+        'critical_theta_d_deg': _json_number(res['critical_theta_d_deg']),
+        'theta_bracket_deg': [_json_number(t) for t in res['theta_bracket_deg']],
+        'n_evaluations': res['n_evaluations'],
+        'converged': res['converged'],
+        'elapsed_ms': res['elapsed'] * 1000.0,
+    }
+    if safety_factor:
+        row['safety_factor'] = _json_number(res['safety_factor'])
+        row['safety_factor_bracket'] = [_json_number(f) for f in res['safety_factor_bracket']]
+    return row
+
+
+def compute_cases(cases: List[Dict[str, Any]], theta_range: tuple, theta_step: float,
+                  safety_factor: bool) -> List[Dict[str, Any]]:
+    """
+    ケースのリストを一括計算して JSON 用の結果のリストを返す（スレッドプール上で実行）
+    """
+    columns = {name: np.array([np.nan if c[name] is None else c[name] for c in cases], dtype=float)
+               for name in CASE_REQUIRED + tuple(CASE_DEFAULTS)}
+    columns['force_finite_cover'] = columns['force_finite_cover'].astype(bool)
+    res = find_critical_pressure_fused(**columns, theta_range=theta_range, theta_step=theta_step,
+                                       safety_factor=safety_factor)
+    results = []
+    for i in range(len(cases)):
+        row = {
+            'max_P': _json_number(res['max_P'][i]),
+            'critical_theta_d_deg': _json_number(res['critical_theta_d_deg'][i]),
+            'critical_index': int(res['critical_index'][i]),
+        }
+        if safety_factor:
+            row['safety_factor'] = _json_number(res['safety_factor'][i])
+        results.append(row)
+    return results
+
+
+class MicroBatcher:
+    """
+    単一ケースの要求のマイクロバッチ化
+
+    探索条件が同じ要求を max_delay 秒（または max_batch_size 件）までまとめてから一括計算する。
+    未処理の要求が max_pending 件に達すると Overloaded を送出する（バックプレッシャー）。
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, max_delay: float = 0.005,
+                 max_batch_size: int = 1024, max_pending: int = 10000):
+        self.executor = executor
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+        self.pending = 0
+        self.batches = 0
+        self._groups: Dict[tuple, List[tuple]] = {}
+
+    def reserve(self, n: int):
+        """n 件分の処理枠の確保（上限を超える場合は Overloaded）"""
+        if self.pending + n > self.max_pending:
+            raise Overloaded()
+        self.pending += n
+
+    def release(self, n: int):
+        self.pending -= n
+
+    async def submit(self, case: Dict[str, Any], theta_range: tuple, theta_step: float,
+                     safety_factor: bool) -> Dict[str, Any]:
+        """1ケースの要求を登録して結果を待つ"""
+        self.reserve(1)
+        try:
+            future = asyncio.get_running_loop().create_future()
+            group = (theta_range, theta_step, safety_factor)
+            items = self._groups.setdefault(group, [])
+            items.append((case, future))
+            if len(items) == 1:
+                asyncio.get_running_loop().call_later(self.max_delay, self._flush, group)
+            if len(items) >= self.max_batch_size:
+                self._flush(group)
+            return await future
+        finally:
+            self.release(1)
+
+    def _flush(self, group: tuple):
+        items = self._groups.pop(group, None)
+        if items:
+            asyncio.ensure_future(self._run(group, items))
+
+    async def _run(self, group: tuple, items: List[tuple]):
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, compute_cases, [case for case, _ in items], *group)
+        except Exception:
+            # 1ケースの失敗で同じバッチの他の要求を失敗させない（1ケースずつ計算し直す）
+            for case, future in items:
+                try:
+                    result = (await loop.run_in_executor(self.executor, compute_cases, [case], *group))[0]
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class CalculatorService:
+    """
+    HTTP/1.1 サービス（keep-alive 対応、標準ライブラリのみ）
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, max_delay: float = 0.005,
+                 max_batch_size: int = 1024, max_pending: int = 10000,
+                 max_body_bytes: int = 8 * 1024 * 1024, keepalive_timeout: float = 15.0,
+                 max_workers: Optional[int] = None, max_theta_points: int = MAX_THETA_POINTS,
+                 max_grid_points: int = MAX_GRID_POINTS):
+        """
+        Args:
+            host, port: 待ち受けアドレス（port=0 は空きポート）
+            max_delay: マイクロバッチの最大待ち時間 [秒]
+            max_batch_size: マイクロバッチの最大ケース数
+            max_pending: 未処理ケース数の上限（超えると 503）
+            max_body_bytes: 要求本文の最大サイズ（超えると 413）
+            keepalive_timeout: 次の要求を待つ最大時間 [秒]
+            max_workers: 計算スレッド数
+            max_theta_points: 1ケースの探索角度の点数の上限（超えると 400）
+            max_grid_points: 一括計算のケース数×探索角度の点数の上限（超えると 413）
+        """
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.keepalive_timeout = keepalive_timeout
+        self.max_theta_points = max_theta_points
+        self.max_grid_points = max_grid_points
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.batcher = MicroBatcher(self.executor, max_delay, max_batch_size, max_pending)
+        self.flight = AsyncSingleFlight()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> 'CalculatorService':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """1接続の処理（keep-alive の間は要求を繰り返し受け付ける）"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').strip().split(' ', 2)
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode('latin-1').strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+
+                try:
+                    body = await self._read_body(reader, headers)
+                    status, payload = await self._dispatch(method, path, body)
+                except RequestError as e:
+                    status, payload = e.status, {'error': str(e)}
+                    keep_alive = keep_alive and e.status not in (411, 413)
+                except Overloaded:
+                    status, payload = 503, {'error': "処理中の要求が多すぎます"}
+                except Exception as e:
+                    # 計算中の想定外のエラー（接続を黙って閉じずに 500 を返す）
+                    status, payload = 500, {'error': f"計算に失敗しました: {e}"}
+                    keep_alive = False
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if 'transfer-encoding' in headers:
+            raise RequestError(411, "Content-Length を指定してください")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise RequestError(400, "Content-Length が不正です")
+        if length > self.max_body_bytes:
+            raise RequestError(413, "要求本文が大きすぎます")
+        return await reader.readexactly(length) if length else b''
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == '/health':
+            if method != 'GET':
+                raise RequestError(405, "GET のみ対応しています")
+            return 200, {'status': 'ok', 'pending': self.batcher.pending, 'batches': self.batcher.batches,
+                         'shared': self.flight.stats['shared']}
+        if path not in ('/v1/critical', '/v1/batch'):
+            raise RequestError(404, f"不明なパス: {path}")
+        if method != 'POST':
+            raise RequestError(405, "POST のみ対応しています")
+        try:
+            data = json.loads(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise RequestError(400, "本文が JSON ではありません")
+        if not isinstance(data, dict):
+            raise RequestError(400, "本文は JSON オブジェクトで指定してください")
+        theta_range, theta_step, safety_factor = _options(data)
+        budget = _budget(data)
+        # 過大な角度グリッドは計算前に拒否する（配列の確保でサーバーのメモリを使い切らないように）
+        n_theta = grid_points(theta_range, COARSE_STEP if budget is not None else theta_step)
+        if n_theta > self.max_theta_points:
+            raise RequestError(400, f"探索角度の点数が多すぎます: {n_theta} 点（上限 {self.max_theta_points} 点）")
+
+        if path == '/v1/critical' and budget is not None:
+            # 予算は要求の到着時点から数える（待ち時間を含めて SLO を守る）
+            time_budget, max_evaluations, tol_deg = budget
+            deadline = None if time_budget is None else time.monotonic() + time_budget
+            case = parse_case(data)
+            # 期限つきの要求は到着時刻の近いもの（期限が同じ区間のもの）だけをまとめる
+            # （後から届いた要求は先の要求の期限、つまり自分の期限より早く結果を受け取る）
+            key = flight_key('budget_sf' if safety_factor else 'budget', **case, theta_range=theta_range,
+                             tol_deg=tol_deg, max_evaluations=max_evaluations, time_budget=time_budget,
+                             deadline_bucket=None if deadline is None else int(deadline // DEADLINE_BUCKET))
+            return 200, await self.flight.do(key, self._run_within_budget, case, theta_range, deadline,
+                                             max_evaluations, tol_deg, safety_factor)
+
+        if path == '/v1/critical':
+            case = parse_case(data)
+            key = flight_key('critical_sf' if safety_factor else 'critical', **case,
+                             theta_range=theta_range, theta_step=theta_step)
+            return 200, await self.flight.do(key, self.batcher.submit, case, theta_range, theta_step,
+                                             safety_factor)
+
+        cases = data.get('cases')
+        if not isinstance(cases, list) or not cases:
+            raise RequestError(400, "cases にケースのリストを指定してください")
+        if len(cases) * n_theta > self.max_grid_points:
+            raise RequestError(413, f"計算量が多すぎます: {len(cases)} ケース × {n_theta} 点"
+                                    f"（上限 {self.max_grid_points} 点）")
+        parsed = []
+        for i, c in enumerate(cases):
+            try:
+                parsed.append(parse_case(c))
+            except RequestError as e:
+                raise RequestError(400, f"ケース {i}: {e}")
+        self.batcher.reserve(len(parsed))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, compute_cases, parsed, theta_range, theta_step, safety_factor)
+        finally:
+            self.batcher.release(len(parsed))
+        return 200, {'results': results}
+
+    async def _run_within_budget(self, case: Dict[str, Any], *args) -> Dict[str, Any]:
+        self.batcher.reserve(1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, compute_within_budget, case, *args)
+        finally:
+            self.batcher.release(1)
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                   "Content-Type: application/json; charset=utf-8",
+                   f"Content-Length: {len(body)}",
+                   f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="村山の式の計算 HTTP サービス")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-delay', type=float, default=0.005, help="マイクロバッチの最大待ち時間 [秒]")
+    parser.add_argument('--max-batch-size', type=int, default=1024)
+    parser.add_argument('--max-pending', type=int, default=10000)
+    args = parser.parse_args()
+    service = CalculatorService(args.host, args.port, args.max_delay, args.max_batch_size, args.max_pending)
+    print(f"http://{args.host}:{args.port} で待ち受けています")
+    asyncio.run(service.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
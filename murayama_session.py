@@ -0,0 +1,273 @@
+"""
+アプリのセッションごとの計算結果の保持（メモリ上限つき）
+計算結果は行の辞書のリストではなく列ごとの配列（SoA）にまとめて保持し、
+セッションごと・サーバー全体の保持量が上限を超えると、最終参照の古い値から
+永続キャッシュ（ResultStore）へ退避または破棄する（閉じられたセッションの値も全体の上限で追い出される）。
+"""
+
+import pickle
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from murayama_store import ResultStore
+
+
+# 既定の上限 [バイト]
+SESSION_BYTES = 32 * 1024 * 1024
+TOTAL_BYTES = 512 * 1024 * 1024
+
+# 列ごとの配列にまとめる行の辞書のリストと、行がない場合の列名
+DETAIL_COLUMNS = ('theta_deg', 'theta_rad', 'r0_m', 'rd_m', 'B_m', 'la_m', 'lp_m', 'q_kN_m2', 'Wf_kN',
+                  'lw_m', 'Mc_kNm', 'P_kN_m2')
+EVALUATION_COLUMNS = ('factor', 'safety_factor', 'coh', 'phi_deg', 'P')
+HISTORY_COLUMNS = ('factor', 'coh', 'phi_deg', 'P')
+
+# 画面で使わない、他の値と重複する配列
+_REDUNDANT_KEYS = ('r0_values', 'theta_values', 'P_matrix')
+
+
+def to_columns(records: Sequence[Dict[str, Any]], columns: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """
+    行の辞書のリストを列ごとの配列（SoA）に変換
+
+    Args:
+        records: 行の辞書のリスト
+        columns: 列名（行がない場合も空の配列を作る。行にない値は NaN）
+
+    Returns:
+        {列名: 配列 (n,)}（pd.DataFrame にそのまま渡せる）
+    """
+    names = list(dict.fromkeys(list(columns) + [k for r in records for k in r]))
+    return {name: np.array([r.get(name, np.nan) for r in records], dtype=float) for name in names}
+
+
+def compact_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    parametric_study の結果をセッションに保持する形式にまとめる
+
+    - detailed_results、安全率の evaluation_points・reduction_history: 列ごとの配列
+    - r0_values, theta_values, P_matrix: 削除（theta_degrees・detailed_results と重複）
+    - adaptive_sweep: theta_d を削除（theta_d_deg と重複）
+
+    Args:
+        results: parametric_study の結果（adaptive_sweep を含んでもよい）。変更しない
+
+    Returns:
+        まとめた結果の辞書（画面の表示に必要なキーは元と同じ）
+    """
+    compact = {k: v for k, v in results.items() if k not in _REDUNDANT_KEYS}
+    if isinstance(results.get('detailed_results'), list):
+        compact['detailed_results'] = to_columns(results['detailed_results'], DETAIL_COLUMNS)
+    sf_result = results.get('true_safety_factor_result')
+    if sf_result:
+        compact['true_safety_factor_result'] = dict(
+            sf_result,
+            evaluation_points=to_columns(sf_result.get('evaluation_points', []), EVALUATION_COLUMNS),
+            reduction_history=to_columns(sf_result.get('reduction_history', []), HISTORY_COLUMNS))
+    adaptive = results.get('adaptive_sweep')
+    if adaptive is not None:
+        compact['adaptive_sweep'] = {k: v for k, v in adaptive.items() if k != 'theta_d'}
+    return compact
+
+
+def deep_sizeof(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    オブジェクトの保持量の見積もり [バイト]（配列・DataFrame・図・入れ子の辞書やリストを含む）
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        if value.base is None:
+            return sys.getsizeof(value)
+        # ビューは元の配列（バッファ）を保持するため、元の配列を1回だけ数える
+        base = value
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if base.base is None:
+            return sys.getsizeof(value) + deep_sizeof(base, _seen)
+        if id(base.base) in _seen:
+            return sys.getsizeof(value)
+        _seen.add(id(base.base))
+        return sys.getsizeof(value) + base.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if hasattr(value, 'to_plotly_json'):
+        return deep_sizeof(value.to_plotly_json(), _seen)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(v, _seen) for v in value)
+    if hasattr(value, '__dict__'):
+        return size + deep_sizeof(vars(value), _seen)
+    return size
+
+
+class _Entry:
+    """保持している値"""
+
+    def __init__(self, value: Any, size: int, spill: bool):
+        self.value = value
+        self.size = size
+        self.spill = spill
+
+
+class SessionMemory:
+    """
+    セッションごとの値の保持（セッションごと・全体の上限と LRU の退避）
+
+    値は (セッション, 名前) ごとに保持し、get のたびに最終参照を更新する。上限を超えると最終参照の古い値から、
+    spill=True の値（計算結果・アップロードしたケースなど）は永続キャッシュへ退避し（pickle + zlib）、
+    それ以外（図・CSV など作り直せるもの）は破棄する。退避した値は次の get で読み戻す。
+    直前に保存・参照した値は追い出さない。同一インスタンスはスレッド間で共有可能。
+    """
+
+    def __init__(self, session_bytes: int = SESSION_BYTES, total_bytes: int = TOTAL_BYTES,
+                 store: Optional[ResultStore] = None):
+        """
+        Args:
+            session_bytes: セッションごとの保持量の上限 [バイト]
+            total_bytes: 全セッションの保持量の上限 [バイト]
+            store: 退避先の永続キャッシュ（Noneの場合は退避せずに破棄する）。退避した値は pickle で読み戻すため、
+                   他のユーザーが書き込めない場所のファイルとすること
+        """
+        self.session_bytes = session_bytes
+        self.total_bytes = total_bytes
+        self.store = store
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple[str, str], _Entry]' = OrderedDict()
+        self._spilled: Dict[Tuple[str, str], str] = {}
+        self._usage: Dict[str, int] = {}
+        self._total = 0
+        self.stats = {'evictions': 0, 'spills': 0, 'restores': 0}
+
+    @staticmethod
+    def _blob_key(key: Tuple[str, str]) -> str:
+        return f"session:{key[0]}:{key[1]}"
+
+    def put(self, session_id: str, name: str, value: Any, spill: bool = False) -> int:
+        """
+        値を保持する（同じ名前の値は置き換える）
+
+        Args:
+            session_id: セッションの識別子
+            name: 値の名前
+            value: 値（保持中は変更しないこと、変更した場合は put し直す）
+            spill: 上限を超えたときに永続キャッシュへ退避するか（False の場合は破棄）
+
+        Returns:
+            値の保持量の見積もり [バイト]
+        """
+        size = deep_sizeof(value)
+        key = (session_id, name)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _Entry(value, size, spill)
+            self._usage[session_id] = self._usage.get(session_id, 0) + size
+            self._total += size
+            self._enforce(key)
+        return size
+
+    def get(self, session_id: str, name: str, default: Any = None) -> Any:
+        """
+        値を取り出す（退避した値は永続キャッシュから読み戻す）
+
+        Returns:
+            値（保持していない、または退避先からも削除された場合は default）
+        """
+        key = (session_id, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.value
+            blob_key = self._spilled.get(key)
+        if blob_key is None or self.store is None:
+            return default
+        blob = self.store.get_blob(blob_key)
+        with self._lock:
+            if self._spilled.get(key) != blob_key:
+                # 読み戻しの間に置き換えられた
+                entry = self._entries.get(key)
+                return default if entry is None else entry.value
+            del self._spilled[key]
+            if blob is not None:
+                self.stats['restores'] += 1
+        if blob is None:
+            return default
+        self.store.delete_blob(blob_key)
+        value = pickle.loads(zlib.decompress(blob))
+        self.put(session_id, name, value, spill=True)
+        return value
+
+    def discard(self, session_id: str, prefix: str = ''):
+        """名前が prefix で始まる値を削除する（既定はセッションのすべての値）"""
+        with self._lock:
+            for key in [k for k in list(self._entries) + list(self._spilled)
+                        if k[0] == session_id and k[1].startswith(prefix)]:
+                self._remove(key)
+
+    def usage(self, session_id: str) -> Dict[str, int]:
+        """セッションの保持量 [バイト]・保持している値の数・退避中の値の数"""
+        with self._lock:
+            return {'bytes': self._usage.get(session_id, 0),
+                    'entries': sum(1 for k in self._entries if k[0] == session_id),
+                    'spilled': sum(1 for k in self._spilled if k[0] == session_id)}
+
+    def total(self) -> Dict[str, int]:
+        """全セッションの保持量 [バイト]・セッション数・値の数"""
+        with self._lock:
+            return {'bytes': self._total, 'sessions': len(self._usage),
+                    'entries': len(self._entries), 'spilled': len(self._spilled)}
+
+    def _release(self, session_id: str, size: int):
+        """保持量の減算（値がなくなったセッションは記録から除く、ロック内で呼ぶ）"""
+        self._usage[session_id] -= size
+        self._total -= size
+        if self._usage[session_id] <= 0:
+            del self._usage[session_id]
+
+    def _remove(self, key: Tuple[str, str]):
+        """値を削除（ロック内で呼ぶ）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._release(key[0], entry.size)
+        blob_key = self._spilled.pop(key, None)
+        if blob_key is not None and self.store is not None:
+            self.store.delete_blob(blob_key)
+
+    def _evict(self, key: Tuple[str, str]):
+        """値を退避または破棄（ロック内で呼ぶ）"""
+        entry = self._entries.pop(key)
+        self._release(key[0], entry.size)
+        self.stats['evictions'] += 1
+        if entry.spill and self.store is not None:
+            blob_key = self._blob_key(key)
+            self.store.put_blob(blob_key, zlib.compress(pickle.dumps(entry.value, protocol=pickle.HIGHEST_PROTOCOL)))
+            self._spilled[key] = blob_key
+            self.stats['spills'] += 1
+
+    def _enforce(self, protected: Tuple[str, str]):
+        """セッション・全体の上限を超えた分を最終参照の古い値から追い出す（ロック内で呼ぶ）"""
+        session_id = protected[0]
+        while self._usage[session_id] > self.session_bytes:
+            victim = next((k for k in self._entries if k[0] == session_id and k != protected), None)
+            if victim is None:
+                break
+            self._evict(victim)
+        while self._total > self.total_bytes:
+            victim = next((k for k in self._entries if k != protected), None)
+            if victim is None:
+                break
+            self._evict(victim)
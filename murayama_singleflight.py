@@ -0,0 +1,132 @@
+"""
+同一計算の同時要求のまとめ（single-flight）
+入力条件の正規化ハッシュが同じ要求が同時に届いた場合、最初の要求の計算だけを実行し、
+後続の要求はその完了を待って同じ結果を受け取る。
+- SingleFlight: スレッド用（Streamlit サーバーの複数セッション）
+- AsyncSingleFlight: asyncio のタスク用（HTTP サービス）
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+from typing import Dict, Any, Callable, Awaitable
+
+from murayama_store import case_key
+
+
+# case_key の引数（それ以外のキーワードは計算の追加条件として扱う）
+_CASE_KEY_ARGS = frozenset(inspect.signature(case_key).parameters)
+
+
+def flight_key(kind: str, **inputs) -> str:
+    """
+    計算の種類と入力条件からキーを作成
+
+    Args:
+        kind: 計算の種類（例: 'parametric_study'）。結果の形式が異なる計算を区別する
+        **inputs: case_key の引数（H_f, gamma, phi, coh, H, alpha, K, force_finite_cover,
+                  theta_range, theta_step）と、結果が変わるその他の条件（予算など、JSON で表せる値）
+
+    Returns:
+        キー文字列
+    """
+    case = {k: v for k, v in inputs.items() if k in _CASE_KEY_ARGS}
+    options = {k: v for k, v in inputs.items() if k not in _CASE_KEY_ARGS}
+    key = f"{kind}:{case_key(**case)}"
+    return f"{key}:{json.dumps(options, sort_keys=True)}" if options else key
+
+
+class _Call:
+    """実行中の計算"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    スレッド間の single-flight
+
+    同じキーの do が実行中であれば、後続のスレッドは計算せずに完了を待って同じ結果を返す。
+    結果のオブジェクトは共有されるため、呼び出し側で変更しないこと（必要ならコピーする）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        キーごとに1回だけ func を実行して結果を返す
+
+        Args:
+            key: 計算のキー（flight_key など）
+            func: 計算を行う関数
+            *args, **kwargs: func の引数
+
+        Returns:
+            func の戻り値（実行中の同じキーの計算があればその結果、例外も共有される）
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    asyncio タスク間の single-flight
+
+    待っているタスクがキャンセルされても、共有の計算自体はキャンセルしない。
+    """
+
+    def __init__(self):
+        self._futures: Dict[str, asyncio.Future] = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    async def do(self, key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        キーごとに1回だけ func のコルーチンを実行して結果を返す
+
+        Args:
+            key: 計算のキー
+            func: コルーチン関数
+            *args, **kwargs: func の引数
+
+        Returns:
+            コルーチンの結果
+        """
+        self.stats['calls'] += 1
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._futures[key] = future
+            future.add_done_callback(lambda _: self._futures.pop(key, None))
+        else:
+            self.stats['shared'] += 1
+        return await asyncio.shield(future)
@@ -0,0 +1,378 @@
+"""
+計算結果の永続キャッシュ（SQLite）
+入力条件（H_f, γ, φ, c, H, α, K, force_finite_cover, θ範囲, 刻み, 計算式のバージョン）の正規化ハッシュをキーとして、
+最大P・臨界角度・安全率と、必要に応じて圧縮した全角度の P を保存する。
+任意のバイト列（アプリのセッションから退避した結果など）も同じ保存量の上限のもとで保存できる。
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from typing import Dict, Any, Optional, List, Sequence
+
+from murayama_vectorized import ArrayLike, theta_grid, find_critical_pressure_batch
+from murayama_numba import find_critical_pressure_fused, safety_factor_at
+
+
+# 計算式のバージョン（式を変更した場合は更新し、古いキャッシュを無効化する）
+CODE_VERSION = 'murayama-revised-1'
+
+# SQLite の1文あたりのパラメータ数の上限に収まる一括検索の件数
+_LOOKUP_BATCH = 500
+
+# 1行あたりの固定サイズの目安 [バイト]（キー・数値列・索引）
+_ROW_OVERHEAD = 160
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    max_P REAL,
+    critical_index INTEGER,
+    critical_theta_d REAL,
+    safety_factor REAL,
+    sweep BLOB,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access);
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+"""
+
+
+# 計算結果の保存（安全率のみ・全角度の P のみを求めた呼び出しで、他方の保存済みの値を消さない）
+_UPSERT_RESULT = f"""
+INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    max_P = excluded.max_P,
+    critical_index = excluded.critical_index,
+    critical_theta_d = excluded.critical_theta_d,
+    safety_factor = COALESCE(excluded.safety_factor, safety_factor),
+    sweep = COALESCE(excluded.sweep, sweep),
+    size = {_ROW_OVERHEAD} + COALESCE(LENGTH(COALESCE(excluded.sweep, sweep)), 0),
+    last_access = excluded.last_access
+"""
+
+
+def _canonical(value: float) -> Optional[float]:
+    """ハッシュ用の数値の正規化（-0.0 → 0.0、NaN/None → None）"""
+    if value is None:
+        return None
+    value = float(value) + 0.0
+    return None if math.isnan(value) else value
+
+
+def case_key(H_f: float, gamma: float, phi: float, coh: float, H: Optional[float] = None,
+             alpha: float = 1.8, K: float = 1.0, force_finite_cover: bool = False,
+             theta_range: tuple = (20, 80), theta_step: float = 1.0) -> str:
+    """
+    入力条件の正規化ハッシュ（キャッシュのキー）
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: 計算条件（H の None/NaN は深部前提）
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+
+    Returns:
+        SHA-256 の16進文字列
+    """
+    H = _canonical(H)
+    if H is not None and math.isinf(H):
+        H = None
+    text = json.dumps([CODE_VERSION, _canonical(H_f), _canonical(gamma), _canonical(phi), _canonical(coh),
+                       H, _canonical(alpha), _canonical(K), bool(force_finite_cover),
+                       [_canonical(t) for t in theta_range], _canonical(theta_step)])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def case_keys(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+              H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8, K: ArrayLike = 1.0,
+              force_finite_cover: ArrayLike = False, theta_range: tuple = (20, 80),
+              theta_step: float = 1.0) -> List[str]:
+    """多数ケースのキー（各引数はスカラーまたは長さnの配列）"""
+    H = np.nan if H is None else H
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float))
+                                    for v in (H_f, gamma, phi, coh, H, alpha, K, force_finite_cover)))
+    return [case_key(*row[:7], bool(row[7]), theta_range, theta_step)
+            for row in zip(*(c.ravel().tolist() for c in columns))]
+
+
+class ResultStore:
+    """
+    計算結果の永続キャッシュ
+
+    SQLite の WAL モードを使用し、複数プロセスから同じファイルを同時に読み書きできる
+    （プロセスごとに ResultStore を作成すること。同一インスタンスはスレッド間で共有可能）。
+    保存量が max_bytes を超えると、最終参照が古い行から削除する。
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = 256 * 1024 * 1024, timeout: float = 30.0):
+        """
+        キャッシュファイルを開く（存在しない場合は作成）
+
+        Args:
+            path: SQLite ファイルのパス
+            max_bytes: 保存量の上限 [バイト]（Noneの場合は無制限）
+            timeout: 他プロセスの書き込み待ちの最大時間 [秒]
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, keys: Sequence[str], with_sweep: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        一括検索
+
+        Args:
+            keys: キーのリスト
+            with_sweep: 全角度の P も読み込むか（保存されていない行は結果に含めない）
+
+        Returns:
+            {キー: {max_P, critical_index, critical_theta_d, safety_factor[, P]}}（見つかったもののみ）
+        """
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        columns = 'key, max_P, critical_index, critical_theta_d, safety_factor' + (', sweep' if with_sweep else '')
+        with self._lock:
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                part = unique[i:i + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT {columns} FROM results WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for row in rows:
+                    if with_sweep and row[5] is None:
+                        continue
+                    entry = {'max_P': _from_db(row[1]), 'critical_index': row[2],
+                             'critical_theta_d': _from_db(row[3]), 'safety_factor': _from_db(row[4])}
+                    if with_sweep:
+                        entry['P'] = _decompress_sweep(row[5])
+                    found[row[0]] = entry
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE results SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+        return found
+
+    def put_many(self, entries: Dict[str, Dict[str, Any]]):
+        """
+        一括保存（同じキーは上書き、ただし安全率・全角度の P が未計算（NaN/None）の場合は保存済みの値を残す）
+        と上限超過分の削除
+
+        Args:
+            entries: {キー: {max_P, critical_index, critical_theta_d, safety_factor[, P]}}
+        """
+        now = time.time()
+        rows = []
+        for key, entry in entries.items():
+            sweep = entry.get('P')
+            blob = _compress_sweep(sweep) if sweep is not None else None
+            rows.append((key, _to_db(entry['max_P']), int(entry['critical_index']),
+                         _to_db(entry['critical_theta_d']), _to_db(entry.get('safety_factor', np.nan)),
+                         blob, _ROW_OVERHEAD + (len(blob) if blob is not None else 0), now))
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(_UPSERT_RESULT, rows)
+                self._evict()
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def get_blob(self, key: str) -> Optional[bytes]:
+        """
+        バイト列の検索
+
+        Args:
+            key: キー
+
+        Returns:
+            保存したバイト列（見つからない場合は None）
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM blobs WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE blobs SET last_access = ? WHERE key = ?", (time.time(), key))
+        return None if row is None else bytes(row[0])
+
+    def put_blob(self, key: str, data: bytes):
+        """
+        バイト列の保存（同じキーは上書き）と上限超過分の削除
+
+        Args:
+            key: キー
+            data: バイト列
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)",
+                                   (key, data, _ROW_OVERHEAD + len(data), time.time()))
+                self._evict()
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def delete_blob(self, key: str):
+        """バイト列の削除"""
+        with self._lock:
+            self._conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+
+    def _evict(self):
+        """保存量が上限を超えた場合、最終参照が古い行から削除（計算結果・バイト列の合計で上限の9割まで）"""
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT (SELECT COALESCE(SUM(size), 0) FROM results)"
+                                   " + (SELECT COALESCE(SUM(size), 0) FROM blobs)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * 0.9)
+        victims = self._conn.execute("""
+            SELECT tbl, key FROM (
+                SELECT tbl, key, size, SUM(size) OVER (ORDER BY last_access, key) AS cumulative
+                FROM (SELECT 'results' AS tbl, key, size, last_access FROM results
+                      UNION ALL SELECT 'blobs' AS tbl, key, size, last_access FROM blobs)
+            ) WHERE cumulative - size < ?""", (excess,)).fetchall()
+        for table in ('results', 'blobs'):
+            self._conn.executemany(f"DELETE FROM {table} WHERE key = ?",
+                                   [(key,) for tbl, key in victims if tbl == table])
+
+    def stats(self) -> Dict[str, int]:
+        """保存件数（計算結果・バイト列）と保存量 [バイト]"""
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            blobs, blob_size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {'entries': count, 'blobs': blobs, 'bytes': size + blob_size}
+
+
+def _compress_sweep(P: np.ndarray) -> bytes:
+    """全角度の P の圧縮（バイト位置ごとに並べ替えてから zlib、隣接角度で上位バイトがそろうため縮む）"""
+    raw = np.ascontiguousarray(P, dtype=np.float64).view(np.uint8).reshape(-1, 8)
+    return zlib.compress(raw.T.tobytes())
+
+
+def _decompress_sweep(blob: bytes) -> np.ndarray:
+    raw = np.frombuffer(zlib.decompress(blob), dtype=np.uint8).reshape(8, -1)
+    return np.ascontiguousarray(raw.T).view(np.float64).ravel()
+
+
+def _to_db(value: float) -> Optional[float]:
+    """SQLite は NaN を NULL として保存するため、inf はそのまま、NaN は None とする"""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _from_db(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def find_critical_pressure_cached(store: ResultStore, H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike,
+                                  coh: ArrayLike, H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                  K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                  theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                  safety_factor: bool = False, return_sweep: bool = False) -> Dict[str, Any]:
+    """
+    永続キャッシュを使った多数ケースの臨界支保圧（と安全率）の一括計算
+
+    キャッシュにないケースのみを計算して保存する。
+
+    Args:
+        store: 永続キャッシュ
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: find_critical_pressure_batch と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        safety_factor: True の場合は臨界角度での強度低減安全率も求める
+        return_sweep: True の場合は全角度の P (n, n_theta) も求めて保存する
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        safety_factor, n_hits, n_computed[, P])。safety_factor=False の場合、キャッシュにない安全率は NaN
+    """
+    H = np.nan if H is None else H
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh, 'H': H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    n = max(np.size(v) for v in inputs.values())
+    theta = theta_grid(theta_range, theta_step)
+    keys = case_keys(**inputs, theta_range=theta_range, theta_step=theta_step)
+
+    found = store.get_many(keys, with_sweep=return_sweep)
+    hit = np.array([key in found and not (safety_factor and np.isnan(found[key]['safety_factor']))
+                    for key in keys], dtype=bool)
+
+    max_P = np.empty(n)
+    critical_index = np.empty(n, dtype=np.intp)
+    sf = np.full(n, np.nan)
+    P_all = np.empty((n, theta.size)) if return_sweep else None
+    for i in np.flatnonzero(hit):
+        entry = found[keys[i]]
+        max_P[i] = entry['max_P']
+        critical_index[i] = entry['critical_index']
+        sf[i] = entry['safety_factor']
+        if return_sweep:
+            P_all[i] = entry['P']
+
+    miss = np.flatnonzero(~hit)
+    if miss.size:
+        sub = {k: (v if np.ndim(v) == 0 else np.broadcast_to(v, (n,))[miss]) for k, v in inputs.items()}
+        if return_sweep:
+            res = find_critical_pressure_batch(**sub, theta_range=theta_range, theta_step=theta_step,
+                                               return_sweep=True)
+            P_all[miss] = res['P']
+            if safety_factor:
+                # 掃引で求めた臨界角度で安全率のみを計算する（掃引をやり直さない）
+                sf[miss] = safety_factor_at(res['critical_theta_d'], **sub)
+        else:
+            res = find_critical_pressure_fused(**sub, theta_range=theta_range, theta_step=theta_step,
+                                               safety_factor=safety_factor)
+            if safety_factor:
+                sf[miss] = res['safety_factor']
+        max_P[miss] = res['max_P']
+        critical_index[miss] = res['critical_index']
+        entries = {}
+        for i in miss:
+            entries[keys[i]] = {
+                'max_P': max_P[i], 'critical_index': critical_index[i],
+                'critical_theta_d': theta[critical_index[i]] if critical_index[i] >= 0 else np.nan,
+                'safety_factor': sf[i], 'P': P_all[i] if return_sweep else None,
+            }
+        store.put_many(entries)
+
+    critical_theta_d = np.where(critical_index >= 0, theta[critical_index], np.nan)
+    result = {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': theta,
+        'safety_factor': sf,
+        'n_hits': int(hit.sum()),
+        'n_computed': int(miss.size),
+    }
+    if P_all is not None:
+        result['P'] = P_all
+    return result
@@ -0,0 +1,830 @@
+"""
+村山の式のベクトル化計算モジュール
+murayama_calculator_revised.py のスカラー実装と同一の式を NumPy 配列で評価する
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional, Union
+
+
+ArrayLike = Union[float, np.ndarray]
+
+# 自重カーネルの出力配列名
+SELF_WEIGHT_FIELDS = ('Wf', 'lw', 'w1', 'lw1', 'w2', 'lw2')
+
+# 自重カーネルの作業配列名
+_SELF_WEIGHT_WORK = ('tphi', 'O', 'a', 'sin_a', 'S', 'R', 'T', 'U', 'V', 'cos_V', 'sin_V', 'tmp', 'mask')
+
+# 大規模配列を処理する際の標準チャンクサイズ（要素数）
+DEFAULT_CHUNK_SIZE = 65536
+
+
+class SelfWeightWorkspace:
+    """
+    自重カーネル用の作業領域
+
+    中間配列（O, P+φ, S, T, U, V など）を事前確保して保持し、
+    繰り返し呼び出しでの配列確保を避ける。
+    """
+
+    def __init__(self, size: int, dtype=np.float64):
+        """
+        作業領域の確保
+
+        Args:
+            size: 1回のカーネル呼び出しで扱う最大要素数
+            dtype: 浮動小数点型（標準: float64）
+        """
+        if size <= 0:
+            raise ValueError("作業領域の要素数は正の値である必要があります")
+        self.size = int(size)
+        self.dtype = np.dtype(dtype)
+        self.work = {name: np.empty(self.size, dtype=bool if name == 'mask' else self.dtype)
+                     for name in _SELF_WEIGHT_WORK}
+        self.out = {name: np.empty(self.size, dtype=self.dtype) for name in SELF_WEIGHT_FIELDS}
+
+    def views(self, n: int):
+        """
+        先頭n要素の作業配列・出力配列ビューを返す
+
+        Args:
+            n: 要素数（size以下）
+
+        Returns:
+            (作業配列の辞書, 出力配列の辞書)
+        """
+        if n > self.size:
+            raise ValueError(f"作業領域が不足しています: {n} > {self.size}")
+        work = {k: v[:n] for k, v in self.work.items()}
+        out = {k: v[:n] for k, v in self.out.items()}
+        return work, out
+
+
+def self_weight_kernel(r0: np.ndarray, rd: np.ndarray, theta_d: np.ndarray,
+                       B: np.ndarray, la: np.ndarray, H_f: ArrayLike,
+                       gamma: ArrayLike, phi: ArrayLike,
+                       out: Optional[Dict[str, np.ndarray]] = None,
+                       work: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    自重の等価合力と作用点の配列計算（Excel M9式準拠）
+
+    MurayamaCalculatorRevised.calculate_self_weight と同一の式を、
+    共通部分式（sin/cos(P+φ)、sin/cos(V) など）を1回だけ評価し、
+    すべての中間結果を out/work の事前確保配列へ書き込んで計算する。
+
+    Args:
+        r0: 初期半径 [m] (1次元配列)
+        rd: 終端半径 [m]
+        theta_d: 探索角度 [ラジアン]
+        B: 滑り面の水平投影幅 [m]
+        la: 滑り面上端の水平位置 [m]
+        H_f: 切羽高さ [m] (スカラーまたは r0 と同形状)
+        gamma: 地山単位体積重量 [kN/m³] (スカラーまたは r0 と同形状)
+        phi: 内部摩擦角 [ラジアン] (スカラーまたは r0 と同形状)
+        out: 出力配列の辞書 (Wf, lw, w1, lw1, w2, lw2)。Noneの場合は新規確保
+        work: 作業配列の辞書（SelfWeightWorkspace.views の第1要素）。Noneの場合は新規確保
+
+    Returns:
+        自重関連のパラメータ配列の辞書 (Wf, lw, w1, lw1, w2, lw2)
+    """
+    n = np.shape(r0)[0]
+    if out is None or work is None:
+        ws_work, ws_out = SelfWeightWorkspace(max(n, 1), np.result_type(r0, 1.0)).views(n)
+        out = ws_out if out is None else out
+        work = ws_work if work is None else work
+
+    Wf, lw, w1, lw1, w2, lw2 = (out[k] for k in SELF_WEIGHT_FIELDS)
+    tphi, O, a, sin_a, S, R, T, U, V, cos_V, sin_V, tmp, mask = (work[k] for k in _SELF_WEIGHT_WORK)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        np.tan(phi, out=tphi)
+
+        # 三角形部分: w1 = γ·H_f·B/2, lw1 = la + B/3
+        np.multiply(B, H_f, out=w1)
+        np.multiply(w1, gamma, out=w1)
+        np.multiply(w1, 0.5, out=w1)
+        np.divide(B, 3.0, out=lw1)
+        np.add(lw1, la, out=lw1)
+
+        # 曲線部分: w2 = γ·((rd² - r0²)/(4tanφ) - r0·rd·sinθd/2)
+        np.subtract(rd, r0, out=w2)
+        np.add(rd, r0, out=tmp)
+        np.multiply(w2, tmp, out=w2)
+        np.multiply(tphi, 4.0, out=tmp)
+        np.divide(w2, tmp, out=w2)
+        np.sin(theta_d, out=tmp)
+        np.multiply(tmp, r0, out=tmp)
+        np.multiply(tmp, rd, out=tmp)
+        np.multiply(tmp, 0.5, out=tmp)
+        np.subtract(w2, tmp, out=w2)
+        np.multiply(w2, gamma, out=w2)
+
+        # 全体: Wf = w1 + w2
+        np.add(w1, w2, out=Wf)
+
+        # O（切羽の対角線長）と a = P + φ（P は方向角）
+        np.hypot(B, H_f, out=O)
+        np.arctan2(H_f, B, out=a)
+        np.add(a, phi, out=a)
+        np.sin(a, out=sin_a)
+
+        # S = sqrt(O²/4 + r0² - O·r0·cos(P+φ))
+        np.cos(a, out=tmp)
+        np.multiply(tmp, O, out=tmp)
+        np.multiply(tmp, r0, out=tmp)
+        np.multiply(O, O, out=S)
+        np.multiply(S, 0.25, out=S)
+        np.subtract(S, tmp, out=S)
+        np.multiply(r0, r0, out=tmp)
+        np.add(S, tmp, out=S)
+        np.maximum(S, 0.0, out=S)  # 丸め誤差による負値（O/2 ≈ r0 かつ P+φ ≈ 0）
+        np.sqrt(S, out=S)
+
+        # T = arccos(clip(R/S)) - (P + φ - π/2)、R = r0·sin(P+φ)
+        np.multiply(r0, sin_a, out=R)
+        np.less_equal(S, 0.0, out=mask)
+        np.divide(R, S, out=T)
+        np.clip(T, -1.0, 1.0, out=T)
+        np.copyto(T, 1.0, where=mask)
+        np.arccos(T, out=T)
+        np.subtract(T, a, out=T)
+        np.add(T, np.pi / 2.0, out=T)
+
+        # U = (r0·exp(T·tanφ) - S)·R / S（S = 0 の場合は分母 1）
+        np.multiply(T, tphi, out=U)
+        np.exp(U, out=U)
+        np.multiply(U, r0, out=U)
+        np.subtract(U, S, out=U)
+        np.multiply(U, R, out=U)
+        np.copyto(tmp, S)
+        np.copyto(tmp, 1.0, where=mask)
+        np.divide(U, tmp, out=U)
+
+        # V = π - 2·arctan(O/(2U))（|U| ≤ 1e-12 の場合は π）
+        np.multiply(U, 2.0, out=V)
+        np.divide(O, V, out=V)
+        np.arctan(V, out=V)
+        np.multiply(V, -2.0, out=V)
+        np.add(V, np.pi, out=V)
+        np.abs(U, out=tmp)
+        np.less_equal(tmp, 1e-12, out=mask)
+        np.copyto(V, np.pi, where=mask)
+        np.cos(V, out=cos_V)
+        np.sin(V, out=sin_V)
+
+        # lw2 第1項: S·cos(φ + T)
+        np.add(T, phi, out=lw2)
+        np.cos(lw2, out=lw2)
+        np.multiply(lw2, S, out=lw2)
+
+        # lw2 第2項: U/(1-cosV)·((2/3)·sin³V/(V - sinV·cosV) - cosV)·cos(arctan(B/H_f))
+        # （(1-cos²V)/(V-sinV·cosV)·sinV = sin³V/(V-sinV·cosV)、cos(arctan(B/H_f)) = H_f/O）
+        np.multiply(sin_V, cos_V, out=tmp)
+        np.subtract(V, tmp, out=tmp)                   # V - sinV·cosV
+        np.multiply(sin_V, sin_V, out=S)               # S は以降不要なので再利用
+        np.multiply(S, sin_V, out=S)
+        np.divide(S, tmp, out=S)
+        np.multiply(S, 2.0 / 3.0, out=S)
+        np.subtract(S, cos_V, out=S)
+        np.subtract(1.0, cos_V, out=tmp)
+        np.divide(U, tmp, out=tmp)
+        np.multiply(S, tmp, out=S)
+        np.divide(H_f, O, out=tmp)
+        np.multiply(S, tmp, out=S)
+        np.add(lw2, S, out=lw2)
+
+        # 合成重心 lw = (w1·lw1 + w2·lw2)/(w1 + w2)（|w1 + w2| ≤ 1e-12 の場合は la + B/2）
+        np.multiply(w1, lw1, out=lw)
+        np.multiply(w2, lw2, out=tmp)
+        np.add(lw, tmp, out=lw)
+        np.add(w1, w2, out=tmp)
+        np.divide(lw, tmp, out=lw)
+        np.abs(tmp, out=tmp)
+        np.less_equal(tmp, 1e-12, out=mask)
+        if mask.any():
+            np.divide(B, 2.0, out=tmp)
+            np.add(tmp, la, out=tmp)
+            np.copyto(lw, tmp, where=mask)
+
+    return out
+
+
+def _chunk(x: ArrayLike, sl: slice) -> ArrayLike:
+    """スカラーはそのまま、配列はスライスを返す"""
+    return x if np.ndim(x) == 0 else x[sl]
+
+
+def calculate_self_weight_batch(r0: np.ndarray, rd: np.ndarray, theta_d: np.ndarray,
+                                B: np.ndarray, la: np.ndarray, H_f: ArrayLike,
+                                gamma: ArrayLike, phi: ArrayLike,
+                                out: Optional[Dict[str, np.ndarray]] = None,
+                                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                workspace: Optional[SelfWeightWorkspace] = None) -> Dict[str, np.ndarray]:
+    """
+    大規模配列に対する自重計算（チャンク分割）
+
+    作業領域はチャンクサイズ分のみ確保し、結果は out に直接書き込むため、
+    10^7 要素規模でも追加メモリは出力配列とチャンク1つ分に限られる。
+
+    Args:
+        r0, rd, theta_d, B, la: 幾何パラメータ配列（1次元、同一長）
+        H_f, gamma, phi: 地盤条件（スカラーまたは同一長の配列、φはラジアン）
+        out: 出力配列の辞書（Noneの場合は新規確保）
+        chunk_size: 1回のカーネル呼び出しで処理する要素数
+        workspace: 再利用する作業領域（Noneの場合はチャンクサイズで確保）
+
+    Returns:
+        自重関連のパラメータ配列の辞書 (Wf, lw, w1, lw1, w2, lw2)
+    """
+    r0 = np.asarray(r0)
+    n = r0.shape[0]
+    dtype = workspace.dtype if workspace is not None else np.result_type(r0, 1.0)
+    if out is None:
+        out = {name: np.empty(n, dtype=dtype) for name in SELF_WEIGHT_FIELDS}
+    if workspace is None:
+        workspace = SelfWeightWorkspace(max(1, min(n, chunk_size)), dtype)
+    step = workspace.size
+
+    for start in range(0, n, step):
+        sl = slice(start, min(start + step, n))
+        m = sl.stop - sl.start
+        work, _ = workspace.views(m)
+        self_weight_kernel(
+            r0[sl], _chunk(rd, sl), _chunk(theta_d, sl), _chunk(B, sl), _chunk(la, sl),
+            _chunk(H_f, sl), _chunk(gamma, sl), _chunk(phi, sl),
+            out={k: v[sl] for k, v in out.items()}, work=work
+        )
+
+    return out
+
+
+# ケースパラメータ名（MurayamaCalculatorRevised の引数と同じ単位、φは度）
+CASE_FIELDS = ('H_f', 'gamma', 'phi', 'coh', 'H', 'alpha', 'K')
+
+# 掃引計算で保持する角度ごとの量
+SWEEP_FIELDS = ('r0', 'rd', 'la', 'B', 'lp', 'q', 'Mc', 'P') + SELF_WEIGHT_FIELDS
+
+
+def case_from_calculator(calculator) -> Dict[str, Any]:
+    """
+    計算機インスタンスの条件を SweepPlan.execute の引数に変換
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+
+    Returns:
+        SweepPlan.execute のキーワード引数の辞書（φは度、深部前提は H=None）
+    """
+    return {
+        'H_f': calculator.H_f,
+        'gamma': calculator.gamma,
+        'phi': calculator.phi_deg,
+        'coh': calculator.coh,
+        'H': calculator.H,
+        'alpha': calculator.alpha,
+        'K': calculator.K,
+        'force_finite_cover': calculator.force_finite_cover,
+    }
+
+
+def evaluate_support_pressure(calculator, theta_values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    1ケースについて任意の角度配列で支保圧を一括評価
+
+    Args:
+        calculator: MurayamaCalculatorRevised のインスタンス
+        theta_values: 探索角度の配列 [ラジアン]
+
+    Returns:
+        角度ごとの量の辞書（SWEEP_FIELDS と valid、各 (n_theta,) のコピー）
+    """
+    plan = SweepPlan(theta_values, batch_size=1)
+    res = plan.execute(**case_from_calculator(calculator))
+    out = {name: res[name][0].copy() for name in SWEEP_FIELDS}
+    out['valid'] = res['valid'][0].copy()
+    out['theta_d'] = plan.theta_d
+    return out
+
+
+def theta_grid(theta_range: tuple = (20, 80), theta_step: float = 1.0) -> np.ndarray:
+    """
+    探索角度の配列（find_critical_pressure と同一の刻み方）
+
+    Args:
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+
+    Returns:
+        探索角度の配列 [ラジアン]
+    """
+    theta_min_rad = np.radians(theta_range[0])
+    theta_max_rad = np.radians(theta_range[1])
+    theta_step_rad = np.radians(theta_step)
+    return np.arange(theta_min_rad, theta_max_rad + theta_step_rad, theta_step_rad)
+
+
+def geometry_kernel(theta_d: ArrayLike, H_f: ArrayLike, phi: ArrayLike,
+                    out: Dict[str, np.ndarray], work: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    幾何の閉合計算（配列版）
+
+    分母 exp(θd·tanφ)·sin(φ+θd) - sinφ が極小となる要素は work['ok'] が False になる
+    （スカラー版では ValueError となる角度）。
+
+    Args:
+        theta_d: 探索角度 [ラジアン]
+        H_f: 切羽高さ [m]
+        phi: 内部摩擦角 [ラジアン]
+        out: 出力配列の辞書 (r0, rd, la, B, lp)
+        work: 作業配列の辞書 (e, phi_theta, tmp, ok)
+
+    Returns:
+        幾何パラメータ配列の辞書 (r0, rd, la, B, lp)
+    """
+    r0, rd, la, B, lp = out['r0'], out['rd'], out['la'], out['B'], out['lp']
+    e, phi_theta, tmp, ok = work['e'], work['phi_theta'], work['tmp'], work['ok']
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # e = exp(θd·tanφ)、φ + θd
+        np.tan(phi, out=tmp)
+        np.multiply(tmp, theta_d, out=e)
+        np.exp(e, out=e)
+        np.add(phi, theta_d, out=phi_theta)
+
+        # r0 = H_f / (e·sin(φ+θd) - sinφ)
+        np.sin(phi_theta, out=r0)
+        np.multiply(r0, e, out=r0)
+        np.sin(phi, out=tmp)
+        np.subtract(r0, tmp, out=r0)
+        np.abs(r0, out=tmp)
+        np.greater_equal(tmp, 1e-10, out=ok)
+        np.divide(H_f, r0, out=r0)
+
+        # rd = r0·e、la = rd·cos(φ+θd)
+        np.multiply(r0, e, out=rd)
+        np.cos(phi_theta, out=la)
+        np.multiply(la, rd, out=la)
+
+        # B = r0·cosφ - la、lp = r0·sinφ + H_f/2
+        np.cos(phi, out=tmp)
+        np.multiply(tmp, r0, out=B)
+        np.subtract(B, la, out=B)
+        np.sin(phi, out=tmp)
+        np.multiply(tmp, r0, out=lp)
+        np.multiply(H_f, 0.5, out=tmp)
+        np.add(lp, tmp, out=lp)
+
+    return out
+
+
+def surcharge_kernel(B: np.ndarray, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                     H: ArrayLike, alpha: ArrayLike, K: ArrayLike, force_finite_cover: ArrayLike,
+                     out: np.ndarray, work: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    上載荷重の等価合力 q（配列版）
+
+    H = inf は深部前提（スカラー版の H=None）として扱う。
+
+    Args:
+        B: 滑り面の水平投影幅 [m]
+        gamma, phi, coh, H, alpha, K: 地盤条件・係数（φはラジアン）
+        force_finite_cover: 有限土被り式を強制するフラグ
+        out: 出力配列 q
+        work: 作業配列の辞書 (e, tmp, ok)
+
+    Returns:
+        等価合力 q [kN/m²]
+    """
+    fac, tmp, deep = work['e'], work['tmp'], work['ok']
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # q0 = α·B·(γ - 2c/(αB)) / (2K·tanφ)
+        np.multiply(alpha, B, out=out)
+        np.divide(coh, out, out=tmp)
+        np.multiply(tmp, 2.0, out=tmp)
+        np.subtract(gamma, tmp, out=tmp)
+        np.multiply(out, tmp, out=out)
+        np.tan(phi, out=tmp)
+        np.multiply(tmp, K, out=tmp)
+        np.multiply(tmp, 2.0, out=tmp)
+        np.divide(out, tmp, out=out)
+
+        # 有限土被り: 1 - exp(-2K·H·tanφ/(αB))
+        np.multiply(tmp, H, out=fac)
+        np.negative(fac, out=fac)
+        np.multiply(alpha, B, out=tmp)
+        np.divide(fac, tmp, out=fac)
+        np.exp(fac, out=fac)
+        np.subtract(1.0, fac, out=fac)
+
+        # 深部判定（H > 1.5B かつ強制フラグなし）では角括弧→1
+        np.multiply(B, 1.5, out=tmp)
+        np.greater(H, tmp, out=deep)
+        np.greater(deep, force_finite_cover, out=deep)
+        np.copyto(fac, 1.0, where=deep)
+        np.multiply(out, fac, out=out)
+
+    return out
+
+
+def cohesion_moment_kernel(r0: np.ndarray, rd: np.ndarray, phi: ArrayLike, coh: ArrayLike,
+                           out: np.ndarray, work: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    粘着抵抗モーメント Mc = coh·(rd² - r0²)/(2tanφ)（配列版）
+
+    Args:
+        r0: 初期半径 [m]
+        rd: 終端半径 [m]
+        phi: 内部摩擦角 [ラジアン]
+        coh: 粘着力 [kPa]
+        out: 出力配列 Mc
+        work: 作業配列の辞書 (tmp)
+
+    Returns:
+        粘着抵抗モーメント Mc [kN·m]
+    """
+    tmp = work['tmp']
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        np.subtract(rd, r0, out=out)
+        np.add(rd, r0, out=tmp)
+        np.multiply(out, tmp, out=out)
+        np.multiply(out, coh, out=out)
+        np.tan(phi, out=tmp)
+        np.multiply(tmp, 2.0, out=tmp)
+        np.divide(out, tmp, out=out)
+    return out
+
+
+def support_pressure_kernel(fields: Dict[str, np.ndarray], work: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    支保圧 P = (Wf·lw + q·B·(la + B/2) - Mc) / lp（配列版）
+
+    Args:
+        fields: 各量の配列の辞書 (Wf, lw, q, B, la, Mc, lp, P)
+        work: 作業配列の辞書 (tmp)
+
+    Returns:
+        支保圧 P [kN/m²]（fields['P'] に書き込み）
+    """
+    P, tmp = fields['P'], work['tmp']
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        np.multiply(fields['B'], 0.5, out=tmp)
+        np.add(tmp, fields['la'], out=tmp)
+        np.multiply(tmp, fields['B'], out=tmp)
+        np.multiply(tmp, fields['q'], out=tmp)
+        np.multiply(fields['Wf'], fields['lw'], out=P)
+        np.add(P, tmp, out=P)
+        np.subtract(P, fields['Mc'], out=P)
+        np.divide(P, fields['lp'], out=P)
+    return P
+
+
+class SweepPlan:
+    """
+    θd 掃引計算の実行計画（FFTのプランに相当）
+
+    θd グリッドとバッチサイズを固定して全中間配列を事前確保し、
+    execute の繰り返し呼び出しでは新たな配列を確保しない。
+    execute の戻り値は計画内部の配列のビューであり、次回の execute で上書きされる。
+    """
+
+    def __init__(self, theta_values: np.ndarray, batch_size: int = 1, dtype=np.float64):
+        """
+        実行計画の作成
+
+        Args:
+            theta_values: 探索角度の配列 [ラジアン]
+            batch_size: 1回の execute で扱う最大ケース数
+            dtype: 浮動小数点型（標準: float64）
+        """
+        if batch_size <= 0:
+            raise ValueError("バッチサイズは正の値である必要があります")
+        self.dtype = np.dtype(dtype)
+        self.theta_d = np.array(theta_values, dtype=self.dtype).ravel()
+        if self.theta_d.size == 0:
+            raise ValueError("探索角度が空です")
+        self.theta_d_deg = np.degrees(self.theta_d)
+        self.n_theta = self.theta_d.size
+        self.batch_size = int(batch_size)
+
+        shape = (self.batch_size, self.n_theta)
+        self._fields = {name: np.empty(shape, dtype=self.dtype) for name in SWEEP_FIELDS}
+        self._valid = np.empty(shape, dtype=bool)
+        self._degenerate = np.empty(shape, dtype=bool)
+        self._work = {name: np.empty(shape, dtype=self.dtype) for name in ('e', 'phi_theta', 'tmp')}
+        self._work['ok'] = np.empty(shape, dtype=bool)
+        self._self_weight = SelfWeightWorkspace(self.batch_size * self.n_theta, self.dtype)
+
+        self._case = {name: np.empty((self.batch_size, 1), dtype=self.dtype) for name in CASE_FIELDS}
+        self._force_finite = np.empty((self.batch_size, 1), dtype=bool)
+        self._case_mask = np.empty((self.batch_size, 1), dtype=bool)
+        self._max_P = np.empty(self.batch_size, dtype=self.dtype)
+        self._critical_index = np.empty(self.batch_size, dtype=np.intp)
+        self._critical_theta_d = np.empty(self.batch_size, dtype=self.dtype)
+        self._views_n = None
+        self._views = None
+        self._work_views = None
+        self._self_weight_views = None
+
+    @staticmethod
+    def bytes_per_case(n_theta: int, dtype=np.float64) -> int:
+        """
+        1ケースあたりの θd 方向の作業配列のバイト数（__init__ で確保する配列に対応）
+
+        Args:
+            n_theta: 探索角度の数
+            dtype: 浮動小数点型
+
+        Returns:
+            バイト数
+        """
+        # 掃引結果・作業配列 (e, phi_theta, tmp)・自重カーネルの作業配列と出力
+        n_float = (len(SWEEP_FIELDS) + 3 + sum(name != 'mask' for name in _SELF_WEIGHT_WORK)
+                   + len(SELF_WEIGHT_FIELDS))
+        # 有効・退化・作業用 (ok)・自重カーネルのマスク
+        n_bool = 3 + ('mask' in _SELF_WEIGHT_WORK)
+        return int(n_theta) * (n_float * np.dtype(dtype).itemsize + n_bool)
+
+    @classmethod
+    def from_range(cls, theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                   batch_size: int = 1, dtype=np.float64) -> 'SweepPlan':
+        """
+        探索角度範囲と刻みから実行計画を作成
+
+        Args:
+            theta_range: 探索角度範囲 [度] (min, max)
+            theta_step: 角度刻み [度]
+            batch_size: 1回の execute で扱う最大ケース数
+            dtype: 浮動小数点型
+
+        Returns:
+            実行計画
+        """
+        return cls(theta_grid(theta_range, theta_step), batch_size, dtype)
+
+    def _get_views(self, n: int) -> Dict[str, np.ndarray]:
+        """先頭nケース分のビューを返す（ケース数が変わらない限り再利用）"""
+        if self._views_n != n:
+            views = {name: buf[:n] for name, buf in self._fields.items()}
+            views['valid'] = self._valid[:n]
+            views['degenerate'] = self._degenerate[:n]
+            views['theta_d'] = self.theta_d
+            views['max_P'] = self._max_P[:n]
+            views['critical_index'] = self._critical_index[:n]
+            views['critical_theta_d'] = self._critical_theta_d[:n]
+            size = n * self.n_theta
+            self._work_views = {name: buf[:n] for name, buf in self._work.items()}
+            self._self_weight_views = {name: buf[:size].reshape(n, self.n_theta)
+                                       for name, buf in self._self_weight.work.items()}
+            self._views = views
+            self._views_n = n
+        return self._views
+
+    def execute(self, H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8, K: ArrayLike = 1.0,
+                force_finite_cover: ArrayLike = False) -> Dict[str, np.ndarray]:
+        """
+        全ケース・全角度の支保圧を計算し、ケースごとの最大値を求める
+
+        各引数はスカラー（全ケース共通）または長さnの配列。
+        入力値の妥当性チェックは行わない（MurayamaCalculatorRevised と同じ範囲を前提とする）。
+
+        Args:
+            H_f: 切羽高さ [m]
+            gamma: 地山単位体積重量 [kN/m³]
+            phi: 地山内部摩擦角 [度]
+            coh: 地山粘着力 [kPa]
+            H: 土被り [m]（None または NaN は深部前提）
+            alpha: 影響幅係数
+            K: 経験係数
+            force_finite_cover: 有限土被り式を強制的に使用するフラグ
+
+        Returns:
+            計算結果の辞書（計画内部配列のビュー）
+            - P など SWEEP_FIELDS の各量: (n, n_theta)（無効な角度の P は NaN）
+            - valid: 有効な角度 (n, n_theta)
+            - degenerate: 幾何の閉合式の分母が極小の角度 (n, n_theta)
+            - max_P, critical_index, critical_theta_d: (n,)（有効な角度がない場合は NaN, -1, NaN）
+            - theta_d: 探索角度 (n_theta,)
+        """
+        inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+                  'H': np.inf if H is None else H, 'alpha': alpha, 'K': K}
+        n = max([np.size(v) for v in inputs.values()] + [np.size(force_finite_cover)])
+        if n > self.batch_size:
+            raise ValueError(f"ケース数がバッチサイズを超えています: {n} > {self.batch_size}")
+
+        case = {}
+        for name, value in inputs.items():
+            buf = self._case[name][:n]
+            np.copyto(buf, np.reshape(value, (-1, 1)) if np.ndim(value) else value, casting='unsafe')
+            case[name] = buf
+        np.radians(case['phi'], out=case['phi'])
+        deep_mask = self._case_mask[:n]
+        np.isnan(case['H'], out=deep_mask)
+        np.copyto(case['H'], np.inf, where=deep_mask)
+        force_finite = self._force_finite[:n]
+        np.copyto(force_finite, np.reshape(force_finite_cover, (-1, 1)) if np.ndim(force_finite_cover)
+                  else force_finite_cover, casting='unsafe')
+
+        v = self._get_views(n)
+        work = self._work_views
+        sw_work = self._self_weight_views
+
+        theta = self.theta_d
+        geometry_kernel(theta, case['H_f'], case['phi'], v, work)
+        valid = v['valid']
+        np.logical_not(work['ok'], out=v['degenerate'])
+        np.copyto(valid, work['ok'])
+        np.greater(v['B'], 0.1, out=work['ok'])
+        np.logical_and(valid, work['ok'], out=valid)
+
+        surcharge_kernel(v['B'], case['gamma'], case['phi'], case['coh'], case['H'],
+                         case['alpha'], case['K'], force_finite, v['q'], work)
+        self_weight_kernel(v['r0'], v['rd'], theta, v['B'], v['la'],
+                           case['H_f'], case['gamma'], case['phi'], out=v, work=sw_work)
+        cohesion_moment_kernel(v['r0'], v['rd'], case['phi'], case['coh'], v['Mc'], work)
+        support_pressure_kernel(v, work)
+
+        # 無効な角度（幾何不適切・B ≤ 0.1・非有限値）は P = NaN とし、例外は使わない
+        P = v['P']
+        np.isfinite(P, out=work['ok'])
+        np.logical_and(valid, work['ok'], out=valid)
+        np.logical_not(valid, out=work['ok'])
+        np.copyto(P, np.nan, where=work['ok'])
+
+        # 有効な角度の中での最大値（有効な角度がないケースは max_P = NaN、critical_index = -1）
+        tmp = work['tmp']
+        np.copyto(tmp, P)
+        np.copyto(tmp, -np.inf, where=work['ok'])
+        np.argmax(tmp, axis=1, out=v['critical_index'])
+        np.fmax.reduce(P, axis=1, out=v['max_P'])
+        np.take(theta, v['critical_index'], out=v['critical_theta_d'])
+        no_solution = self._case_mask[:n, 0]
+        np.isnan(v['max_P'], out=no_solution)
+        np.copyto(v['critical_index'], -1, where=no_solution)
+        np.copyto(v['critical_theta_d'], np.nan, where=no_solution)
+
+        return v
+
+
+def find_critical_pressure_batch(H_f: ArrayLike, gamma: ArrayLike, phi: ArrayLike, coh: ArrayLike,
+                                 H: Optional[ArrayLike] = None, alpha: ArrayLike = 1.8,
+                                 K: ArrayLike = 1.0, force_finite_cover: ArrayLike = False,
+                                 theta_range: tuple = (20, 80), theta_step: float = 1.0,
+                                 batch_size: int = 1024, plan: Optional[SweepPlan] = None,
+                                 return_sweep: bool = False, dtype=np.float64,
+                                 verify: bool = True) -> Dict[str, Any]:
+    """
+    多数ケースの臨界支保圧の一括探索（find_critical_pressure のバッチ版、安全率は計算しない）
+
+    dtype=np.float32 とするとメモリ帯域を半減した低精度モードで計算する（スクリーニング用）。
+    この場合、最大Pのケースをスカラー実装（float64）で再計算し、誤差を 'verification' に記録する。
+
+    Args:
+        H_f, gamma, phi, coh, H, alpha, K, force_finite_cover: SweepPlan.execute と同じ
+        theta_range: 探索角度範囲 [度] (min, max)
+        theta_step: 角度刻み [度]
+        batch_size: 1回の execute で扱うケース数（plan 指定時は plan のバッチサイズ）
+        plan: 再利用する実行計画（Noneの場合は新規作成）
+        return_sweep: True の場合は全角度の P (n, n_theta) も返す
+        dtype: 計算精度（plan 指定時は plan の dtype）
+        verify: 低精度モードで最大Pのケースを float64 で再検証するか
+
+    Returns:
+        結果の辞書 (max_P, critical_theta_d, critical_theta_d_deg, critical_index, theta_d,
+        diagnostics[, P, verification])。有効な角度がないケースは max_P = NaN、critical_index = -1
+    """
+    inputs = {'H_f': H_f, 'gamma': gamma, 'phi': phi, 'coh': coh,
+              'H': np.nan if H is None else H, 'alpha': alpha, 'K': K,
+              'force_finite_cover': force_finite_cover}
+    n = max(np.size(v) for v in inputs.values())
+    if plan is None:
+        plan = SweepPlan.from_range(theta_range, theta_step, min(batch_size, n), dtype)
+
+    max_P = np.empty(n, dtype=plan.dtype)
+    critical_index = np.empty(n, dtype=np.intp)
+    P_all = np.empty((n, plan.n_theta), dtype=plan.dtype) if return_sweep else None
+    diagnostics = None
+
+    for start in range(0, n, plan.batch_size):
+        sl = slice(start, min(start + plan.batch_size, n))
+        chunk = {k: (v if np.ndim(v) == 0 else np.asarray(v)[sl]) for k, v in inputs.items()}
+        res = plan.execute(**chunk)
+        max_P[sl] = res['max_P']
+        critical_index[sl] = res['critical_index']
+        if P_all is not None:
+            P_all[sl] = res['P']
+        diagnostics = merge_diagnostics(diagnostics, sweep_diagnostics(res), offset=start)
+
+    critical_theta_d = np.where(critical_index >= 0, plan.theta_d[critical_index], np.nan)
+    result = {
+        'max_P': max_P,
+        'critical_theta_d': critical_theta_d,
+        'critical_theta_d_deg': np.degrees(critical_theta_d),
+        'critical_index': critical_index,
+        'theta_d': plan.theta_d,
+        'diagnostics': diagnostics,
+    }
+    if P_all is not None:
+        result['P'] = P_all
+    if verify and plan.dtype != np.float64:
+        result['verification'] = verify_max_case(inputs, max_P, critical_index, plan.theta_d)
+    return result
+
+
+def sweep_diagnostics(result: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    掃引1回分の無効角度の集計（角度ごとの警告の代わり）
+
+    Args:
+        result: SweepPlan.execute の戻り値
+
+    Returns:
+        集計結果の辞書
+        - n_cases, n_evaluated: ケース数・評価点数
+        - n_valid: 有効な点数
+        - n_degenerate: 幾何の閉合式の分母が極小の点数
+        - n_narrow: B ≤ 0.1 の点数
+        - n_nonfinite: 上記以外で P が有限値にならなかった点数
+        - no_solution_cases: 有効な角度が1つもないケースの番号
+    """
+    valid, degenerate, B = result['valid'], result['degenerate'], result['B']
+    with np.errstate(invalid='ignore'):
+        narrow = ~valid & ~degenerate & ~(B > 0.1)
+    n_valid = int(np.count_nonzero(valid))
+    n_degenerate = int(np.count_nonzero(degenerate))
+    n_narrow = int(np.count_nonzero(narrow))
+    return {
+        'n_cases': int(valid.shape[0]),
+        'n_evaluated': int(valid.size),
+        'n_valid': n_valid,
+        'n_degenerate': n_degenerate,
+        'n_narrow': n_narrow,
+        'n_nonfinite': int(valid.size) - n_valid - n_degenerate - n_narrow,
+        'no_solution_cases': np.flatnonzero(result['critical_index'] < 0).tolist(),
+    }
+
+
+def merge_diagnostics(total: Optional[Dict[str, Any]], part: Dict[str, Any],
+                      offset: int = 0) -> Dict[str, Any]:
+    """
+    チャンクごとの集計結果を合算する
+
+    Args:
+        total: これまでの集計（Noneの場合は part をそのまま使用）
+        part: 追加するチャンクの集計
+        offset: チャンク先頭のケース番号
+
+    Returns:
+        合算した集計結果
+    """
+    part = dict(part, no_solution_cases=[i + offset for i in part['no_solution_cases']])
+    if total is None:
+        return part
+    merged = {k: total[k] + part[k] for k in total if k != 'no_solution_cases'}
+    merged['no_solution_cases'] = total['no_solution_cases'] + part['no_solution_cases']
+    return merged
+
+
+def verify_max_case(inputs: Dict[str, ArrayLike], max_P: np.ndarray, critical_index: np.ndarray,
+                    theta_d: np.ndarray) -> Dict[str, Any]:
+    """
+    低精度計算の精度確認：最大Pのケースを1ケースの float64 の実行計画で再計算する
+    （MurayamaCalculatorRevised の入力範囲チェックを通さないため、バッチと同じ入力をすべて検証できる）
+
+    Args:
+        inputs: ケースパラメータの辞書（find_critical_pressure_batch の入力、H の NaN は深部前提）
+        max_P: 低精度で求めたケースごとの最大P
+        critical_index: 低精度で求めた臨界角度のインデックス
+        theta_d: 低精度計算の探索角度 [ラジアン]
+
+    Returns:
+        検証結果の辞書
+        - case_index: 再検証したケースの番号
+        - max_P: 低精度での最大P、max_P_float64: float64 での最大P
+        - abs_error, rel_error: 最大Pの絶対誤差・相対誤差
+        - critical_index, critical_index_float64: 臨界角度のインデックス
+    """
+    if not np.isfinite(max_P).any():
+        return {'case_index': None, 'max_P': np.nan, 'max_P_float64': np.nan,
+                'abs_error': np.nan, 'rel_error': np.nan,
+                'critical_index': None, 'critical_index_float64': None}
+
+    i = int(np.nanargmax(np.where(np.isfinite(max_P), max_P, -np.inf)))
+    params = {k: (v if np.ndim(v) == 0 else np.asarray(v)[i]) for k, v in inputs.items()}
+    res = SweepPlan(theta_d.astype(np.float64)).execute(**params)
+    P64 = np.where(res['valid'][0], res['P'][0], -np.inf)
+    index64 = int(np.argmax(P64))
+    P_low = float(max_P[i])
+    P_ref = float(P64[index64])
+    abs_error = abs(P_low - P_ref)
+
+    return {
+        'case_index': i,
+        'max_P': P_low,
+        'max_P_float64': P_ref,
+        'abs_error': abs_error,
+        'rel_error': abs_error / abs(P_ref) if P_ref != 0.0 else abs_error,
+        'critical_index': int(critical_index[i]),
+        'critical_index_float64': index64,
+    }
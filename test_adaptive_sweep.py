@@ -0,0 +1,66 @@
+"""
+θd 適応的サンプリングのテスト
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_adaptive import adaptive_sweep, find_validity_boundaries, projected_width
+from murayama_vectorized import evaluate_support_pressure
+
+
+def test_adaptive_peak_accuracy():
+    """少ない評価点数で 0.001° 刻みの探索と同等の最大Pが得られること"""
+    print("=== 適応的サンプリングの精度 ===")
+    for args in [(10.0, 20.0, 30.0, 20.0), (10.0, 20.0, 30.0, 20.0, 30.0, 1.8, 1.0, True),
+                 (5.2, 25.5, 21.0, 253.0, 9.9, 1.8, 1.0, True)]:
+        calculator = MurayamaCalculatorRevised(*args)
+        result = adaptive_sweep(calculator, (20, 80), tol_deg=0.01)
+
+        theta_fine = np.radians(np.arange(20.0, 80.0005, 0.001))
+        fine = evaluate_support_pressure(calculator, theta_fine)
+        P_fine = np.nanmax(fine['P'])
+        theta_fine_deg = np.degrees(theta_fine[np.nanargmax(fine['P'])])
+
+        lo, hi = result['theta_bracket_deg']
+        assert result['n_evaluations'] < 100 and result['converged']
+        assert lo <= theta_fine_deg <= hi
+        assert hi - lo <= 0.02 + 1e-9
+        np.testing.assert_allclose(result['max_P'], P_fine, rtol=1e-6, atol=1e-4)
+
+        # 1度刻みの探索結果以上の最大値となる
+        critical = calculator.find_critical_pressure((20, 80), 1.0)
+        assert result['max_P'] >= critical['max_P'] - 1e-9
+        print(f"  評価点数 {result['n_evaluations']}: max P = {result['max_P']:.4f} (0.001°刻み: {P_fine:.4f})")
+
+
+def test_validity_boundary():
+    """B = 0.1 の境界角度が閉形式から求まり、評価点に含まれること"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    boundaries = find_validity_boundaries(calculator, np.radians(0.5), np.radians(80))
+    assert len(boundaries) == 1
+    np.testing.assert_allclose(projected_width(calculator, boundaries[0]), 0.1, atol=1e-9)
+    np.testing.assert_allclose(calculator.calculate_geometry(boundaries[0])['B'], 0.1, atol=1e-9)
+
+    result = adaptive_sweep(calculator, (0.5, 80))
+    valid_theta = result['theta_d'][result['valid']]
+    assert abs(valid_theta.min() - boundaries[0]) < 1e-6
+
+
+def test_budget_prioritizes_peak():
+    """評価点数の上限で打ち切る場合も最大値を含み得る区間を優先し、打ち切りを converged で示すこと"""
+    calculator = MurayamaCalculatorRevised(8.55441370955126, 18.867688654485352, 21.874550099901196,
+                                           69.53021060918184, 44.77450638094677, force_finite_cover=True)
+    theta_range = (21.175629231561274, 89.0)
+    reference = adaptive_sweep(calculator, theta_range, tol_deg=1e-4, max_evaluations=5000)
+    result = adaptive_sweep(calculator, theta_range, max_evaluations=40)
+    print(f"  評価点数 {result['n_evaluations']}: max P の誤差 {reference['max_P'] - result['max_P']:.2e}")
+    assert reference['converged'] and not result['converged']
+    assert result['n_evaluations'] == 40
+    # 左端の区間から細分した場合（誤差 1.3e-2）より最大値に近い
+    assert reference['max_P'] - result['max_P'] < 1e-3
+
+
+if __name__ == "__main__":
+    test_adaptive_peak_accuracy()
+    test_validity_boundary()
+    test_budget_prioritizes_peak()
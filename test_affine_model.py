@@ -0,0 +1,54 @@
+"""
+γ・c に関するアフィン分解モデルのテスト
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_affine import AffinePressureModel
+from murayama_vectorized import find_critical_pressure_batch
+
+
+def test_affine_max_pressure_matches_sweep():
+    """(γ, c) の組に対する最大Pがフル掃引と一致すること"""
+    print("=== アフィン分解による最大P ===")
+    model = AffinePressureModel(10.0, 30.0, H=30.0, force_finite_cover=True)
+
+    rng = np.random.default_rng(3)
+    gamma = rng.uniform(16.0, 26.0, 500)
+    coh = rng.uniform(0.0, 80.0, 500)
+
+    fast = model.max_pressure(gamma, coh, chunk_size=128)
+    full = find_critical_pressure_batch(10.0, gamma, 30.0, coh, 30.0, force_finite_cover=True)
+
+    np.testing.assert_allclose(fast['max_P'], full['max_P'], rtol=1e-9, atol=1e-8)
+    np.testing.assert_array_equal(fast['critical_index'], full['critical_index'])
+
+    single = model.max_pressure(20.0, 20.0)
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0, force_finite_cover=True)
+    critical = calculator.find_critical_pressure()
+    np.testing.assert_allclose(single['max_P'], critical['max_P'], rtol=1e-9)
+    assert single['critical_theta_d_deg'] == critical['critical_theta_d_deg']
+    print(f"  γ=20, c=20: max P = {single['max_P']:.3f} kN/m²")
+
+
+def test_cohesion_safety_factor_closed_form():
+    """粘着力のみの強度低減安全率で最大Pがちょうど0になること"""
+    print("=== 粘着力のみの強度低減安全率 ===")
+    model = AffinePressureModel(10.0, 30.0, H=None)
+
+    for gamma, coh in [(20.0, 20.0), (20.0, 60.0), (24.0, 120.0)]:
+        fs = model.cohesion_safety_factor(gamma, coh)
+        assert 0.0 < fs < np.inf
+        at_fs = find_critical_pressure_batch(10.0, gamma, 30.0, coh / fs)
+        np.testing.assert_allclose(at_fs['max_P'][0], 0.0, atol=1e-8)
+        print(f"  γ={gamma}, c={coh}: FS = {fs:.4f}")
+
+    # 粘着力がなければ不安定、配列入力にも対応
+    fs = model.cohesion_safety_factor(np.array([20.0, 20.0]), np.array([0.0, 40.0]))
+    assert fs[0] == 0.0
+    np.testing.assert_allclose(fs[1], 2.0 * model.cohesion_safety_factor(20.0, 20.0))
+
+
+if __name__ == "__main__":
+    test_affine_max_pressure_matches_sweep()
+    test_cohesion_safety_factor_closed_form()
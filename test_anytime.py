@@ -0,0 +1,126 @@
+"""
+臨界支保圧の段階的（anytime）評価のテスト
+"""
+
+import time
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_anytime import anytime_critical_pressure, critical_pressure_until, bounded_safety_factor
+from murayama_jobs import JobManager, anytime_job, DONE
+
+
+def test_stages_improve_and_converge():
+    """段階ごとに結果が改善し、最後の結果が細かい等間隔掃引と一致すること"""
+    print("=== 段階的評価 ===")
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+    stages = list(calculator.find_critical_pressure_anytime())
+    for s in stages:
+        print(f"  刻み {s['theta_step_deg']:g}°: P = {s['max_P']:.4f} kN/m², θd = {s['critical_theta_d_deg']:.3f}°, "
+              f"Fs = {s['safety_factor']:.4f}（{s['n_evaluations']} 点, {s['elapsed'] * 1e3:.1f} ms）")
+    assert [s['theta_step_deg'] for s in stages][:2] == [5.0, 1.0]
+    assert all(b['max_P'] >= a['max_P'] for a, b in zip(stages, stages[1:]))
+    assert stages[-1]['final'] and stages[-1]['converged']
+    assert not any(s['final'] for s in stages[:-1])
+
+    # 1° の段階は find_critical_pressure（1度刻み）と同じ
+    grid = calculator.find_critical_pressure()
+    np.testing.assert_allclose(stages[1]['max_P'], grid['max_P'], rtol=1e-12)
+    assert stages[1]['critical_theta_d_deg'] == round(grid['critical_theta_d_deg'])
+    np.testing.assert_allclose(stages[1]['safety_factor'], grid['safety_factor'], rtol=1e-12)
+
+    # 最終段階は 0.001° 刻みの掃引に許容誤差内で一致
+    fine = calculator.find_critical_pressure(theta_step=0.001, detail='pressure')
+    final = stages[-1]
+    assert abs(final['critical_theta_d_deg'] - fine['critical_theta_d_deg']) <= 0.01
+    np.testing.assert_allclose(final['max_P'], fine['max_P'], rtol=1e-6)
+    lo, hi = final['theta_bracket_deg']
+    assert lo <= fine['critical_theta_d_deg'] <= hi
+    assert final['n_sweep_evaluations'] < 100
+    lo, hi = final['safety_factor_bracket']
+    assert lo <= fine['safety_factor'] <= hi and hi - lo <= 0.001
+
+
+def test_deadline_and_edges():
+    """期限で打ち切られ、範囲端・無効な角度でも動作すること"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    result = critical_pressure_until(calculator, deadline=time.monotonic())
+    assert result['stage'] == 0 and result['final'] and not result['converged']
+
+    # 臨界角度が範囲の端にある場合も範囲外は評価しない
+    result = critical_pressure_until(calculator, theta_range=(20, 30), safety_factor=False)
+    assert 20.0 <= result['critical_theta_d_deg'] <= 30.0 and np.isnan(result['safety_factor'])
+
+    try:
+        critical_pressure_until(calculator, theta_range=(150, 170))
+    except ValueError:
+        pass
+    else:
+        assert False, "有効な角度がない場合は ValueError"
+
+
+def test_safety_factor_budget():
+    """予算つきの安全率が収束時は従来の計算と一致し、予算内では区間が真値を含むこと"""
+    rng = np.random.default_rng(45)
+    for phi, coh, H in zip(rng.uniform(15, 45, 20), rng.uniform(0, 120, 20), rng.uniform(5, 60, 20)):
+        calculator = MurayamaCalculatorRevised(10.0, 20.0, phi, coh, H)
+        theta_d = np.radians(50.0)
+        expected = calculator.calculate_true_safety_factor(theta_d)['safety_factor']
+        result = bounded_safety_factor(calculator, theta_d)
+        assert result['converged'] and result['safety_factor'] == expected
+        for budget in (1, 2, 5, 10):
+            limited = bounded_safety_factor(calculator, theta_d, max_evaluations=budget)
+            assert limited['n_evaluations'] <= budget
+            lo, hi = limited['safety_factor_bracket']
+            if np.isfinite(expected) and expected > 0:
+                assert lo - 1e-3 <= expected <= hi + 1e-3
+
+    # 強度が非常に大きい場合（括り出しの拡張が続く）も予算を超えない
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 40.0, 2000.0, 30.0)
+    unlimited = bounded_safety_factor(calculator, np.radians(50.0))
+    limited = bounded_safety_factor(calculator, np.radians(50.0), max_evaluations=4)
+    print(f"  括り出しの拡張: 予算なし {unlimited['n_evaluations']} 回 → 予算 4 回, "
+          f"区間 {limited['safety_factor_bracket']}")
+    assert unlimited['n_evaluations'] > 4 and limited['n_evaluations'] == 4
+    assert limited['safety_factor_bracket'][0] >= 10.0 and not limited['converged']
+
+
+def test_evaluation_and_time_budget():
+    """評価点数・時間の予算内で最良の結果と精度の区間を返すこと"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+    full = critical_pressure_until(calculator)
+    for budget in (13, 30, 60, 100):
+        result = critical_pressure_until(calculator, max_evaluations=budget)
+        assert result['n_evaluations'] <= budget and result['final']
+        lo, hi = result['theta_bracket_deg']
+        assert lo <= full['critical_theta_d_deg'] <= hi
+        assert result['max_P'] <= full['max_P']
+    assert not critical_pressure_until(calculator, max_evaluations=60)['converged']
+
+    result = critical_pressure_until(calculator, time_budget=0.0)
+    assert result['stage'] == 0 and result['final']
+    result = critical_pressure_until(calculator, time_budget=10.0)
+    assert result['converged'] and result['n_evaluations'] == full['n_evaluations']
+
+
+def test_anytime_job_reports_stages():
+    """ジョブとして実行すると各段階が途中結果として報告されること"""
+    manager = JobManager(max_workers=1)
+    try:
+        calculator = MurayamaCalculatorRevised(10.0, 20.0, 35.0, 10.0, 30.0)
+        job = manager.submit('精緻化', anytime_job, calculator)
+        deadline = time.time() + 60
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+        state = job.snapshot()
+        assert state['status'] == DONE and state['progress'] == 1.0
+        assert state['partial'] is state['result'] and state['result']['converged']
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    test_stages_improve_and_converge()
+    test_deadline_and_edges()
+    test_safety_factor_budget()
+    test_evaluation_and_time_budget()
+    test_anytime_job_reports_stages()
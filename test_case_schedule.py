@@ -0,0 +1,69 @@
+"""
+一括計算の前処理（重複除去・量子化・並べ替え）のテスト
+"""
+
+import time
+import numpy as np
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_schedule import deduplicate_cases, find_critical_pressure_deduplicated
+
+
+def _alignment_cases(n, seed=51):
+    """同一地質の区間が続く路線のケース（粘着力のみ区間内で変化）"""
+    rng = np.random.default_rng(seed)
+    section = np.repeat(np.arange(n // 50), 50)
+    geology = rng.uniform([15.0, 18.0, 20.0], [40.0, 24.0, 80.0], (n // 50, 3))[section]
+    # 奇数区間のみ粘着力がばらつく（(γ, c) 以外が共通なケースが多数）
+    return dict(H_f=np.full(n, 10.0), gamma=geology[:, 1], phi=geology[:, 0],
+                coh=geology[:, 2] + rng.uniform(0.0, 10.0, n) * (section % 2),
+                H=np.where(section % 3 == 0, np.nan, 30.0), force_finite_cover=section % 3 == 1)
+
+
+def test_deduplicated_matches_batch():
+    """重複除去した計算の結果が元の並びで一括探索と一致すること"""
+    print("=== 重複除去・並べ替え ===")
+    cases = _alignment_cases(2000)
+    # 区間をまたいだ完全な重複
+    for name in cases:
+        cases[name][1000:1100] = cases[name][:100]
+
+    start = time.perf_counter()
+    expected = find_critical_pressure_batch(**cases)
+    t_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    result = find_critical_pressure_deduplicated(**cases)
+    t_dedup = time.perf_counter() - start
+
+    np.testing.assert_allclose(result['max_P'], expected['max_P'], rtol=1e-9, atol=1e-8)
+    np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+    assert result['n_unique'] < 1100 and result['n_grouped'] > 900
+    print(f"  {result['n_cases']} → {result['n_unique']} ケース（まとめて計算 {result['n_grouped']}）: "
+          f"一括 {t_batch * 1e3:.0f} ms, 重複除去 {t_dedup * 1e3:.0f} ms")
+
+    # まとめずに計算しても同じ
+    plain = find_critical_pressure_deduplicated(**cases, min_group=10 ** 9)
+    assert plain['n_grouped'] == 0
+    np.testing.assert_array_equal(plain['max_P'], expected['max_P'])
+
+
+def test_quantization_and_order():
+    """量子化で近い条件がまとまり、(φ, H_f) の順に並ぶこと"""
+    dedup = deduplicate_cases([10.0, 10.001, 8.0, 10.0], 20.0, [30.0, 30.02, 25.0, 30.0], [20.0, 20.0, 20.0, -0.0],
+                              H=[np.nan, np.nan, 30.0, np.inf])
+    assert dedup['n_unique'] == 4
+    assert dedup['inverse'][0] != dedup['inverse'][3]  # coh 20 と 0
+
+    dedup = deduplicate_cases([10.0, 10.001, 8.0], 20.0, [30.0, 30.02, 25.0], 20.0,
+                              precision={'H_f': 0.01, 'phi': 0.1})
+    assert dedup['n_unique'] == 2
+    assert dedup['inverse'][0] == dedup['inverse'][1]
+    assert list(dedup['cases']['phi']) == [25.0, 30.0]
+
+    # H の NaN と inf はどちらも深部前提
+    dedup = deduplicate_cases(10.0, 20.0, 30.0, 20.0, H=np.array([np.nan, np.inf]))
+    assert dedup['n_unique'] == 1
+
+
+if __name__ == "__main__":
+    test_deduplicated_matches_batch()
+    test_quantization_and_order()
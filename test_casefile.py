@@ -0,0 +1,89 @@
+"""
+ケースファイルの読み込みと一括計算結果の集計のテスト
+"""
+
+import io
+import time
+import numpy as np
+import pandas as pd
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_numba import find_critical_pressure_fused
+from murayama_schedule import deduplicate_cases
+from murayama_jobs import JobManager, batch_job, DONE
+from murayama_casefile import read_case_file, case_arrays, summarize_results, case_file_template
+
+
+def test_read_case_file():
+    """列名の別名・既定値・深部前提の空欄を解釈し、不正な値を行番号つきで報告すること"""
+    print("=== ケースファイルの読み込み ===")
+    text = ("測点,切羽高さ Hf (m),地山の単位体積重量 γ (kN/m³),φ,粘着力 c (kPa),土被り H (m),K\n"
+            "No.1,10,20,30,20,30,\n"
+            "No.2,10,21,35,30,,1.2\n")
+    cases = read_case_file(text.encode('utf-8-sig'), 'cases.csv')
+    print(cases)
+    assert list(cases['section']) == ['No.1', 'No.2']
+    assert np.isnan(cases['H'][1]) and cases['K'].tolist() == [1.0, 1.2]
+    assert cases['alpha'].tolist() == [1.8, 1.8] and cases['force_finite_cover'].all()
+
+    # ひな形はそのまま読み込める
+    template = read_case_file(case_file_template(), 'template.csv')
+    assert len(template) == 2 and template['force_finite_cover'].all()
+
+    for text, message in (("H_f,gamma,phi\n10,20,30\n", "必須の列"),
+                          ("H_f,gamma,phi,coh\n10,20,30,20\n10,20,abc,20\n", "3 行目"),
+                          ("H_f,gamma,phi,coh\n10,20,30,20\n-1,20,30,20\n", "範囲外"),
+                          ("H_f,gamma,phi,coh\n", "ケースがありません")):
+        try:
+            read_case_file(text.encode(), 'cases.csv')
+        except ValueError as e:
+            assert message in str(e), str(e)
+        else:
+            assert False, f"ValueError（{message}）"
+
+
+def test_batch_summary_matches_single_case():
+    """重複を除いた一括計算の集計表が1ケースずつの計算と一致すること"""
+    rng = np.random.default_rng(48)
+    n = 300
+    frame = pd.DataFrame({
+        'section': [f"No.{i}" for i in range(n)],
+        'H_f': 10.0,
+        'gamma': rng.choice([18.0, 20.0, 22.0], n),
+        'phi': rng.choice([25.0, 30.0, 35.0], n),
+        'coh': rng.choice([0.0, 10.0, 40.0], n),
+        'H': rng.choice([20.0, 40.0, np.nan], n),
+    })
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False)
+    cases = read_case_file(buffer.getvalue().encode(), 'cases.csv')
+
+    dedup = deduplicate_cases(**case_arrays(cases))
+    print(f"  {dedup['n_cases']} 区間 → 重複を除く {dedup['n_unique']} 条件")
+    assert dedup['n_unique'] < n
+    manager = JobManager(max_workers=1)
+    try:
+        job = manager.submit('一括計算', batch_job, **dedup['cases'], safety_factor=True, chunk_size=16)
+        deadline = time.time() + 60
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+        state = job.snapshot()
+    finally:
+        manager.shutdown()
+    assert state['status'] == DONE
+
+    summary = summarize_results(cases, state['result'], dedup['inverse'])
+    expected = find_critical_pressure_fused(**case_arrays(cases), safety_factor=True)
+    np.testing.assert_allclose(summary['必要切羽押え力P (kN/m²)'], expected['max_P'], rtol=1e-12)
+    np.testing.assert_allclose(summary['安全率'], expected['safety_factor'], rtol=1e-12)
+    for i in (0, 1, n - 1):
+        row = cases.iloc[i]
+        H = None if np.isnan(row['H']) else row['H']
+        single = MurayamaCalculatorRevised(row['H_f'], row['gamma'], row['phi'], row['coh'], H,
+                                           force_finite_cover=True).find_critical_pressure()
+        np.testing.assert_allclose(summary['必要切羽押え力P (kN/m²)'][i], single['max_P'], rtol=1e-9)
+        assert summary['安定性評価'][i] == single['stability']
+
+
+if __name__ == "__main__":
+    test_read_case_file()
+    test_batch_summary_matches_single_case()
@@ -0,0 +1,143 @@
+"""
+コーディネーター／ワーカーによる分散計算のテスト（ローカルのワーカープロセスで代用）
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+import multiprocessing
+import numpy as np
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_distributed import Coordinator, run_worker, send_message, recv_message
+
+
+def _random_cases(n, seed=31):
+    rng = np.random.default_rng(seed)
+    H = rng.uniform(3.0, 60.0, n)
+    H[::3] = np.nan
+    return dict(H_f=rng.uniform(3.0, 15.0, n), gamma=rng.uniform(16.0, 26.0, n),
+                phi=rng.uniform(15.0, 45.0, n), coh=rng.uniform(0.0, 120.0, n), H=H)
+
+
+def _start_workers(address, n):
+    workers = [multiprocessing.Process(target=run_worker, args=(address,)) for _ in range(n)]
+    for w in workers:
+        w.start()
+    return workers
+
+
+def _take_chunk(address, heartbeat=False, hold=1.0):
+    """チャンクを受け取ったまま結果を返さない偽のワーカー"""
+    sock = socket.socket(socket.AF_UNIX if isinstance(address, str) else socket.AF_INET)
+    sock.connect(address)
+    send_message(sock, {'type': 'hello'})
+    recv_message(sock)
+    send_message(sock, {'type': 'request'})
+    header, _ = recv_message(sock)
+    assert header['type'] == 'chunk'
+    end = time.monotonic() + hold
+    while heartbeat and time.monotonic() < end:
+        send_message(sock, {'type': 'heartbeat'})
+        time.sleep(0.05)
+    return sock
+
+
+def test_local_workers_match_batch():
+    """複数のワーカープロセスで計算した結果が一括探索と一致すること（逐次受信を含む）"""
+    print("=== 分散計算（TCP、ワーカー3）===")
+    cases = _random_cases(500)
+    expected = find_critical_pressure_batch(**cases)
+    streamed = []
+
+    with Coordinator(**cases, chunk_size=37, on_result=lambda s, e, P, i: streamed.append((s, e))) as coordinator:
+        workers = _start_workers(coordinator.address, 3)
+        result = coordinator.wait(timeout=60)
+        for w in workers:
+            w.join(timeout=10)
+            assert w.exitcode == 0
+
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+    np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+    assert result['diagnostics'] == expected['diagnostics']
+    assert sorted(streamed) == coordinator.chunks
+    print(f"  統計: {result['stats']}")
+
+
+def test_lost_chunks_are_retried():
+    """切断・ハートビート途絶のワーカーのチャンクが再投入されること（Unix ソケット）"""
+    print("=== 失われたチャンクの再試行 ===")
+    cases = _random_cases(120, seed=4)
+    expected = find_critical_pressure_batch(**cases)
+    path = os.path.join(tempfile.mkdtemp(), 'coordinator.sock')
+
+    with Coordinator(**cases, chunk_size=20, address=path, heartbeat_timeout=0.5,
+                     steal_after=60.0) as coordinator:
+        # 受け取った直後に切断するワーカー、受け取ったまま応答しないワーカー
+        _take_chunk(path).close()
+        silent = _take_chunk(path)
+        workers = _start_workers(path, 2)
+        result = coordinator.wait(timeout=60)
+        for w in workers:
+            w.join(timeout=10)
+        silent.close()
+
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+    assert result['stats']['requeued'] == 2
+    assert not os.path.exists(path)
+    print(f"  統計: {result['stats']}")
+
+
+def test_idle_worker_steals_slow_chunk():
+    """待ち行列が空の場合、処理の遅いワーカーのチャンクを横取りして完了すること"""
+    cases = _random_cases(60, seed=9)
+    expected = find_critical_pressure_batch(**cases)
+
+    with Coordinator(**cases, chunk_size=30, heartbeat_timeout=5.0, steal_after=0.2) as coordinator:
+        slow = threading.Thread(target=lambda: _take_chunk(coordinator.address, heartbeat=True,
+                                                           hold=3.0).close())
+        slow.start()
+        time.sleep(0.2)
+        workers = _start_workers(coordinator.address, 1)
+        result = coordinator.wait(timeout=30)
+        for w in workers:
+            w.join(timeout=10)
+        slow.join()
+
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+    assert result['stats']['stolen'] >= 1
+
+
+def test_malformed_result_requeues_chunk():
+    """不正な結果メッセージは送ったワーカーの失敗として扱い、チャンクを再投入すること"""
+    print("=== 不正な結果メッセージ ===")
+    cases = _random_cases(40, seed=5)
+    expected = find_critical_pressure_batch(**cases)
+    path = os.path.join(tempfile.mkdtemp(), 'coordinator.sock')
+
+    with Coordinator(**cases, address=path, chunk_size=20) as coordinator:
+        for header, payload in (({'type': 'result', 'chunk_id': 99, 'diagnostics': {}}, b''),
+                                ({'type': 'result', 'chunk_id': 0, 'diagnostics': {}}, b'\0' * 8)):
+            sock = _take_chunk(coordinator.address, hold=0.0)
+            send_message(sock, header, payload)
+            try:
+                recv_message(sock)  # コーディネーター側から切断される
+            except ConnectionError:
+                pass
+            sock.close()
+        workers = _start_workers(coordinator.address, 1)
+        result = coordinator.wait(timeout=30)
+        for w in workers:
+            w.join(timeout=10)
+
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+    print(f"  統計: {result['stats']}")
+    assert result['stats']['requeued'] == 2
+
+
+if __name__ == "__main__":
+    test_local_workers_match_batch()
+    test_lost_chunks_are_retried()
+    test_idle_worker_steals_slow_chunk()
+    test_malformed_result_requeues_chunk()
@@ -0,0 +1,64 @@
+"""
+差分再計算（IncrementalStudy）のテスト
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_incremental import IncrementalStudy
+
+
+PARAMS = dict(H_f=10.0, gamma=20.0, phi=30.0, coh=20.0, H=30.0, alpha=1.8, K=1.0, force_finite_cover=True)
+
+
+def _assert_same_study(actual, expected):
+    """parametric_study の主要な結果が一致すること"""
+    np.testing.assert_allclose(actual['max_P'], expected['max_P'], rtol=1e-9)
+    assert actual['critical_theta_deg'] == expected['critical_theta_deg']
+    np.testing.assert_allclose(actual['safety_factor'], expected['safety_factor'], rtol=1e-9)
+    assert actual['stability'] == expected['stability']
+    assert len(actual['detailed_results']) == len(expected['detailed_results'])
+    for a, e in zip(actual['detailed_results'], expected['detailed_results']):
+        for key in ('theta_deg', 'r0_m', 'B_m', 'q_kN_m2', 'Wf_kN', 'lw_m', 'Mc_kNm', 'P_kN_m2'):
+            np.testing.assert_allclose(a[key], e[key], rtol=1e-9, atol=1e-9, err_msg=key)
+
+
+def test_incremental_matches_parametric_study():
+    """全段階を計算した結果が parametric_study と一致すること"""
+    study = IncrementalStudy(**PARAMS, theta_range=(20, 80), theta_step=1.0)
+    expected = MurayamaCalculatorRevised(**PARAMS).parametric_study((20, 80), 61)
+    _assert_same_study(study.parametric_study(), expected)
+
+
+def test_alpha_change_recomputes_only_surcharge():
+    """α・K の変更では幾何・自重・粘着を再計算しないこと"""
+    print("=== 差分再計算 ===")
+    study = IncrementalStudy(**PARAMS)
+    study.parametric_study()
+
+    invalidated = study.update(alpha=2.2, K=1.3)
+    assert invalidated == {'surcharge', 'pressure', 'critical', 'safety_factor'}
+    result = study.parametric_study()
+
+    assert study.recompute_count['geometry'] == 1
+    assert study.recompute_count['self_weight'] == 1
+    assert study.recompute_count['cohesion'] == 1
+    assert study.recompute_count['surcharge'] == 2
+    print(f"  再計算回数: {study.recompute_count}")
+
+    params = dict(PARAMS, alpha=2.2, K=1.3)
+    _assert_same_study(result, MurayamaCalculatorRevised(**params).parametric_study((20, 80), 61))
+
+    # 変更なしの update では何も無効化されない
+    assert study.update(alpha=2.2) == set()
+
+    # 粘着力の変更では幾何・自重は再利用される
+    study.update(coh=35.0)
+    study.parametric_study()
+    assert study.recompute_count['geometry'] == 1
+    assert study.recompute_count['self_weight'] == 1
+    assert study.recompute_count['cohesion'] == 2
+
+
+if __name__ == "__main__":
+    test_incremental_matches_parametric_study()
+    test_alpha_change_recomputes_only_surcharge()
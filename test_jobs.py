@@ -0,0 +1,96 @@
+"""
+バックグラウンド計算ジョブ（進捗・途中結果・キャンセル）のテスト
+"""
+
+import threading
+import time
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_jobs import (JobManager, fine_sweep_job, batch_job,
+                           DONE, CANCELLED, ERROR, FINISHED)
+
+
+def _wait(job, timeout=60.0):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+    return job.snapshot()
+
+
+def test_fine_sweep_and_batch_jobs():
+    """ジョブの結果が同期計算と一致し、途中結果が報告されること"""
+    print("=== バックグラウンド計算ジョブ ===")
+    manager = JobManager(max_workers=2)
+    try:
+        calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+        job = manager.submit('詳細掃引', fine_sweep_job, calculator, (20, 80), 0.1, chunk_points=50)
+        state = _wait(job)
+        assert state['status'] == DONE and state['progress'] == 1.0
+        result = state['result']
+        assert len(result['P']) == 601
+        critical = calculator.find_critical_pressure(theta_step=0.1)
+        np.testing.assert_allclose(result['max_P'], critical['max_P'], rtol=1e-9)
+        np.testing.assert_allclose(result['critical_theta_deg'], critical['critical_theta_d_deg'])
+        print(f"  詳細掃引: 最大P = {result['max_P']:.3f} kN/m² ({state['elapsed'] * 1e3:.0f} ms)")
+
+        rng = np.random.default_rng(43)
+        cases = dict(H_f=10.0, gamma=rng.uniform(18.0, 24.0, 500), phi=rng.uniform(20.0, 40.0, 500),
+                     coh=rng.uniform(0.0, 50.0, 500), H=30.0)
+        job = manager.submit('一括計算', batch_job, **cases, chunk_size=128)
+        state = _wait(job)
+        expected = find_critical_pressure_batch(**cases)
+        np.testing.assert_allclose(state['result']['max_P'], expected['max_P'], rtol=1e-12)
+        assert state['result']['n_done'] == 500
+
+        # ジョブ関数の例外は ERROR として記録される
+        job = manager.submit('入力エラー', fine_sweep_job, None)
+        state = _wait(job)
+        assert state['status'] == ERROR and state['error']
+    finally:
+        manager.shutdown()
+
+
+def test_cancel_keeps_partial_result():
+    """キャンセルしたジョブが停止し、それまでの途中結果が残ること"""
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker(ctx):
+        started.set()
+        release.wait(10)
+
+    try:
+        # プールが埋まっている間に投入したジョブは開始前にキャンセルできる
+        first = manager.submit('待機', blocker)
+        started.wait(10)
+        queued = manager.submit('一括計算', batch_job, 10.0, 20.0, np.linspace(20, 40, 100), 20.0)
+        assert manager.active_count() == 2
+        assert manager.cancel(queued.id)
+        release.set()
+        assert _wait(queued)['status'] == CANCELLED
+        assert _wait(first)['status'] == DONE
+
+        # 実行中のジョブは次の進捗報告で停止する
+        calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+        job = manager.submit('詳細掃引', fine_sweep_job, calculator, (20, 80), 0.001, chunk_points=200)
+        while job.snapshot()['partial'] is None:
+            time.sleep(0.001)
+        job.cancel()
+        state = _wait(job)
+        assert state['status'] == CANCELLED and state['result'] is None
+        partial = state['partial']
+        assert 0 < len(partial['P']) < 60001 and 0 < state['progress'] < 1
+        assert np.isfinite(partial['max_P'])
+        print(f"  キャンセル時の進捗: {state['progress']:.1%}（{len(partial['P'])} 点）")
+        assert not manager.cancel(job.id)
+        assert all(manager.get(j.id).status in FINISHED for j in (first, queued, job))
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    test_fine_sweep_and_batch_jobs()
+    test_cancel_keeps_partial_result()
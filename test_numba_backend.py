@@ -0,0 +1,87 @@
+"""
+融合カーネル（Numba、オプション）と NumPy 実装の整合性テスト
+"""
+
+import numpy as np
+import pytest
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_numba import NUMBA_AVAILABLE, find_critical_pressure_fused
+
+
+def _random_cases(n, seed=11):
+    rng = np.random.default_rng(seed)
+    H = rng.uniform(3.0, 60.0, n)
+    H[::4] = np.nan  # 深部前提
+    return dict(H_f=rng.uniform(3.0, 15.0, n), gamma=rng.uniform(16.0, 26.0, n),
+                phi=rng.uniform(15.0, 45.0, n), coh=rng.uniform(0.0, 120.0, n), H=H,
+                force_finite_cover=rng.integers(0, 2, n).astype(bool) & ~np.isnan(H))
+
+
+def test_fused_kernel_matches_numpy():
+    """融合カーネル（未コンパイル）の最大Pが NumPy の一括探索と一致すること"""
+    print(f"=== 融合カーネル（numba: {'あり' if NUMBA_AVAILABLE else 'なし'}）===")
+    cases = _random_cases(40)
+    expected = find_critical_pressure_batch(**cases)
+    backends = ['python', 'numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+    for backend in backends:
+        result = find_critical_pressure_fused(**cases, backend=backend)
+        np.testing.assert_allclose(result['max_P'], expected['max_P'], rtol=1e-10, atol=1e-9)
+        np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+        print(f"  backend={backend}: OK")
+
+    # 有効な角度がないケース
+    result = find_critical_pressure_fused(0.01, 20.0, 30.0, 20.0, backend='python')
+    assert np.isnan(result['max_P'][0]) and result['critical_index'][0] == -1
+
+
+def test_fused_safety_factor_matches_scalar():
+    """融合カーネル・NumPy 版の安全率がスカラー実装と一致すること"""
+    cases = _random_cases(12, seed=5)
+    backends = ['python', 'numpy'] + (['numba'] if NUMBA_AVAILABLE else [])
+    results = {b: find_critical_pressure_fused(**cases, safety_factor=True, backend=b) for b in backends}
+
+    for i in range(12):
+        H = None if np.isnan(cases['H'][i]) else float(cases['H'][i])
+        calculator = MurayamaCalculatorRevised(
+            float(cases['H_f'][i]), float(cases['gamma'][i]), float(cases['phi'][i]),
+            float(cases['coh'][i]), H, 1.8, 1.0, bool(cases['force_finite_cover'][i])
+        )
+        critical = calculator.find_critical_pressure()
+        expected = critical['true_safety_factor_result']['safety_factor'] \
+            if 'true_safety_factor_result' in critical \
+            else calculator.calculate_true_safety_factor(critical['critical_theta_d'])['safety_factor']
+        for backend, result in results.items():
+            np.testing.assert_allclose(result['safety_factor'][i], expected, rtol=1e-12, err_msg=backend)
+
+
+def test_backend_selection():
+    """Numba がない場合は 'auto' が NumPy 実装となり、'numba' の指定はエラーとなること"""
+    result = find_critical_pressure_fused(10.0, 20.0, 30.0, 20.0)
+    assert result['backend'] == ('numba' if NUMBA_AVAILABLE else 'numpy')
+    if not NUMBA_AVAILABLE:
+        try:
+            find_critical_pressure_fused(10.0, 20.0, 30.0, 20.0, backend='numba')
+            assert False, "ImportError が発生しませんでした"
+        except ImportError:
+            pass
+
+
+def test_numba_kernels_compiled():
+    """コンパイルした融合カーネル（掃引・安全率）が NumPy 実装と一致すること（Numba がない場合はスキップ）"""
+    pytest.importorskip('numba')
+    cases = _random_cases(40, seed=3)
+    expected = find_critical_pressure_fused(**cases, safety_factor=True, backend='numpy')
+    result = find_critical_pressure_fused(**cases, safety_factor=True, backend='numba')
+    assert result['backend'] == 'numba'
+    np.testing.assert_allclose(result['max_P'], expected['max_P'], rtol=1e-10, atol=1e-9)
+    np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+    np.testing.assert_allclose(result['safety_factor'], expected['safety_factor'], rtol=1e-12)
+
+
+if __name__ == "__main__":
+    test_fused_kernel_matches_numpy()
+    test_fused_safety_factor_matches_scalar()
+    test_backend_selection()
+    if NUMBA_AVAILABLE:
+        test_numba_kernels_compiled()
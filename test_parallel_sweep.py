@@ -0,0 +1,91 @@
+"""
+並列一括計算（スレッド・プロセス）のテスト
+"""
+
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from murayama_vectorized import find_critical_pressure_batch, SweepPlan
+from murayama_parallel import (
+    find_critical_pressure_threaded, chunk_cases_for_cache, find_critical_pressure_processes,
+    SharedCaseBuffers
+)
+
+
+def _random_cases(n, seed=21):
+    rng = np.random.default_rng(seed)
+    H = rng.uniform(3.0, 60.0, n)
+    H[::5] = np.nan
+    return dict(H_f=rng.uniform(3.0, 15.0, n), gamma=rng.uniform(16.0, 26.0, n),
+                phi=rng.uniform(15.0, 45.0, n), coh=rng.uniform(0.0, 120.0, n), H=H)
+
+
+def test_threaded_matches_batch():
+    """スレッド並列の結果が一括探索と一致すること（チャンク境界・診断情報を含む）"""
+    print("=== スレッド並列一括計算 ===")
+    cases = _random_cases(1003)
+    cases['H_f'][7] = 0.01  # 有効な角度がないケース
+    expected = find_critical_pressure_batch(**cases, return_sweep=True)
+
+    for chunk_size, workers in [(100, 4), (1, 2), (5000, 3), (None, None)]:
+        result = find_critical_pressure_threaded(**cases, chunk_size=chunk_size, max_workers=workers,
+                                                 return_sweep=True)
+        np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+        np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+        np.testing.assert_array_equal(result['P'], expected['P'])
+        assert result['diagnostics'] == expected['diagnostics']
+    assert 7 in result['diagnostics']['no_solution_cases']
+
+    # スレッドプールの共有
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        result = find_critical_pressure_threaded(**cases, chunk_size=64, executor=pool)
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+
+
+def test_chunk_size_and_timing():
+    """チャンクのケース数がキャッシュ目安から決まること（計算時間は参考値）"""
+    assert chunk_cases_for_cache(61) >= 1
+    assert chunk_cases_for_cache(61, cache_bytes=2 << 20) == (2 << 20) // SweepPlan.bytes_per_case(61)
+    assert chunk_cases_for_cache(10 ** 7) == 1
+
+    # 目安は実行計画が実際に確保する θd 方向の配列の大きさと一致する
+    plan = SweepPlan.from_range(batch_size=1, dtype=np.float32)
+    buffers = (list(plan._fields.values()) + [plan._valid, plan._degenerate] + list(plan._work.values())
+               + list(plan._self_weight.work.values()) + list(plan._self_weight.out.values()))
+    assert SweepPlan.bytes_per_case(plan.n_theta, np.float32) == sum(b.nbytes for b in buffers)
+
+    cases = _random_cases(20000, seed=3)
+    start = time.perf_counter()
+    find_critical_pressure_batch(**cases)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    find_critical_pressure_threaded(**cases)
+    threaded = time.perf_counter() - start
+    print(f"  20000ケース: 一括 {serial * 1e3:.0f} ms, スレッド並列 {threaded * 1e3:.0f} ms")
+
+
+def test_process_pool_shared_memory():
+    """プロセス並列（共有メモリ）の結果が一括探索と一致し、結果配列がコピーされないこと"""
+    print("=== プロセス並列（共有メモリ）===")
+    cases = _random_cases(301, seed=8)
+    expected = find_critical_pressure_batch(**cases, return_sweep=True)
+
+    result = find_critical_pressure_processes(**cases, chunk_size=50, max_workers=2, return_sweep=True)
+    np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+    np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+    np.testing.assert_array_equal(result['P'], expected['P'])
+    assert result['diagnostics'] == expected['diagnostics']
+
+    with SharedCaseBuffers(301, expected['theta_d'].size) as buffers:
+        result = find_critical_pressure_processes(**cases, max_workers=2, buffers=buffers)
+        assert np.shares_memory(result['max_P'], buffers.max_P)
+        np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+        np.testing.assert_array_equal(buffers.case('coh'), cases['coh'])
+        del result
+    assert buffers.max_P is None
+
+
+if __name__ == "__main__":
+    test_threaded_matches_batch()
+    test_chunk_size_and_timing()
+    test_process_pool_shared_memory()
@@ -0,0 +1,58 @@
+"""
+グラフ描画用データの間引き（ピーク保存・表示範囲の詳細）のテスト
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import evaluate_support_pressure, theta_grid
+from murayama_plotting import minmax_decimate, decimated_scattergl
+
+
+def test_decimation_preserves_peaks():
+    """間引き後も最大・最小・指定点が残り、点数が区間数で抑えられること"""
+    print("=== ピーク保存の間引き ===")
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+    theta = theta_grid((20, 80), 0.001)
+    res = evaluate_support_pressure(calculator, theta)
+    x = np.degrees(theta)
+    y = np.where(res['valid'], res['P'], np.nan)
+    critical = int(np.nanargmax(y))
+
+    selected = minmax_decimate(x, y, n_buckets=500, keep=[critical])
+    print(f"  {x.size} 点 → {selected.size} 点")
+    assert selected.size <= 4 * 500 + 1
+    assert critical in selected
+    assert np.nanmax(y[selected]) == np.nanmax(y) and np.nanmin(y[selected]) == np.nanmin(y)
+    assert selected[0] == 0 and selected[-1] == x.size - 1
+    assert np.all(np.diff(selected) > 0)
+
+    # 少ない点はそのまま
+    assert np.array_equal(minmax_decimate(x[:100], y[:100], n_buckets=500), np.arange(100))
+
+    # 単発のスパイクも残る
+    spike = np.sin(np.linspace(0, 10, 100000))
+    spike[31415] = 50.0
+    selected = minmax_decimate(np.arange(spike.size), spike, n_buckets=200)
+    assert 31415 in selected and selected.size <= 800
+
+
+def test_window_detail_and_gaps():
+    """表示範囲を指定すると範囲内の詳細が増え、NaN の途切れが保たれること"""
+    x = np.linspace(0.0, 100.0, 200001)
+    y = np.sin(x)
+    y[(x > 40.0) & (x < 41.0)] = np.nan
+    full = minmax_decimate(x, y, n_buckets=100)
+    window = minmax_decimate(x, y, n_buckets=100, x_range=(50.0, 51.0))
+    in_window = lambda s: np.count_nonzero((x[s] >= 50.0) & (x[s] <= 51.0))
+    assert in_window(window) > 10 * in_window(full)
+    assert x[window[0]] < 50.0 and x[window[-1]] > 51.0
+    assert np.isnan(y[full]).any()
+
+    trace = decimated_scattergl(x, y, n_buckets=100, keep=[123456], mode='lines', name='P')
+    assert trace.type == 'scattergl' and len(trace.x) <= 4 * 100 + 1
+    assert x[123456] in trace.x
+
+
+if __name__ == "__main__":
+    test_decimation_preserves_peaks()
+    test_window_detail_and_gaps()
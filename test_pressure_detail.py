@@ -0,0 +1,46 @@
+"""
+calculate_support_pressure の詳細度（P のみの高速経路）のテスト
+"""
+
+import time
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+
+
+def test_pressure_detail_matches_full():
+    """detail='pressure' の P が全結果と一致し、内訳を含まないこと"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0, force_finite_cover=True)
+    for theta_deg in (0.0, 20.0, 45.0, 80.0):
+        theta_d = np.radians(theta_deg)
+        full = calculator.calculate_support_pressure(theta_d)
+        fast = calculator.calculate_support_pressure(theta_d, detail='pressure')
+        assert fast['valid'] == full['valid']
+        np.testing.assert_equal(fast['P'], full['P'])
+        if fast['valid']:
+            assert set(fast) == {'theta_d', 'P', 'valid'}
+
+
+def test_find_critical_pressure_detail():
+    """P のみで探索しても臨界条件の内訳は全結果で得られること"""
+    print("=== P のみの臨界角度探索 ===")
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+
+    start = time.perf_counter()
+    full = calculator.find_critical_pressure()
+    t_full = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = calculator.find_critical_pressure(detail='pressure')
+    t_fast = time.perf_counter() - start
+
+    assert fast['max_P'] == full['max_P']
+    assert fast['critical_theta_d'] == full['critical_theta_d']
+    assert fast['safety_factor'] == full['safety_factor']
+    assert fast['critical_params'].keys() == full['critical_params'].keys()
+    assert fast['critical_geometry'] == full['critical_geometry']
+    assert 'q' not in fast['all_results'][0]
+    print(f"  全結果: {t_full * 1000:.1f} ms, P のみ: {t_fast * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    test_pressure_detail_matches_full()
+    test_find_critical_pressure_detail()
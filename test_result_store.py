@@ -0,0 +1,150 @@
+"""
+計算結果の永続キャッシュ（SQLite）のテスト
+"""
+
+import os
+import tempfile
+import multiprocessing
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import find_critical_pressure_batch
+from murayama_store import ResultStore, case_key, find_critical_pressure_cached
+
+
+def _random_cases(n, seed=41):
+    rng = np.random.default_rng(seed)
+    H = rng.uniform(3.0, 60.0, n)
+    H[::4] = np.nan
+    return dict(H_f=rng.uniform(3.0, 15.0, n), gamma=rng.uniform(16.0, 26.0, n),
+                phi=rng.uniform(15.0, 45.0, n), coh=rng.uniform(0.0, 120.0, n), H=H)
+
+
+def test_repeat_run_hits_cache():
+    """2回目の実行がすべてキャッシュから得られ、結果が一致すること"""
+    print("=== 永続キャッシュ ===")
+    cases = _random_cases(200)
+    expected = find_critical_pressure_batch(**cases, return_sweep=True)
+    path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+
+    with ResultStore(path) as store:
+        first = find_critical_pressure_cached(store, **cases, safety_factor=True, return_sweep=True)
+        assert first['n_computed'] == 200 and first['n_hits'] == 0
+    with ResultStore(path) as store:
+        second = find_critical_pressure_cached(store, **cases, safety_factor=True, return_sweep=True)
+        assert second['n_hits'] == 200 and second['n_computed'] == 0
+        print(f"  保存量: {store.stats()}")
+
+    for result in (first, second):
+        np.testing.assert_array_equal(result['max_P'], expected['max_P'])
+        np.testing.assert_array_equal(result['critical_index'], expected['critical_index'])
+        np.testing.assert_array_equal(result['P'], expected['P'])
+    np.testing.assert_array_equal(first['safety_factor'], second['safety_factor'])
+
+    # 安全率はスカラー実装と一致
+    calculator = MurayamaCalculatorRevised(cases['H_f'][1], cases['gamma'][1], cases['phi'][1],
+                                           cases['coh'][1], cases['H'][1])
+    sf = calculator.calculate_true_safety_factor(second['critical_theta_d'][1])['safety_factor']
+    np.testing.assert_allclose(second['safety_factor'][1], sf, rtol=1e-12)
+
+
+def test_key_canonicalization():
+    """キーが表記の違い（int/float、-0.0、None/NaN/inf の深部前提）によらないこと"""
+    base = case_key(10.0, 20.0, 30.0, 0.0)
+    assert case_key(10, 20, 30, -0.0) == base
+    assert case_key(10.0, 20.0, 30.0, 0.0, H=np.nan) == base
+    assert case_key(10.0, 20.0, 30.0, 0.0, H=np.inf) == base
+    assert case_key(10.0, 20.0, 30.0, 0.0, theta_step=0.5) != base
+    assert case_key(10.0, 20.0, 30.0, 1e-12) != base
+
+
+def test_partial_results_are_merged():
+    """安全率のみ・全角度の P のみの呼び出しを交互に行っても、保存済みの他方を消さないこと"""
+    path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite')
+    cases = _random_cases(5)
+    with ResultStore(path) as store:
+        first = find_critical_pressure_cached(store, **cases, safety_factor=True)
+        sweep = find_critical_pressure_cached(store, **cases, return_sweep=True)
+        assert sweep['n_computed'] == 5
+        third = find_critical_pressure_cached(store, **cases, safety_factor=True)
+        fourth = find_critical_pressure_cached(store, **cases, safety_factor=True, return_sweep=True)
+        print(f"  安全率 → 全角度 → 安全率 → 両方: 計算 {third['n_computed']}, {fourth['n_computed']} 件")
+        assert third['n_computed'] == 0 and fourth['n_computed'] == 0
+        np.testing.assert_array_equal(third['safety_factor'], first['safety_factor'])
+        np.testing.assert_array_equal(fourth['P'], sweep['P'])
+        assert store.stats()['entries'] == 5
+
+
+def test_sweep_and_safety_factor_computed_once():
+    """全角度の P と安全率を同時に求める場合、掃引は1回だけで安全率は一括計算と一致すること"""
+    import murayama_store
+    from murayama_numba import find_critical_pressure_fused
+
+    cases = _random_cases(40, seed=39)
+    calls = []
+    fused = murayama_store.find_critical_pressure_fused
+    murayama_store.find_critical_pressure_fused = lambda *a, **k: calls.append(k) or fused(*a, **k)
+    try:
+        with ResultStore(os.path.join(tempfile.mkdtemp(), 'cache.sqlite')) as store:
+            res = find_critical_pressure_cached(store, **cases, safety_factor=True, return_sweep=True)
+    finally:
+        murayama_store.find_critical_pressure_fused = fused
+    assert calls == [] and res['n_computed'] == 40
+    expected = find_critical_pressure_fused(**cases, safety_factor=True)
+    np.testing.assert_array_equal(res['safety_factor'], expected['safety_factor'])
+    np.testing.assert_array_equal(res['critical_index'], expected['critical_index'])
+
+
+def test_size_based_eviction():
+    """保存量が上限を超えると最終参照の古い行から削除されること"""
+    path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    with ResultStore(path, max_bytes=20000) as store:
+        find_critical_pressure_cached(store, **_random_cases(50, seed=1), return_sweep=True)
+        recent = _random_cases(10, seed=2)
+        find_critical_pressure_cached(store, **recent, return_sweep=True)
+        stats = store.stats()
+        assert 0 < stats['bytes'] <= 20000
+        assert find_critical_pressure_cached(store, **recent, return_sweep=True)['n_hits'] == 10
+
+
+def test_blobs_share_size_limit():
+    """バイト列も計算結果と同じ保存量の上限のもとで、最終参照の古いものから削除されること"""
+    path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    with ResultStore(path, max_bytes=30000) as store:
+        store.put_blob('old', b'a' * 10000)
+        find_critical_pressure_cached(store, **_random_cases(10, seed=3), return_sweep=True)
+        store.put_blob('new', b'b' * 20000)
+        assert store.get_blob('new') == b'b' * 20000
+        assert store.get_blob('old') is None
+        assert store.stats()['bytes'] <= 30000
+        store.delete_blob('new')
+        assert store.get_blob('new') is None and store.stats()['blobs'] == 0
+
+
+def _write_worker(path, seed):
+    with ResultStore(path) as store:
+        for k in range(5):
+            find_critical_pressure_cached(store, **_random_cases(40, seed=seed * 10 + k))
+
+
+def test_concurrent_processes():
+    """複数プロセスから同時に書き込んでも失われないこと"""
+    path = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    ResultStore(path).close()
+    workers = [multiprocessing.Process(target=_write_worker, args=(path, seed)) for seed in range(3)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=60)
+        assert w.exitcode == 0
+    with ResultStore(path) as store:
+        assert store.stats()['entries'] == 3 * 5 * 40
+
+
+if __name__ == "__main__":
+    test_repeat_run_hits_cache()
+    test_key_canonicalization()
+    test_partial_results_are_merged()
+    test_sweep_and_safety_factor_computed_once()
+    test_size_based_eviction()
+    test_blobs_share_size_limit()
+    test_concurrent_processes()
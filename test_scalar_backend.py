@@ -0,0 +1,129 @@
+"""
+スカラー計算（math モジュール）と配列計算（NumPy）の整合性テスト
+"""
+
+import time
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+
+
+FIELDS = ('r0', 'rd', 'la', 'B', 'lp')
+
+
+def test_scalar_matches_array_path():
+    """スカラー入力と配列入力で幾何・上載荷重・自重・粘着が一致すること"""
+    print("=== スカラー/配列の整合性 ===")
+    rng = np.random.default_rng(7)
+    theta = np.radians(np.arange(20.0, 80.5, 1.0))
+
+    for _ in range(30):
+        H = [None, float(rng.uniform(2.0, 60.0))][rng.integers(2)]
+        calculator = MurayamaCalculatorRevised(
+            float(rng.uniform(3.0, 15.0)), float(rng.uniform(15.0, 26.0)), float(rng.uniform(15.0, 45.0)),
+            float(rng.uniform(0.0, 100.0)), H, 1.8, 1.0, bool(rng.integers(2))
+        )
+        geom = calculator.calculate_geometry(theta)
+        q = calculator.calculate_equivalent_surcharge(geom['B'])
+        weight = calculator.calculate_self_weight(geom['r0'], geom['rd'], theta, geom['B'], geom['la'])
+        Mc = calculator.calculate_cohesion_moment(geom['r0'], geom['rd'])
+
+        for i, t in enumerate(theta):
+            g = calculator.calculate_geometry(float(t))
+            for key in FIELDS:
+                np.testing.assert_allclose(g[key], geom[key][i], rtol=1e-12, err_msg=key)
+            np.testing.assert_allclose(calculator.calculate_equivalent_surcharge(g['B']), q[i],
+                                       rtol=1e-12, atol=1e-9)
+            w = calculator.calculate_self_weight(g['r0'], g['rd'], float(t), g['B'], g['la'])
+            for key, value in w.items():
+                np.testing.assert_allclose(value, weight[key][i], rtol=1e-10, atol=1e-9, err_msg=key)
+            np.testing.assert_allclose(calculator.calculate_cohesion_moment(g['r0'], g['rd']), Mc[i],
+                                       rtol=1e-12, atol=1e-9)
+            assert isinstance(g['r0'], float)
+
+
+def test_trig_cache_follows_phi():
+    """φ を書き換えた場合（強度低減）も三角関数の値が更新されること"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    before = calculator.calculate_support_pressure(np.radians(45))['P']
+    calculator.phi = np.arctan(np.tan(calculator.phi) / 1.5)
+    reduced = calculator.calculate_support_pressure(np.radians(45))['P']
+    expected = MurayamaCalculatorRevised(10.0, 20.0, np.degrees(calculator.phi), 20.0)
+    np.testing.assert_allclose(reduced, expected.calculate_support_pressure(np.radians(45))['P'], rtol=1e-12)
+    assert reduced > before
+
+
+def test_extreme_phi_does_not_raise():
+    """φ が 90° 近くでもスカラー計算で例外が発生しないこと"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 60.0, 20.0, 30.0)
+    calculator.phi = np.arctan(np.tan(calculator.phi) * 1e4)
+    for theta_deg in (20, 45, 80):
+        result = calculator.calculate_support_pressure(np.radians(theta_deg))
+        assert not result['valid'] or np.isfinite(result['P'])
+
+
+def test_scalar_timing():
+    """単一ケースの計算時間（参考値）"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+    n = 2000
+    start = time.perf_counter()
+    for _ in range(n):
+        calculator.calculate_support_pressure(np.radians(45))
+    elapsed = (time.perf_counter() - start) / n
+    print(f"  calculate_support_pressure: {elapsed * 1e6:.1f} µs/回")
+
+
+def test_pressure_only_matches_full():
+    """detail='pressure' の P が detail='full' の P とビット単位で一致し、内訳を作らない分速いこと"""
+    rng = np.random.default_rng(33)
+    theta = np.radians(np.arange(0.0, 90.5, 0.5))
+    for _ in range(20):
+        H = [None, float(rng.uniform(2.0, 60.0))][rng.integers(2)]
+        calculator = MurayamaCalculatorRevised(
+            float(rng.uniform(3.0, 15.0)), float(rng.uniform(15.0, 26.0)), float(rng.uniform(15.0, 45.0)),
+            float(rng.uniform(0.0, 100.0)), H, 1.8, float(rng.uniform(0.8, 1.5)),
+            bool(rng.integers(2))
+        )
+        for t in theta:
+            full = calculator.calculate_support_pressure(t)
+            pressure = calculator.calculate_support_pressure(t, detail='pressure')
+            assert pressure['valid'] == full['valid'] and pressure.get('reason') == full.get('reason')
+            np.testing.assert_array_equal(pressure['P'], full['P'])
+
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+    timing = {}
+    for detail in ('full', 'pressure'):
+        n = 2000
+        start = time.perf_counter()
+        for _ in range(n):
+            calculator.calculate_support_pressure(np.radians(45), detail=detail)
+        timing[detail] = (time.perf_counter() - start) / n
+    print(f"  full: {timing['full'] * 1e6:.1f} µs/回, pressure: {timing['pressure'] * 1e6:.1f} µs/回")
+    assert timing['pressure'] < timing['full']
+
+
+def test_invalid_angles_are_nan():
+    """幾何不適切・B ≤ 0.1 の角度はどちらも P = NaN・valid=False とし、配列の幾何も例外を送出しないこと"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    degenerate = calculator.calculate_support_pressure(0.0)
+    narrow = calculator.calculate_support_pressure(np.radians(1.0), detail='pressure')
+    assert (degenerate['reason'], narrow['reason']) == ('degenerate', 'narrow')
+    for result in (degenerate, narrow):
+        assert np.isnan(result['P']) and not result['valid']
+
+    theta = np.radians([0.0, 45.0, 1.0])
+    geom = calculator.calculate_geometry(theta)
+    assert np.isnan(geom['r0'][0]) and geom['valid'].tolist() == [False, True, False]
+    np.testing.assert_allclose(geom['B'][1], calculator.calculate_geometry(theta[1])['B'], rtol=1e-12)
+
+    # 臨界角度は有効な角度の中から選ぶ
+    critical = calculator.find_critical_pressure(theta_range=(0, 80))
+    assert np.isfinite(critical['max_P']) and critical['diagnostics']['n_narrow'] > 0
+
+
+if __name__ == "__main__":
+    test_scalar_matches_array_path()
+    test_trig_cache_follows_phi()
+    test_extreme_phi_does_not_raise()
+    test_scalar_timing()
+    test_pressure_only_matches_full()
+    test_invalid_angles_are_nan()
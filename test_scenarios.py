@@ -0,0 +1,80 @@
+"""
+シナリオ比較（検証・条件を変更したシナリオのみの再計算）のテスト
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_store import ResultStore
+from murayama_scenarios import scenario_table, validate_scenarios, evaluate_scenarios
+
+
+BASE = dict(H_f=10.0, gamma=20.0, phi=30.0, coh=20.0, H=30.0, alpha=1.8, K=1.0, force_finite_cover=True)
+
+
+def _table():
+    return pd.concat([scenario_table(BASE),
+                      scenario_table(dict(BASE, coh=0.0), '粘着力なし'),
+                      scenario_table(dict(BASE, H=None), '深部')], ignore_index=True)
+
+
+def test_only_changed_scenarios_recomputed():
+    """キャッシュにないシナリオだけを計算し、結果が1ケースずつの計算と一致すること"""
+    print("=== シナリオ比較の再計算 ===")
+    path = os.path.join(tempfile.mkdtemp(), 'scenarios.sqlite')
+    with ResultStore(path) as store:
+        table = _table()
+        first = evaluate_scenarios(validate_scenarios(table), store)
+        assert (first['n_computed'], first['n_hits']) == (3, 0)
+
+        # 1シナリオの条件を変更、1シナリオの名称を変更
+        table.loc[1, 'coh'] = 5.0
+        table.loc[2, 'name'] = '深部（土被り無視）'
+        second = evaluate_scenarios(validate_scenarios(table), store)
+        print(f"  再計算 {second['n_computed']} 件、キャッシュ {second['n_hits']} 件")
+        assert (second['n_computed'], second['n_hits']) == (1, 2)
+        assert second['names'][2] == '深部（土被り無視）'
+        assert list(second['summary']['シナリオ']) == second['names']
+
+        # キャッシュを使わない場合と同じ結果
+        direct = evaluate_scenarios(validate_scenarios(table))
+        np.testing.assert_allclose(second['max_P'], direct['max_P'], rtol=1e-12)
+        np.testing.assert_allclose(second['safety_factor'], direct['safety_factor'], rtol=1e-12)
+        np.testing.assert_allclose(second['P'], direct['P'], rtol=1e-12)
+
+    # 1ケースずつの計算と一致
+    for i, row in table.iterrows():
+        H = None if pd.isna(row['H']) else row['H']
+        single = MurayamaCalculatorRevised(row['H_f'], row['gamma'], row['phi'], row['coh'], H,
+                                           force_finite_cover=row['force_finite_cover']).find_critical_pressure()
+        np.testing.assert_allclose(second['max_P'][i], single['max_P'], rtol=1e-9)
+        assert second['summary']['安定性評価'][i] == single['stability']
+        assert np.nanmax(second['P'][i]) == second['max_P'][i]
+
+
+def test_validate_scenarios():
+    """名称の空欄・重複、数値の空欄を表の行番号つきで報告すること"""
+    print("=== シナリオの検証 ===")
+    for column, value, message in (('name', '基本ケース', "重複"),
+                                   ('name', ' ', "名称が空欄"),
+                                   ('coh', np.nan, "2 行目")):
+        table = _table()
+        table.loc[1, column] = value
+        try:
+            validate_scenarios(table)
+        except ValueError as e:
+            print(f"  {e}")
+            assert message in str(e), str(e)
+        else:
+            assert False, f"ValueError（{message}）"
+
+    # 空の行（編集欄で追加しただけの行）は無視する
+    table = pd.concat([_table(), pd.DataFrame([{}], columns=_table().columns)], ignore_index=True)
+    assert len(validate_scenarios(table)) == 3
+
+
+if __name__ == "__main__":
+    test_only_changed_scenarios_recomputed()
+    test_validate_scenarios()
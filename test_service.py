@@ -0,0 +1,227 @@
+"""
+HTTP サービス（マイクロバッチ・keep-alive・バックプレッシャー）のテスト
+"""
+
+import asyncio
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import murayama_service
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_service import CalculatorService
+
+
+class _ServiceThread:
+    """別スレッドのイベントループでサービスを起動する"""
+
+    def __init__(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.service = CalculatorService(port=0, **kwargs)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.service.start(), self.loop).result(10)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.service.close(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+
+
+def _post(conn, path, payload):
+    conn.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_single_and_batch_endpoints():
+    """単一・一括エンドポイントの結果がスカラー実装と一致し、接続が再利用されること"""
+    print("=== HTTP サービス ===")
+    server = _ServiceThread()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        case = {'H_f': 10.0, 'gamma': 20.0, 'phi': 30.0, 'coh': 20.0, 'H': 30.0}
+        status, result = _post(conn, '/v1/critical', dict(case, safety_factor=True))
+        assert status == 200
+        calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0)
+        critical = calculator.find_critical_pressure()
+        np.testing.assert_allclose(result['max_P'], critical['max_P'], rtol=1e-9)
+        assert result['critical_theta_d_deg'] == critical['critical_theta_d_deg']
+        np.testing.assert_allclose(result['safety_factor'], critical['safety_factor'], rtol=1e-9)
+
+        # 同じ接続で一括計算（keep-alive）
+        cases = [dict(case, coh=c) for c in (0.0, 20.0, 400.0)]
+        status, result = _post(conn, '/v1/batch', {'cases': cases, 'safety_factor': True})
+        assert status == 200 and len(result['results']) == 3
+        assert result['results'][0]['max_P'] > result['results'][1]['max_P'] > 0 > result['results'][2]['max_P']
+        assert result['results'][2]['safety_factor'] > 1.0
+
+        # 入力エラー
+        status, result = _post(conn, '/v1/critical', {'H_f': 10.0, 'gamma': 20.0, 'phi': 95.0, 'coh': 0.0})
+        assert status == 400 and '内部摩擦角' in result['error']
+        status, _ = _post(conn, '/v1/unknown', {})
+        assert status == 404
+        conn.request('GET', '/health')
+        assert json.loads(conn.getresponse().read())['status'] == 'ok'
+        conn.close()
+    finally:
+        server.close()
+
+
+def test_concurrent_requests_are_micro_batched():
+    """同時に届いた単一ケースの要求がまとめて計算されること"""
+    server = _ServiceThread(max_delay=0.05)
+    try:
+        rng = np.random.default_rng(0)
+        cases = [{'H_f': 10.0, 'gamma': 20.0, 'phi': float(p), 'coh': 20.0}
+                 for p in rng.uniform(20.0, 40.0, 32)]
+
+        def request(case):
+            conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+            try:
+                return _post(conn, '/v1/critical', case)
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            responses = list(pool.map(request, cases))
+
+        for case, (status, result) in zip(cases, responses):
+            assert status == 200
+            expected = MurayamaCalculatorRevised(10.0, 20.0, case['phi'], 20.0).find_critical_pressure()
+            np.testing.assert_allclose(result['max_P'], expected['max_P'], rtol=1e-9)
+        batches = server.service.batcher.batches
+        print(f"  32要求 → {batches} バッチ")
+        assert batches < 32
+
+        # 同一条件の同時要求は1回の計算を共有する（single-flight）
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(request, [cases[0]] * 8))
+        assert all(r == responses[0] for r in responses)
+        assert server.service.flight.stats['shared'] > 0
+    finally:
+        server.close()
+
+
+def test_budgeted_request():
+    """予算つきの要求が予算内の結果と精度の区間を返すこと"""
+    server = _ServiceThread()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        case = {'H_f': 10.0, 'gamma': 20.0, 'phi': 30.0, 'coh': 20.0, 'H': 30.0, 'safety_factor': True}
+        status, full = _post(conn, '/v1/critical', dict(case, time_budget_ms=10000))
+        assert status == 200 and full['converged']
+        lo, hi = full['safety_factor_bracket']
+        assert lo <= full['safety_factor'] <= hi and hi - lo <= 0.001
+
+        status, result = _post(conn, '/v1/critical', dict(case, max_evaluations=30))
+        assert status == 200 and result['n_evaluations'] <= 30 and not result['converged']
+        lo, hi = result['theta_bracket_deg']
+        assert lo <= full['critical_theta_d_deg'] <= hi
+        print(f"  評価 {result['n_evaluations']} 点: θd ∈ [{lo}, {hi}]°, Fs ∈ {result['safety_factor_bracket']}")
+
+        status, result = _post(conn, '/v1/critical', dict(case, max_evaluations=0))
+        assert status == 400
+        conn.close()
+
+        # 予算の異なる同時要求はまとめない（それぞれの予算の結果を返す）
+        def request(max_evaluations):
+            conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+            try:
+                return _post(conn, '/v1/critical', dict(case, max_evaluations=max_evaluations))[1]
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(request, [20, 60, 20, 60]))
+        assert results[0]['n_evaluations'] <= 20 < results[1]['n_evaluations'] <= 60
+        assert results[2]['n_evaluations'] <= 20 < results[3]['n_evaluations']
+    finally:
+        server.close()
+
+
+def test_bad_request_does_not_fail_batch():
+    """不正な要求・計算に失敗した要求が、同じマイクロバッチの他の要求を失敗させないこと"""
+    server = _ServiceThread(max_delay=0.2)
+    good = {'H_f': 10.0, 'gamma': 20.0, 'phi': 30.0, 'coh': 20.0, 'H': 30.0}
+
+    def request(case):
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        try:
+            return _post(conn, '/v1/critical', case)
+        finally:
+            conn.close()
+
+    compute_cases = murayama_service.compute_cases
+    try:
+        # 型の不正は計算前に 400
+        for bad in (dict(good, force_finite_cover='yes'), dict(good, phi='30'), dict(good, coh=True)):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                (status_bad, result_bad), (status_good, result_good) = pool.map(request, [bad, good])
+            assert status_bad == 400 and 'error' in result_bad, result_bad
+            assert status_good == 200 and result_good['max_P'] > 0
+
+        # 計算中に失敗するケース（coh=123 で失敗させる）は 500、同じバッチの他のケースは 200
+        def failing(cases, *args):
+            if any(c['coh'] == 123.0 for c in cases):
+                raise FloatingPointError("計算失敗")
+            return compute_cases(cases, *args)
+
+        murayama_service.compute_cases = failing
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            (status_bad, result_bad), (status_good, result_good) = pool.map(request, [dict(good, coh=123.0), good])
+        print(f"  失敗したケース: {status_bad} {result_bad}、同じバッチのケース: {status_good}")
+        assert status_bad == 500 and '計算失敗' in result_bad['error']
+        assert status_good == 200 and result_good['max_P'] > 0
+    finally:
+        murayama_service.compute_cases = compute_cases
+        server.close()
+
+
+def test_oversized_grid_is_refused():
+    """角度の点数・ケース数×点数が上限を超える要求は計算せずに拒否すること"""
+    server = _ServiceThread(max_grid_points=100_000)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        case = {'H_f': 10.0, 'gamma': 20.0, 'phi': 30.0, 'coh': 20.0}
+        status, result = _post(conn, '/v1/critical', dict(case, theta_range=[0, 1e6], theta_step=1e-6))
+        print(f"  {status} {result['error']}")
+        assert status == 400 and '点数' in result['error']
+        status, _ = _post(conn, '/v1/critical', dict(case, theta_range=[0, 1e9], max_evaluations=10))
+        assert status == 400
+        status, _ = _post(conn, '/v1/critical', dict(case, theta_range=[20, 80], theta_step=0.01))
+        assert status == 200
+
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        status, result = _post(conn, '/v1/batch', {'cases': [case] * 20, 'theta_step': 0.01})
+        assert status == 413 and '計算量' in result['error']
+        status, result = _post(conn, '/v1/batch', {'cases': [case] * 20})
+        assert status == 200 and len(result['results']) == 20
+        conn.close()
+    finally:
+        server.close()
+
+
+def test_backpressure():
+    """未処理の上限を超える要求には 503 を返すこと"""
+    server = _ServiceThread(max_pending=5)
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', server.service.port, timeout=30)
+        cases = [{'H_f': 10.0, 'gamma': 20.0, 'phi': 30.0, 'coh': 20.0}] * 6
+        status, result = _post(conn, '/v1/batch', {'cases': cases})
+        assert status == 503
+        status, result = _post(conn, '/v1/batch', {'cases': cases[:5]})
+        assert status == 200
+        conn.close()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    test_single_and_batch_endpoints()
+    test_concurrent_requests_are_micro_batched()
+    test_budgeted_request()
+    test_bad_request_does_not_fail_batch()
+    test_oversized_grid_is_refused()
+    test_backpressure()
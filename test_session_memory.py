@@ -0,0 +1,108 @@
+"""
+セッションごとの計算結果の保持（SoA へのまとめ・メモリ上限・永続キャッシュへの退避）のテスト
+"""
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from murayama_incremental import IncrementalStudy
+from murayama_adaptive import adaptive_sweep
+from murayama_store import ResultStore
+from murayama_session import SessionMemory, compact_results, deep_sizeof
+
+
+def _results():
+    study = IncrementalStudy(10.0, 20.0, 30.0, 20.0, 30.0, force_finite_cover=True)
+    results = dict(study.parametric_study())
+    results['adaptive_sweep'] = adaptive_sweep(study.calculator, (20, 80))
+    return results
+
+
+def test_compact_results():
+    """列ごとの配列にまとめた結果が元と同じ表・値を与え、保持量が小さいこと"""
+    print("=== 計算結果のまとめ ===")
+    results = _results()
+    compact = compact_results(results)
+    print(f"  保持量: {deep_sizeof(results)} → {deep_sizeof(compact)} バイト")
+    assert deep_sizeof(compact) < deep_sizeof(results) / 2
+
+    pd.testing.assert_frame_equal(pd.DataFrame(compact['detailed_results']),
+                                  pd.DataFrame(results['detailed_results']))
+    sf, sf_compact = results['true_safety_factor_result'], compact['true_safety_factor_result']
+    assert sf_compact['safety_factor'] == sf['safety_factor']
+    np.testing.assert_array_equal(sf_compact['evaluation_points']['P'], [p['P'] for p in sf['evaluation_points']])
+    for key in ('max_P', 'critical_theta_deg', 'critical_r0', 'stability'):
+        assert compact[key] == results[key]
+    assert 'P_matrix' not in compact and 'theta_d' not in compact['adaptive_sweep']
+    # 元の結果は変更しない
+    assert isinstance(results['detailed_results'], list)
+
+    # 行がない場合も列はそろう
+    empty = compact_results(dict(results, true_safety_factor_result=dict(sf, evaluation_points=[])))
+    assert empty['true_safety_factor_result']['evaluation_points']['safety_factor'].size == 0
+
+
+def test_caps_and_spill():
+    """上限を超えると最終参照の古い値から退避・破棄し、退避した値を読み戻せること"""
+    path = os.path.join(tempfile.mkdtemp(), 'session.sqlite')
+    with ResultStore(path) as store:
+        memory = SessionMemory(session_bytes=300_000, total_bytes=450_000, store=store)
+        block = lambda seed: np.random.default_rng(seed).random(12_000)  # 約 96 KB
+
+        memory.put('a', 'results', block(0), spill=True)
+        memory.put('a', 'figure', block(1))
+        memory.put('a', 'cases', block(2), spill=True)
+        assert memory.get('a', 'results') is not None  # results が最新になる
+        memory.put('a', 'summary', block(3))
+        # セッションの上限: 最終参照の最も古い figure を破棄
+        assert memory.get('a', 'figure') is None
+        assert memory.usage('a')['bytes'] <= 300_000
+
+        # 全体の上限: 他のセッションの古い値から追い出す（spill の値は退避）
+        memory.put('b', 'results', block(4), spill=True)
+        memory.put('b', 'cases', block(5), spill=True)
+        assert memory.total()['bytes'] <= 450_000
+        assert memory.usage('a')['spilled'] == 1 and memory.stats['spills'] == 1
+        print(f"  全体: {memory.total()}、退避先: {store.stats()}")
+
+        # 退避した値は同じ内容で読み戻せる
+        np.testing.assert_array_equal(memory.get('a', 'cases'), block(2))
+        assert memory.stats['restores'] == 1 and store.stats()['blobs'] == 1
+
+        # 置き換え・削除では退避先のバイト列も削除する
+        memory.discard('a')
+        memory.discard('b')
+        assert memory.total() == {'bytes': 0, 'sessions': 0, 'entries': 0, 'spilled': 0}
+        assert store.stats()['blobs'] == 0
+
+    # 退避先がない場合は破棄
+    memory = SessionMemory(session_bytes=150_000)
+    memory.put('a', 'results', np.zeros(12_500), spill=True)
+    memory.put('a', 'cases', np.zeros(12_500), spill=True)
+    assert memory.get('a', 'results') is None and memory.get('a', 'cases') is not None
+
+    # 前方一致の削除
+    memory.put('a', 'render:figure', np.zeros(10))
+    memory.put('a', 'render:csv', b'x' * 10)
+    memory.discard('a', 'render:')
+    assert memory.usage('a')['entries'] == 1
+
+
+def test_views_share_base():
+    """同じ配列のビューは元の配列を1回だけ数えること"""
+    base = np.zeros(100_000)
+    single = deep_sizeof({'a': base[:10]})
+    assert single >= base.nbytes
+    assert deep_sizeof({'a': base[:10], 'b': base[10:20], 'c': base[::2].reshape(250, 200)}) < single + 1_000
+    assert deep_sizeof({'base': base, 'a': base[:10]}) < single + 1_000
+    # ビューのビュー・外部バッファのビュー
+    assert deep_sizeof([base[:50][:10], base[50:]]) < single + 1_000
+    buffer = bytes(80_000)
+    assert deep_sizeof([np.frombuffer(buffer), np.frombuffer(buffer)[:5]]) < 81_000
+
+
+if __name__ == "__main__":
+    test_compact_results()
+    test_caps_and_spill()
+    test_views_share_base()
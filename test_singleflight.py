@@ -0,0 +1,104 @@
+"""
+同一計算の同時要求のまとめ（single-flight）のテスト
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_singleflight import SingleFlight, AsyncSingleFlight, flight_key
+
+
+INPUTS = dict(H_f=10.0, gamma=20.0, phi=30.0, coh=20.0, H=30.0, alpha=1.8, K=1.0,
+              force_finite_cover=True, theta_range=(20, 80), theta_step=1.0)
+
+
+def test_threads_share_one_computation():
+    """同時に同じキーを要求したスレッドが1回の計算結果を共有すること"""
+    print("=== single-flight（スレッド）===")
+    flight = SingleFlight()
+    count = {'n': 0}
+    barrier = threading.Barrier(8)
+
+    def study():
+        count['n'] += 1
+        time.sleep(0.2)
+        return MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0, 30.0, force_finite_cover=True).parametric_study()
+
+    def request(_):
+        barrier.wait()
+        return flight.do(flight_key('parametric_study', **INPUTS), study)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(request, range(8)))
+
+    assert count['n'] == 1
+    assert all(r is results[0] for r in results)
+    assert flight.stats == {'calls': 8, 'shared': 7}
+
+    # 完了後は再計算される、キーが異なれば別計算
+    flight.do(flight_key('parametric_study', **INPUTS), study)
+    flight.do(flight_key('parametric_study', **dict(INPUTS, coh=21.0)), study)
+    assert count['n'] == 3
+    print(f"  統計: {flight.stats}")
+
+
+def test_errors_are_shared():
+    """計算の例外が待機中の要求にも伝わること"""
+    flight = SingleFlight()
+    barrier = threading.Barrier(3)
+
+    def failing():
+        time.sleep(0.1)
+        raise ValueError("入力エラー")
+
+    def request(_):
+        barrier.wait()
+        try:
+            flight.do('key', failing)
+        except ValueError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(request, range(3))) == ["入力エラー"] * 3
+
+
+def test_asyncio_tasks_share_one_computation():
+    """asyncio のタスク間でも計算が共有され、待機側のキャンセルが計算を止めないこと"""
+    async def scenario():
+        flight = AsyncSingleFlight()
+        count = {'n': 0}
+
+        async def compute(x):
+            count['n'] += 1
+            await asyncio.sleep(0.05)
+            return x * 2
+
+        key = flight_key('critical', **INPUTS)
+        tasks = [asyncio.ensure_future(flight.do(key, compute, 21)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        results = await asyncio.gather(*tasks[1:])
+        assert results == [42] * 4
+        assert count['n'] == 1 and flight.stats['shared'] == 4
+
+    asyncio.run(scenario())
+
+
+def test_key_includes_options():
+    """case_key 以外の条件（予算など）が異なる要求は別のキーになること"""
+    base = flight_key('budget', **INPUTS, tol_deg=0.01, max_evaluations=30, time_budget=None)
+    assert base == flight_key('budget', **INPUTS, max_evaluations=30, time_budget=None, tol_deg=0.01)
+    assert base != flight_key('budget', **INPUTS, tol_deg=0.01, max_evaluations=60, time_budget=None)
+    assert base != flight_key('budget', **INPUTS, tol_deg=0.01, max_evaluations=30, time_budget=0.05)
+    assert base != flight_key('budget', **INPUTS, tol_deg=0.1, max_evaluations=30, time_budget=None)
+    # 追加の条件がなければ従来と同じキー
+    assert flight_key('critical', **INPUTS).count(':') == 1
+
+
+if __name__ == "__main__":
+    test_threads_share_one_computation()
+    test_errors_are_shared()
+    test_asyncio_tasks_share_one_computation()
+    test_key_includes_options()
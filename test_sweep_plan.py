@@ -0,0 +1,143 @@
+"""
+掃引実行計画（SweepPlan）とバッチ臨界圧探索のテスト
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import SweepPlan, find_critical_pressure_batch
+
+
+CASES = [
+    # H_f, gamma, phi, coh, H, alpha, K, force_finite_cover
+    (10.0, 20.0, 30.0, 20.0, None, 1.8, 1.0, False),
+    (10.0, 20.0, 30.0, 20.0, 30.0, 1.8, 1.0, True),
+    (10.0, 20.0, 30.0, 20.0, 50.0, 1.8, 1.0, False),
+    (5.2, 25.5, 21.0, 253.0, 9.9, 1.8, 1.0, True),
+    (12.0, 22.0, 40.0, 40.0, 40.0, 2.0, 1.5, True),
+    (8.0, 20.0, 35.0, 30.0, 0.0, 1.8, 1.0, True),
+]
+
+
+def _scalar_sweep(case, theta_values):
+    """スカラー実装で全角度のPを計算（無効角度は -inf）"""
+    H_f, gamma, phi, coh, H, alpha, K, force = case
+    calculator = MurayamaCalculatorRevised(H_f, gamma, phi, coh, H, alpha, K, force)
+    return np.array([calculator.calculate_support_pressure(t)['P'] for t in theta_values])
+
+
+def test_plan_matches_scalar():
+    """実行計画の結果がスカラー実装と一致すること"""
+    print("=== SweepPlan とスカラー実装の比較 ===")
+    plan = SweepPlan.from_range((20, 80), 1.0, batch_size=len(CASES))
+    columns = list(zip(*CASES))
+    H = np.array([np.nan if h is None else h for h in columns[4]])
+    res = plan.execute(np.array(columns[0]), np.array(columns[1]), np.array(columns[2]),
+                       np.array(columns[3]), H, np.array(columns[5]), np.array(columns[6]),
+                       np.array(columns[7]))
+
+    for i, case in enumerate(CASES):
+        expected = _scalar_sweep(case, plan.theta_d)
+        mask = np.isfinite(expected)
+        np.testing.assert_array_equal(res['valid'][i], mask)
+        assert np.isnan(res['P'][i][~mask]).all()
+        np.testing.assert_allclose(res['P'][i][mask], expected[mask], rtol=1e-9, atol=1e-9)
+        assert res['critical_index'][i] == np.argmax(np.where(mask, expected, -np.inf))
+        print(f"  ケース{i + 1}: max P = {res['max_P'][i]:.3f} kN/m², θd* = {np.degrees(res['critical_theta_d'][i]):.1f}°")
+
+
+def test_plan_reuses_buffers():
+    """繰り返し実行で同じ配列が再利用されること"""
+    plan = SweepPlan.from_range((20, 80), 1.0, batch_size=4)
+    first = plan.execute(10.0, 20.0, 30.0, 20.0)
+    P_first = first['P']
+    second = plan.execute(10.0, 20.0, 30.0, 40.0)
+
+    assert second is first
+    assert second['P'] is P_first
+    assert second['P'].shape == (1, plan.n_theta)
+
+
+def test_batch_matches_find_critical_pressure():
+    """バッチ探索の最大Pと臨界角度が find_critical_pressure と一致すること"""
+    rng = np.random.default_rng(1)
+    n = 50
+    H_f = rng.uniform(5.0, 15.0, n)
+    gamma = rng.uniform(18.0, 24.0, n)
+    phi = rng.uniform(20.0, 40.0, n)
+    coh = rng.uniform(0.0, 50.0, n)
+    H = rng.uniform(5.0, 60.0, n)
+
+    batch = find_critical_pressure_batch(H_f, gamma, phi, coh, H, force_finite_cover=True, batch_size=16)
+
+    for i in range(n):
+        calculator = MurayamaCalculatorRevised(H_f[i], gamma[i], phi[i], coh[i], H[i], force_finite_cover=True)
+        critical = calculator.find_critical_pressure()
+        np.testing.assert_allclose(batch['max_P'][i], critical['max_P'], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(batch['critical_theta_d'][i], critical['critical_theta_d'])
+
+
+def test_float32_mode_with_verification():
+    """float32 モードの結果が float64 と近く、最大Pケースの再検証結果が付くこと"""
+    print("=== float32 低精度モード ===")
+    rng = np.random.default_rng(2)
+    n = 200
+    H_f = rng.uniform(5.0, 15.0, n)
+    phi = rng.uniform(20.0, 40.0, n)
+    coh = rng.uniform(0.0, 50.0, n)
+
+    ref = find_critical_pressure_batch(H_f, 20.0, phi, coh, 30.0, force_finite_cover=True)
+    low = find_critical_pressure_batch(H_f, 20.0, phi, coh, 30.0, force_finite_cover=True, dtype=np.float32)
+
+    assert low['max_P'].dtype == np.float32
+    assert 'verification' not in ref
+    np.testing.assert_allclose(low['max_P'], ref['max_P'], rtol=1e-3, atol=1e-2)
+
+    check = low['verification']
+    assert check['case_index'] == int(np.argmax(ref['max_P']))
+    np.testing.assert_allclose(check['max_P_float64'], ref['max_P'][check['case_index']], rtol=1e-6)
+    assert check['rel_error'] < 1e-4
+    print(f"  最大Pケース: {check['case_index']}, 相対誤差 = {check['rel_error']:.2e}")
+
+    # 画面の入力範囲外（γ > 30、H_f > 50）でも float64 と同様に再検証まで行う
+    ref = find_critical_pressure_batch([60.0, 10.0], [35.0, 20.0], 30.0, 20.0)
+    low = find_critical_pressure_batch([60.0, 10.0], [35.0, 20.0], 30.0, 20.0, dtype=np.float32)
+    check = low['verification']
+    assert check['case_index'] == 0
+    np.testing.assert_allclose(check['max_P_float64'], ref['max_P'][0], rtol=1e-6)
+    assert check['rel_error'] < 1e-4
+
+
+def test_degenerate_angles_are_masked():
+    """θd = 0（閉合式の分母 = 0）を含む範囲でも例外・角度ごとの警告なしに集計されること"""
+    import warnings
+
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        critical = calculator.find_critical_pressure(theta_range=(0, 80), theta_step=1.0)
+    assert len(caught) == 1
+    assert critical['diagnostics']['n_degenerate'] == 1
+    assert critical['diagnostics']['degenerate_theta_deg'] == [0.0]
+
+    batch = find_critical_pressure_batch([10.0, 10.0], 20.0, [30.0, 35.0], 20.0, theta_range=(0, 80))
+    diag = batch['diagnostics']
+    assert diag['n_degenerate'] == 2
+    assert diag['n_valid'] + diag['n_degenerate'] + diag['n_narrow'] + diag['n_nonfinite'] == diag['n_evaluated']
+    np.testing.assert_allclose(batch['max_P'][0], critical['max_P'], rtol=1e-9)
+
+
+def test_no_solution_case():
+    """有効な角度がないケースは NaN と -1 で表されること"""
+    batch = find_critical_pressure_batch([10.0, 10.0], 20.0, 30.0, 20.0, theta_range=(0, 0))
+    assert np.isnan(batch['max_P']).all()
+    assert (batch['critical_index'] == -1).all()
+    assert batch['diagnostics']['no_solution_cases'] == [0, 1]
+
+
+if __name__ == "__main__":
+    test_plan_matches_scalar()
+    test_plan_reuses_buffers()
+    test_batch_matches_find_critical_pressure()
+    test_float32_mode_with_verification()
+    test_degenerate_angles_are_masked()
+    test_no_solution_case()
@@ -0,0 +1,98 @@
+"""
+ベクトル化自重カーネルのテスト（スカラー実装との一致確認）
+"""
+
+import numpy as np
+from murayama_calculator_revised import MurayamaCalculatorRevised
+from murayama_vectorized import (
+    SELF_WEIGHT_FIELDS, SelfWeightWorkspace, self_weight_kernel, calculate_self_weight_batch
+)
+
+
+def _scalar_reference(calculator, theta_values):
+    """スカラー実装で幾何と自重を計算"""
+    geoms = {k: [] for k in ('r0', 'rd', 'la', 'B')}
+    weights = {k: [] for k in SELF_WEIGHT_FIELDS}
+    for theta_d in theta_values:
+        geom = calculator.calculate_geometry(theta_d)
+        for k in geoms:
+            geoms[k].append(geom[k])
+        w = calculator.calculate_self_weight(geom['r0'], geom['rd'], theta_d, geom['B'], geom['la'])
+        for k in weights:
+            weights[k].append(w[k])
+    return ({k: np.array(v) for k, v in geoms.items()},
+            {k: np.array(v) for k, v in weights.items()})
+
+
+def test_self_weight_kernel_matches_scalar():
+    """カーネルの結果がスカラー実装と一致すること"""
+    print("=== 自重カーネルとスカラー実装の比較 ===")
+
+    for H_f, gamma, phi, coh in [(10.0, 20.0, 30.0, 20.0), (5.2, 25.5, 21.0, 253.0), (15.0, 24.0, 50.0, 10.0)]:
+        calculator = MurayamaCalculatorRevised(H_f, gamma, phi, coh, H=30.0)
+        theta_values = np.radians(np.arange(20.0, 81.0, 1.0))
+        geoms, expected = _scalar_reference(calculator, theta_values)
+
+        result = self_weight_kernel(geoms['r0'], geoms['rd'], theta_values, geoms['B'], geoms['la'],
+                                    H_f, gamma, calculator.phi)
+
+        for k in SELF_WEIGHT_FIELDS:
+            np.testing.assert_allclose(result[k], expected[k], rtol=1e-10, atol=1e-10, err_msg=k)
+        print(f"  H_f={H_f}, γ={gamma}, φ={phi}°: 一致")
+
+
+def test_self_weight_kernel_reuses_buffers():
+    """作業領域を渡した場合は出力配列が作業領域のビューになること"""
+    calculator = MurayamaCalculatorRevised(10.0, 20.0, 30.0, 20.0)
+    theta_values = np.radians(np.arange(20.0, 81.0, 1.0))
+    geoms, expected = _scalar_reference(calculator, theta_values)
+
+    workspace = SelfWeightWorkspace(128)
+    work, out = workspace.views(len(theta_values))
+    for _ in range(3):
+        result = self_weight_kernel(geoms['r0'], geoms['rd'], theta_values, geoms['B'], geoms['la'],
+                                    10.0, 20.0, calculator.phi, out=out, work=work)
+
+    assert result is out
+    assert np.shares_memory(result['lw'], workspace.out['lw'])
+    np.testing.assert_allclose(result['lw'], expected['lw'], rtol=1e-10)
+
+
+def test_self_weight_batch_chunked():
+    """チャンク分割しても結果が変わらないこと（ケースごとに異なるφ）"""
+    rng = np.random.default_rng(0)
+    n = 1000
+    phi = np.radians(rng.uniform(20.0, 40.0, n))
+    theta = np.radians(rng.uniform(30.0, 70.0, n))
+    H_f = rng.uniform(5.0, 15.0, n)
+
+    e = np.exp(theta * np.tan(phi))
+    r0 = H_f / (e * np.sin(phi + theta) - np.sin(phi))
+    rd = r0 * e
+    la = rd * np.cos(phi + theta)
+    B = r0 * np.cos(phi) - la
+
+    whole = calculate_self_weight_batch(r0, rd, theta, B, la, H_f, 20.0, phi, chunk_size=n)
+    chunked = calculate_self_weight_batch(r0, rd, theta, B, la, H_f, 20.0, phi, chunk_size=97)
+
+    for k in SELF_WEIGHT_FIELDS:
+        np.testing.assert_array_equal(whole[k], chunked[k])
+
+
+def test_self_weight_kernel_rounding_at_zero_radius():
+    """S² が丸め誤差で負になる場合（r0 ≈ O/2、P+φ ≈ 0）も NaN にならないこと"""
+    rng = np.random.default_rng(0)
+    n = 1000
+    B, H_f = rng.uniform(1.0, 10.0, n), rng.uniform(1.0, 10.0, n)
+    r0 = np.hypot(B, H_f) / 2.0 * (1.0 + rng.uniform(-1e-15, 1e-15, n))
+    phi = -np.arctan2(H_f, B)
+    result = self_weight_kernel(r0, 2.0 * r0, np.full(n, 0.5), B, np.zeros(n), H_f, 20.0, phi)
+    for k in SELF_WEIGHT_FIELDS:
+        assert not np.isnan(result[k]).any(), k
+
+
+if __name__ == "__main__":
+    test_self_weight_kernel_matches_scalar()
+    test_self_weight_kernel_reuses_buffers()
+    test_self_weight_batch_chunked()
+    test_self_weight_kernel_rounding_at_zero_radius()